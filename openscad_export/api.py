@@ -0,0 +1,205 @@
+# openscad_export/api.py
+
+"""
+Library interface to batch exports.
+
+A batch is described by an ExportConfig and run by a BatchExporter, either to completion
+with run() or as a stream of events with export_iter():
+
+    from openscad_export.events import ExportFailed
+
+    exporter = BatchExporter(ExportConfig("model.scad", "parameters.csv", "out"))
+    for event in exporter.export_iter():
+        if isinstance(event, ExportFailed):
+            print(event.file, event.error)
+    print(exporter.result.succeeded)
+
+Settings that are invalid raise ExportError instead of exiting the process, and the result
+is returned as an ExportResult, so neither stdout nor the exit status has to be parsed.
+"""
+
+import queue
+import threading
+from dataclasses import dataclass, fields
+from typing import Any, List, Optional
+
+from openscad_export.events import LogMessage, print_log
+from openscad_export.export import batch_export
+from openscad_export.scheduler import BatchControl
+
+# Marks the end of the event stream of a batch
+_DONE = object()
+
+
+@dataclass
+class ExportConfig:
+    """
+    Settings of a batch export.
+
+    The fields are the arguments of export.batch_export(), which documents them; cache and
+    history are a RenderCache and a RenderHistory the caller opens and closes.
+    """
+
+    scad_file: str
+    parameter_file: str
+    output_folder: str
+    openscad_path: str = "openscad"
+    export_format: str = "binstl"
+    selection: Optional[str] = None
+    sequential: bool = False
+    cache: Any = None
+    cache_dir: Optional[str] = None
+    jobs: Optional[int] = None
+    max_load: Optional[float] = None
+    max_memory: Optional[str] = None
+    history: Any = None
+    order: str = "longest-first"
+    timeout: Optional[float] = None
+    max_rss: Optional[int] = None
+    retries: int = 0
+    autotune: bool = False
+    retune: bool = False
+    prune_unused: bool = False
+    two_stage: bool = False
+    pack: bool = False
+    workers: Optional[List[str]] = None
+    shard: Optional[str] = None
+    spool: Optional[str] = None
+    engine: str = "threads"
+    resume: bool = False
+    incremental: bool = False
+    prune_removed: bool = False
+    inspect: bool = False
+    arrange: Optional[str] = None
+
+    def as_kwargs(self):
+        """
+        Return the settings as keyword arguments of batch_export().
+
+        Unlike dataclasses.asdict(), the cache and history objects are passed as they are.
+        """
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+
+class BatchExporter:
+    """
+    Run a batch export and report its progress as events.
+
+    The batch can be cancelled, paused and resumed from any thread while it runs.
+    """
+
+    def __init__(self, config, control=None):
+        """
+        Initialize an exporter.
+
+        Args:
+            config (ExportConfig): Settings of the batch.
+            control (BatchControl or None): Control to cancel, pause and resume the batch
+                with; a new one by default.
+        """
+        self.config = config
+        self.control = control if control is not None else BatchControl()
+        self.result = None
+
+    def run(self, on_event=None, log=print_log):
+        """
+        Run the batch on the calling thread.
+
+        Args:
+            on_event (callable or None): Called with every event of the batch; ExportStarted
+                is sent from the thread running the render.
+            log (callable): Called with every progress message and, for warnings and
+                errors, 'warning' or 'error'. Defaults to print_log.
+
+        Returns:
+            ExportResult: Outcome of the batch.
+
+        Raises:
+            ExportError: If the settings or input files are invalid.
+        """
+        self.result = batch_export(
+            **self.config.as_kwargs(), control=self.control, on_event=on_event, log=log
+        )
+        return self.result
+
+    def export_iter(self):
+        """
+        Run the batch on a background thread and yield its events as they happen.
+
+        Progress messages are yielded as LogMessage events. Closing the generator before the
+        batch ends cancels the batch.
+
+        Yields:
+            BatchStarted, ExportStarted, ExportFinished, ExportFailed, ExportSkipped or
+                LogMessage: Events of the batch, in the order they happened.
+
+        Returns:
+            ExportResult: Outcome of the batch, also stored in self.result.
+
+        Raises:
+            ExportError: If the settings or input files are invalid.
+        """
+        events = queue.Queue()
+        failure = []
+
+        def work():
+            try:
+                self.run(
+                    events.put,
+                    lambda text, level="info": events.put(LogMessage(str(text), level)),
+                )
+            except BaseException as e:
+                failure.append(e)
+            finally:
+                events.put(_DONE)
+
+        thread = threading.Thread(target=work, name="batch-export", daemon=True)
+        thread.start()
+        done = False
+        try:
+            while not done:
+                event = events.get()
+                if event is _DONE:
+                    done = True
+                else:
+                    yield event
+        finally:
+            if not done:
+                # The consumer stopped listening before the batch ended
+                self.control.cancel()
+            thread.join()
+        if failure:
+            raise failure[0]
+        return self.result
+
+    def cancel(self):
+        """
+        Start no further renders and kill the running ones.
+        """
+        self.control.cancel()
+
+    def pause(self):
+        """
+        Hold back new renders and suspend the running ones.
+        """
+        self.control.pause()
+
+    def resume(self):
+        """
+        Continue a paused batch.
+        """
+        self.control.resume()
+
+
+def export_iter(config):
+    """
+    Run a batch export and yield its events as they happen.
+
+    Args:
+        config (ExportConfig): Settings of the batch.
+
+    Returns:
+        generator: BatchExporter.export_iter() of a new exporter; its return value is the
+            ExportResult.
+    """
+    return BatchExporter(config).export_iter()
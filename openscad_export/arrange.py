@@ -0,0 +1,354 @@
+# openscad_export/arrange.py
+
+"""
+Arrangement of exported parts on build plates.
+
+Every part's footprint is its axis-aligned bounding rectangle in the XY plane, computed
+with NumPy from the memory-mapped STL file. The footprints, grown by the spacing between
+parts, are packed onto as few plates as possible with the MaxRects algorithm: each plate
+keeps the list of maximal free rectangles, a part goes to the free rectangle that leaves
+the shortest leftover side (best short side fit), optionally turned by 90 degrees, and
+plates are filled first-fit with the parts sorted from largest to smallest. Each plate is
+written as one binary STL with its parts moved into place and resting on Z = 0, together
+with a JSON layout listing where every part went.
+
+This replaces the Blender script in examples/gridfinity; it needs NumPy but no Blender.
+"""
+
+import os
+import json
+import concurrent.futures
+
+from openscad_export.inspection import BINARY_DTYPE, np, read_triangles
+
+LAYOUT_FILE = "plates.json"
+
+# Distance kept between parts and, in the absence of a setting, used by 'arrange'
+DEFAULT_SPACING = 10.0
+
+# Tolerance for comparing rectangle edges, in model units
+EPSILON = 1e-9
+
+
+def parse_plate(plate_str):
+    """
+    Parse a build plate size.
+
+    Args:
+        plate_str (str): Size as WIDTHxDEPTH, e.g. "256x256".
+
+    Returns:
+        tuple: (width, depth) as floats.
+
+    Raises:
+        ValueError: If the size is invalid.
+    """
+    try:
+        width, depth = (float(part) for part in plate_str.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Invalid plate size '{plate_str}': expected WIDTHxDEPTH, e.g. 256x256.")
+    if width <= 0 or depth <= 0:
+        raise ValueError(f"Invalid plate size '{plate_str}': both sides must be positive.")
+    return width, depth
+
+
+def footprint(path):
+    """
+    Compute the footprint of an STL file.
+
+    Args:
+        path (str): Path to the STL file.
+
+    Returns:
+        tuple or None: (min_x, min_y, max_x, max_y, min_z, triangle count), or None for an
+            empty mesh.
+    """
+    triangles = read_triangles(path)
+    if not len(triangles):
+        return None
+    vertices = triangles.reshape(-1, 3)
+    low = vertices.min(axis=0)
+    high = vertices.max(axis=0)
+    return (
+        float(low[0]),
+        float(low[1]),
+        float(high[0]),
+        float(high[1]),
+        float(low[2]),
+        len(triangles),
+    )
+
+
+class Plate:
+    """
+    Build plate filled with the MaxRects algorithm.
+    """
+
+    def __init__(self, width, depth):
+        """
+        Initialize an empty plate.
+
+        Args:
+            width (float): Usable width of the plate.
+            depth (float): Usable depth of the plate.
+        """
+        # Free rectangles as rows of (x, y, width, depth)
+        self.free = np.array([[0.0, 0.0, width, depth]])
+        self.parts = []
+
+    def find(self, width, depth, rotate):
+        """
+        Find the best position for a rectangle.
+
+        Args:
+            width (float), depth (float): Size of the rectangle.
+            rotate (bool): Whether the rectangle may be turned by 90 degrees.
+
+        Returns:
+            tuple or None: (score, x, y, rotated) of the best free rectangle, where a lower
+                score is better, or None if the rectangle does not fit.
+        """
+        best = None
+        for turned, (w, d) in enumerate([(width, depth), (depth, width)][: 2 if rotate else 1]):
+            fits = (self.free[:, 2] >= w - EPSILON) & (self.free[:, 3] >= d - EPSILON)
+            if not fits.any():
+                continue
+            left_w = self.free[fits, 2] - w
+            left_d = self.free[fits, 3] - d
+            # Best short side fit, ties broken by the long side
+            score = np.minimum(left_w, left_d) * 1e6 + np.maximum(left_w, left_d)
+            index = int(np.argmin(score))
+            if best is None or score[index] < best[0]:
+                x, y = self.free[fits][index, :2]
+                best = (float(score[index]), float(x), float(y), bool(turned))
+        return best
+
+    def occupy(self, x, y, width, depth):
+        """
+        Remove a placed rectangle from the free rectangles.
+
+        Args:
+            x (float), y (float): Lower left corner of the rectangle.
+            width (float), depth (float): Size of the rectangle.
+        """
+        fx, fy, fw, fd = self.free.T
+        overlaps = (
+            (fx < x + width - EPSILON)
+            & (fx + fw > x + EPSILON)
+            & (fy < y + depth - EPSILON)
+            & (fy + fd > y + EPSILON)
+        )
+        pieces = [self.free[~overlaps]]
+        for rx, ry, rw, rd in self.free[overlaps]:
+            # The parts of the free rectangle left, right, below and above the placed one
+            split = []
+            if x > rx + EPSILON:
+                split.append((rx, ry, x - rx, rd))
+            if x + width < rx + rw - EPSILON:
+                split.append((x + width, ry, rx + rw - x - width, rd))
+            if y > ry + EPSILON:
+                split.append((rx, ry, rw, y - ry))
+            if y + depth < ry + rd - EPSILON:
+                split.append((rx, y + depth, rw, ry + rd - y - depth))
+            if split:
+                pieces.append(np.array(split))
+        free = np.concatenate(pieces)
+        # Drop free rectangles contained in another one
+        x0, y0 = free[:, 0], free[:, 1]
+        x1, y1 = x0 + free[:, 2], y0 + free[:, 3]
+        inside = (
+            (x0[:, None] >= x0[None, :] - EPSILON)
+            & (y0[:, None] >= y0[None, :] - EPSILON)
+            & (x1[:, None] <= x1[None, :] + EPSILON)
+            & (y1[:, None] <= y1[None, :] + EPSILON)
+        )
+        np.fill_diagonal(inside, False)
+        # Of identical rectangles, the first one is kept
+        identical = inside & inside.T
+        inside &= ~np.triu(identical)
+        self.free = free[~inside.any(axis=1)]
+
+    def largest_side(self):
+        """
+        Return the longest short side of any free rectangle.
+        """
+        if not len(self.free):
+            return 0.0
+        return float(np.minimum(self.free[:, 2], self.free[:, 3]).max())
+
+
+def pack_parts(sizes, plate, spacing, rotate=True):
+    """
+    Pack rectangles onto as few plates as possible.
+
+    Args:
+        sizes (list of tuple): (width, depth) of every part.
+        plate (tuple): (width, depth) of a plate.
+        spacing (float): Minimum distance between parts.
+        rotate (bool): Whether parts may be turned by 90 degrees.
+
+    Returns:
+        tuple:
+            list of list of tuple: (part index, x, y, rotated) of the parts on every plate.
+            list of int: Indices of parts larger than a plate.
+    """
+    # Parts are grown by the spacing towards +X and +Y, and so is the plate, so parts keep
+    # the spacing between each other but may touch the plate edges
+    width, depth = plate[0] + spacing, plate[1] + spacing
+    order = sorted(
+        range(len(sizes)),
+        key=lambda i: (-(sizes[i][0] * sizes[i][1]), -max(sizes[i]), i),
+    )
+    grown = [(w + spacing, d + spacing) for w, d in sizes]
+    # Smallest short side among the parts still to place, to close plates that are full
+    remaining_side = [0.0] * (len(order) + 1)
+    remaining_side[len(order)] = float("inf")
+    for position in range(len(order) - 1, -1, -1):
+        w, d = grown[order[position]]
+        remaining_side[position] = min(remaining_side[position + 1], min(w, d))
+
+    plates = []
+    open_plates = []
+    too_large = []
+    for position, i in enumerate(order):
+        w, d = grown[i]
+        placed = None
+        for candidate in open_plates:
+            found = candidate.find(w, d, rotate)
+            if found is not None:
+                placed = candidate, found
+                break
+        if placed is None:
+            candidate = Plate(width, depth)
+            found = candidate.find(w, d, rotate)
+            if found is None:
+                too_large.append(i)
+                continue
+            plates.append(candidate)
+            open_plates.append(candidate)
+            placed = candidate, found
+        candidate, (_, x, y, rotated) = placed
+        candidate.occupy(x, y, *((d, w) if rotated else (w, d)))
+        candidate.parts.append((i, x, y, rotated))
+        # No remaining part fits onto a plate whose free rectangles are all narrower
+        open_plates = [
+            p for p in open_plates if p.largest_side() >= remaining_side[position + 1] - EPSILON
+        ]
+    return [p.parts for p in plates], sorted(too_large)
+
+
+def placed_triangles(path, bounds, x, y, rotated):
+    """
+    Read a part and move it to its place on the plate.
+
+    Args:
+        path (str): Path to the STL file.
+        bounds (tuple): Result of footprint() for the file.
+        x (float), y (float): Lower left corner of the part's footprint on the plate.
+        rotated (bool): Whether the part is turned by 90 degrees.
+
+    Returns:
+        numpy.ndarray: Triangles of shape (n, 3, 3).
+    """
+    min_x, min_y, max_x, max_y, min_z, _ = bounds
+    triangles = np.array(read_triangles(path), dtype=np.float64)
+    if rotated:
+        # Counter-clockwise about Z: (x, y) -> (-y, x)
+        turned_x = -triangles[..., 1]
+        triangles[..., 1] = triangles[..., 0]
+        triangles[..., 0] = turned_x
+        min_x, min_y = -max_y, min_x
+    triangles[..., 0] += x - min_x
+    triangles[..., 1] += y - min_y
+    triangles[..., 2] -= min_z
+    return triangles
+
+
+def write_plate(path, count, parts):
+    """
+    Write the parts of a plate as one binary STL file.
+
+    Parts are written one at a time, so only one part is held in memory.
+
+    Args:
+        path (str): Output file.
+        count (int): Total number of triangles of the parts.
+        parts (iterable of numpy.ndarray): Triangles of every part, already in place.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"OpenSCAD-Batch-Export plate".ljust(80, b" "))
+        f.write(np.uint32(count).tobytes())
+        for triangles in parts:
+            normals = np.cross(
+                triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]
+            )
+            lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+            normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+            records = np.zeros(len(triangles), dtype=BINARY_DTYPE)
+            records["normal"] = normals
+            records["vertices"] = triangles
+            f.write(records.tobytes())
+    os.replace(tmp_path, path)
+
+
+def arrange_files(paths, output_folder, plate, spacing=DEFAULT_SPACING, rotate=True, jobs=1):
+    """
+    Arrange STL files on build plates and write one STL file per plate.
+
+    Args:
+        paths (list of str): STL files of the parts.
+        output_folder (str): Folder for the plate files and the layout.
+        plate (tuple): (width, depth) of a plate.
+        spacing (float): Minimum distance between parts.
+        rotate (bool): Whether parts may be turned by 90 degrees.
+        jobs (int): Number of files read or written at once.
+
+    Returns:
+        dict: Layout with the plate files, the position of every part and the parts that
+            are empty or larger than a plate. It is also written to plates.json.
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    with concurrent.futures.ThreadPoolExecutor(max(jobs, 1)) as executor:
+        bounds = list(executor.map(footprint, paths))
+    parts = [i for i, box in enumerate(bounds) if box is not None]
+    sizes = [(bounds[i][2] - bounds[i][0], bounds[i][3] - bounds[i][1]) for i in parts]
+    plates, too_large = pack_parts(sizes, plate, spacing, rotate)
+
+    layout = {
+        "plate": list(plate),
+        "spacing": spacing,
+        "plates": [],
+        "empty": [paths[i] for i, box in enumerate(bounds) if box is None],
+        "too_large": [paths[parts[i]] for i in too_large],
+    }
+    for number, placements in enumerate(plates, 1):
+        layout["plates"].append(
+            {
+                "file": os.path.join(output_folder, f"plate_{number:03d}.stl"),
+                "parts": [
+                    {"file": paths[parts[i]], "x": x, "y": y, "rotated": rotated}
+                    for i, x, y, rotated in placements
+                ],
+            }
+        )
+
+    def write(number):
+        """
+        Write the STL file of a plate.
+        """
+        placements = [(parts[i], x, y, rotated) for i, x, y, rotated in plates[number]]
+        write_plate(
+            layout["plates"][number]["file"],
+            sum(bounds[index][5] for index, _, _, _ in placements),
+            (
+                placed_triangles(paths[index], bounds[index], x, y, rotated)
+                for index, x, y, rotated in placements
+            ),
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max(jobs, 1)) as executor:
+        list(executor.map(write, range(len(plates))))
+    with open(os.path.join(output_folder, LAYOUT_FILE), "w") as f:
+        json.dump(layout, f, indent=1)
+    return layout
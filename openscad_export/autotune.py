@@ -0,0 +1,297 @@
+# openscad_export/autotune.py
+
+"""
+Automatic selection of the fastest OpenSCAD geometry flags.
+
+Newer OpenSCAD builds offer much faster geometry engines (the Manifold backend, fast-csg)
+and lazy unions. Autotuning probes which of these the binary supports, renders a few sample
+rows under every candidate flag set, checks that the results match the plain render by
+triangle count and bounding box, and picks the fastest equivalent configuration. Probed
+capabilities are cached per binary (path and modification time) and the chosen flags per
+binary and model, so later runs can reuse them without tuning again.
+"""
+
+import os
+import re
+import json
+import shutil
+import tempfile
+import subprocess
+
+from openscad_export.cache import default_cache_dir
+from openscad_export.stl import stl_summary
+from openscad_export.watchdog import RenderTimeout
+
+# Experimental features that only affect geometry evaluation speed
+SPEED_FEATURES = ["fast-csg", "manifold", "lazy-union"]
+
+# Every option candidate_flag_sets() can produce
+CANDIDATE_FLAGS = {"--backend=manifold"} | {f"--enable={feature}" for feature in SPEED_FEATURES}
+
+# Candidates may take at most this multiple of the baseline time before they are killed
+CANDIDATE_TIMEOUT_FACTOR = 3.0
+
+# Relative difference in triangle count tolerated between engines, which triangulate
+# the same solid differently
+TRIANGLE_TOLERANCE = 0.25
+
+# A candidate replaces the current best only when it is at least this much faster, so
+# timing noise does not decide between equally fast configurations
+MIN_IMPROVEMENT = 0.05
+
+
+def binary_identity(openscad_path):
+    """
+    Identify an OpenSCAD binary by its resolved path and modification time.
+
+    Args:
+        openscad_path (str): Path to the OpenSCAD executable or its name in PATH.
+
+    Returns:
+        str: Identity string that changes whenever the binary is replaced.
+    """
+    resolved = shutil.which(openscad_path) or openscad_path
+    resolved = os.path.realpath(resolved)
+    try:
+        mtime = os.path.getmtime(resolved)
+    except OSError:
+        mtime = 0
+    return f"{resolved}@{mtime:.0f}"
+
+
+def load_state(name, directory=None):
+    """
+    Load a JSON state file from the cache directory.
+
+    Args:
+        name (str): File name inside the cache directory.
+        directory (str or None): Cache directory. Defaults to default_cache_dir().
+
+    Returns:
+        dict: Stored state, or an empty dict if missing or unreadable.
+    """
+    try:
+        with open(os.path.join(directory or default_cache_dir(), name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(name, state, directory=None):
+    """
+    Atomically write a JSON state file to the cache directory.
+
+    Args:
+        name (str): File name inside the cache directory.
+        state (dict): State to store.
+        directory (str or None): Cache directory. Defaults to default_cache_dir().
+    """
+    directory = directory or default_cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=4, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def probe_capabilities(openscad_path, directory=None):
+    """
+    Determine which speed-related and export options an OpenSCAD binary supports.
+
+    The result is cached per binary identity, so --help is only parsed once per binary.
+
+    Args:
+        openscad_path (str): Path to the OpenSCAD executable.
+        directory (str or None): Cache directory holding capabilities.json. Defaults to
+            default_cache_dir().
+
+    Returns:
+        dict: {'backends': list of str, 'features': list of str,
+            'multiple_outputs': bool}.
+    """
+    identity = binary_identity(openscad_path)
+    capabilities = load_state("capabilities.json", directory)
+    if identity in capabilities:
+        return capabilities[identity]
+    try:
+        result = subprocess.run(
+            [openscad_path, "--help"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=30,
+        )
+        help_text = (result.stdout + result.stderr).decode(errors="replace")
+    except (OSError, subprocess.TimeoutExpired):
+        help_text = ""
+    backends = []
+    if re.search(r"--backend\b", help_text) and re.search(
+        r"manifold", help_text, re.IGNORECASE
+    ):
+        backends.append("manifold")
+    features = []
+    enable = re.search(r"--enable\b(.*?)(?:\n\s*-|\Z)", help_text, re.DOTALL)
+    if enable:
+        features = [f for f in SPEED_FEATURES if f in enable.group(1)]
+    # "-o ... (May be used multiple time for different exports)"
+    multiple_outputs = bool(re.search(r"multiple time", help_text))
+    found = {
+        "backends": backends,
+        "features": features,
+        "multiple_outputs": multiple_outputs,
+    }
+    capabilities[identity] = found
+    save_state("capabilities.json", capabilities, directory)
+    return found
+
+
+def candidate_flag_sets(capabilities):
+    """
+    Build the flag sets to compare for a binary.
+
+    Args:
+        capabilities (dict): Result of probe_capabilities().
+
+    Returns:
+        list of list of str: Candidate flag sets; the first is always the plain render.
+    """
+    engines = [[]]
+    if "manifold" in capabilities["backends"]:
+        engines.append(["--backend=manifold"])
+    elif "manifold" in capabilities["features"]:
+        engines.append(["--enable=manifold"])
+    if "fast-csg" in capabilities["features"]:
+        engines.append(["--enable=fast-csg"])
+    candidates = list(engines)
+    if "lazy-union" in capabilities["features"]:
+        candidates += [engine + ["--enable=lazy-union"] for engine in engines]
+    return candidates
+
+
+def equivalent(reference, candidate):
+    """
+    Check whether two renders describe the same solid.
+
+    Args:
+        reference (tuple): stl_summary() of the plain render.
+        candidate (tuple): stl_summary() of the candidate render.
+
+    Returns:
+        bool: True if the bounding boxes match and the triangle counts are within
+            TRIANGLE_TOLERANCE of each other.
+    """
+    ref_count, ref_box = reference
+    count, box = candidate
+    if ref_box is None or box is None:
+        return ref_box is None and box is None
+    diagonal = sum((h - l) ** 2 for l, h in zip(*ref_box)) ** 0.5
+    tolerance = max(diagonal * 1e-4, 1e-6)
+    for ref_corner, corner in zip(ref_box, box):
+        if any(abs(a - b) > tolerance for a, b in zip(ref_corner, corner)):
+            return False
+    return abs(count - ref_count) <= TRIANGLE_TOLERANCE * max(ref_count, 1)
+
+
+def tuning_key(openscad_path, scad_file, export_format):
+    """
+    Return the key under which the tuning result of a binary and model is recorded.
+
+    Args:
+        openscad_path (str): Path to the OpenSCAD executable.
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+        export_format (str): Export format.
+
+    Returns:
+        str: Tuning key.
+    """
+    return f"{binary_identity(openscad_path)}|{os.path.abspath(scad_file)}|{export_format}"
+
+
+def recorded_flags(openscad_path, scad_file, export_format, directory=None):
+    """
+    Return the flags chosen by an earlier tuning run, if any.
+
+    Args:
+        openscad_path (str): Path to the OpenSCAD executable.
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+        export_format (str): Export format.
+        directory (str or None): Cache directory holding autotune.json. Defaults to
+            default_cache_dir().
+
+    Returns:
+        list of str or None: Recorded flags, or None if this combination was never tuned.
+    """
+    entry = load_state("autotune.json", directory).get(
+        tuning_key(openscad_path, scad_file, export_format)
+    )
+    return entry["flags"] if entry else None
+
+
+def choose_flags(export_stl, openscad_path, scad_file, export_format, samples, directory=None):
+    """
+    Render sample rows under every candidate flag set and record the fastest equivalent one.
+
+    Args:
+        export_stl (callable): Render function with the signature of export.export_stl,
+            accepting the candidate flags as `extra_flags`.
+        openscad_path (str): Path to the OpenSCAD executable.
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+        export_format (str): Export format.
+        samples (list of list of str): -D flags of the sample rows.
+        directory (str or None): Cache directory to record the result in. Defaults to
+            default_cache_dir().
+
+    Returns:
+        list of str: Fastest flag set whose renders match the plain render.
+    """
+    candidates = candidate_flag_sets(probe_capabilities(openscad_path, directory))
+    best = []
+    timings = {}
+    if len(candidates) > 1 and samples:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            reference = []
+            baseline = 0.0
+            for number, d_flags in enumerate(samples):
+                output_file = os.path.join(tmp_dir, f"reference_{number}.stl")
+                success, _, duration = export_stl(
+                    openscad_path, scad_file, output_file, export_format, d_flags
+                )
+                if not success:
+                    # Without a reference render nothing can be compared
+                    return []
+                reference.append(stl_summary(output_file))
+                baseline += duration
+            timings[""] = baseline
+            best_time = baseline
+            for flags in candidates[1:]:
+                total = 0.0
+                for number, d_flags in enumerate(samples):
+                    output_file = os.path.join(tmp_dir, f"candidate_{number}.stl")
+                    try:
+                        success, _, duration = export_stl(
+                            openscad_path,
+                            scad_file,
+                            output_file,
+                            export_format,
+                            d_flags,
+                            timeout=baseline * CANDIDATE_TIMEOUT_FACTOR + 1,
+                            extra_flags=flags,
+                        )
+                    except RenderTimeout:
+                        success = False
+                    if not success or not equivalent(
+                        reference[number], stl_summary(output_file)
+                    ):
+                        total = None
+                        break
+                    total += duration
+                timings[" ".join(flags)] = total
+                if total is not None and total < best_time * (1 - MIN_IMPROVEMENT):
+                    best, best_time = flags, total
+    state = load_state("autotune.json", directory)
+    state[tuning_key(openscad_path, scad_file, export_format)] = {
+        "flags": best,
+        "timings": timings,
+    }
+    save_state("autotune.json", state, directory)
+    return best
@@ -0,0 +1,335 @@
+# openscad_export/cache.py
+
+"""
+Content-addressed render cache for batch exports.
+
+Rendered files are stored under a key derived from everything that influences the output:
+the .scad source and its include<>/use<> dependencies, the -D flags, the export format and
+the OpenSCAD version. On a cache hit the stored file is copied into the output folder instead
+of invoking OpenSCAD again. It is never hardlinked, so editing an output cannot change the
+cached file.
+
+The cache has no index file: every entry is a plain file whose modification time is refreshed
+on each hit, so several processes (or machines sharing the directory) can use it concurrently
+and least-recently-used entries can be evicted by modification time.
+"""
+
+import os
+import sys
+import shutil
+import hashlib
+import threading
+
+from openscad_export.scad import find_dependencies
+
+# Bump when the key layout changes so stale entries are never reused.
+CACHE_KEY_VERSION = "1"
+
+DEFAULT_MAX_SIZE = 5 * 1024**3  # 5 GiB
+
+SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def default_cache_dir():
+    """
+    Return the default cache directory for the current platform.
+
+    The OPENSCAD_EXPORT_CACHE environment variable takes precedence when set.
+
+    Returns:
+        str: Path to the cache directory.
+    """
+    override = os.environ.get("OPENSCAD_EXPORT_CACHE")
+    if override:
+        return override
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+    return os.path.join(base, "openscad-export")
+
+
+def parse_size(size_str):
+    """
+    Parse a human-readable size such as "500M" or "2G" into bytes.
+
+    Args:
+        size_str (str): Size string with an optional K, M, G or T suffix (binary units).
+
+    Returns:
+        int: Size in bytes.
+
+    Raises:
+        ValueError: If the size string is invalid.
+    """
+    value = size_str.strip().upper()
+    if value.endswith("B"):
+        value = value[:-1]
+    unit = value[-1] if value and value[-1] in "KMGT" else ""
+    number = value[: len(value) - len(unit)]
+    try:
+        size = float(number) * SIZE_UNITS[unit]
+    except ValueError:
+        raise ValueError(f"Invalid size '{size_str}'.")
+    if size < 0:
+        raise ValueError(f"Invalid size '{size_str}': must not be negative.")
+    return int(size)
+
+
+def format_size(num_bytes):
+    """
+    Format a byte count as a human-readable string.
+
+    Args:
+        num_bytes (int): Size in bytes.
+
+    Returns:
+        str: Formatted size (e.g., "1.5 MiB").
+    """
+    size = float(num_bytes)
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if size < 1024:
+            return f"{size:.1f} {unit}" if unit != "B" else f"{int(size)} B"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+
+def hash_file(path):
+    """
+    Compute the SHA-256 digest of a file.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: Hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_digest(scad_file):
+    """
+    Compute a digest of a .scad file together with all of its transitive dependencies.
+
+    Args:
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+
+    Returns:
+        str: Hexadecimal digest identifying the model source.
+    """
+    root_dir = os.path.dirname(os.path.abspath(scad_file))
+    digest = hashlib.sha256()
+    digest.update(hash_file(scad_file).encode())
+    for dependency in find_dependencies(scad_file):
+        # Relative paths keep the digest stable when the project is moved
+        name = os.path.relpath(dependency, root_dir).replace(os.sep, "/")
+        digest.update(f"\0{name}\0{hash_file(dependency)}".encode())
+    return digest.hexdigest()
+
+
+def link_or_copy(source, destination):
+    """
+    Hardlink a file to a destination, falling back to a copy.
+
+    The destination is replaced atomically, so readers never see a partial file.
+
+    Args:
+        source (str): Existing file.
+        destination (str): Path to create or replace.
+    """
+    tmp_path = f"{destination}.cache-tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copyfile(source, tmp_path)
+    os.replace(tmp_path, destination)
+
+
+def copy_file(source, destination):
+    """
+    Copy a file to a destination that shares nothing with the source.
+
+    The destination is replaced atomically, so readers never see a partial file.
+
+    Args:
+        source (str): Existing file.
+        destination (str): Path to create or replace.
+    """
+    tmp_path = f"{destination}.cache-tmp"
+    try:
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, destination)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class RenderCache:
+    """
+    Persistent, size-bounded store of rendered files keyed by render inputs.
+    """
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE):
+        """
+        Initialize the cache.
+
+        Args:
+            directory (str or None): Cache directory. Defaults to default_cache_dir().
+            max_size (int): Maximum total size of cached files in bytes.
+        """
+        self.directory = directory or default_cache_dir()
+        self.objects_dir = os.path.join(self.directory, "objects")
+        self.max_size = max_size
+
+    def key(self, source_hash, d_flags, export_format, openscad_version, options=()):
+        """
+        Compute the cache key for a single render.
+
+        Args:
+            source_hash (str): Digest returned by source_digest().
+            d_flags (list of str): -D flags from construct_d_flags().
+            export_format (str): Export format passed to OpenSCAD.
+            openscad_version (str): Version string of the OpenSCAD executable.
+            options (list of str): Further OpenSCAD options, such as the geometry backend.
+
+        Returns:
+            str: Hexadecimal cache key.
+        """
+        digest = hashlib.sha256()
+        parts = [CACHE_KEY_VERSION, source_hash, export_format, openscad_version]
+        # Flag order does not affect the result, so canonicalise it
+        parts += sorted(d_flags)
+        if options:
+            # Different engines triangulate differently, so their outputs are kept apart
+            parts += ["--"] + list(options)
+        for part in parts:
+            digest.update(part.encode())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def path_for(self, key):
+        """
+        Return the path where the entry for a key is stored.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            str: Path to the cached file.
+        """
+        return os.path.join(self.objects_dir, key[:2], key)
+
+    def fetch(self, key, output_file):
+        """
+        Place the cached file for a key at output_file, if present.
+
+        Args:
+            key (str): Cache key.
+            output_file (str): Destination path.
+
+        Returns:
+            bool: True on a cache hit, False otherwise.
+        """
+        cached = self.path_for(key)
+        if not os.path.isfile(cached):
+            return False
+        try:
+            # Refresh the modification time so LRU eviction keeps this entry
+            os.utime(cached)
+            copy_file(cached, output_file)
+        except OSError:
+            return False
+        return True
+
+    def store(self, key, rendered_file):
+        """
+        Add a freshly rendered file to the cache.
+
+        Args:
+            key (str): Cache key.
+            rendered_file (str): Path of the rendered file.
+        """
+        cached = self.path_for(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(cached), exist_ok=True)
+            # Unique per writer so concurrent stores of the same key never collide
+            tmp_path = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+            shutil.copyfile(rendered_file, tmp_path)
+            os.replace(tmp_path, cached)
+        except OSError:
+            # A failing cache must never fail the export itself
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def entries(self):
+        """
+        List all cache entries.
+
+        Returns:
+            list of tuple: (path, size, mtime) for every cached file.
+        """
+        entries = []
+        if not os.path.isdir(self.objects_dir):
+            return entries
+        for dirpath, _, filenames in os.walk(self.objects_dir):
+            for filename in filenames:
+                if filename.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue  # Removed concurrently
+                entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def stats(self):
+        """
+        Summarise the cache contents.
+
+        Returns:
+            dict: Number of entries, total size in bytes, size limit and directory.
+        """
+        entries = self.entries()
+        return {
+            "directory": self.directory,
+            "entries": len(entries),
+            "size": sum(size for _, size, _ in entries),
+            "max_size": self.max_size,
+        }
+
+    def prune(self, max_size=None):
+        """
+        Evict least-recently-used entries until the cache fits within max_size.
+
+        Args:
+            max_size (int or None): Size limit in bytes. Defaults to the cache's max_size.
+
+        Returns:
+            tuple:
+                int: Number of entries removed.
+                int: Number of bytes freed.
+        """
+        limit = self.max_size if max_size is None else max_size
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        freed = 0
+        for path, size, _ in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
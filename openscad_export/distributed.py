@@ -0,0 +1,645 @@
+# openscad_export/distributed.py
+
+"""
+Rendering on remote worker machines.
+
+A worker (`openscad-export worker`) is a small HTTP server that renders jobs with its local
+OpenSCAD. The coordinator side, WorkerPool, uploads the model with its include<>/use<>
+files once per worker as a zip bundle, sends one request per row and streams the rendered
+file back. Each worker takes as many rows at once as it has render slots; free slots on the
+workers with the best measured throughput are used first, and rows on a worker that stops
+responding are retried on the remaining workers.
+
+Protocol (JSON unless noted):
+- GET  /info              -> {"jobs": int, "openscad_version": str}
+- GET  /bundle/<digest>   -> 200 if the bundle is present, 404 otherwise
+- PUT  /bundle/<digest>   <- zip archive of the model and its dependencies
+- POST /render            <- {"bundle", "scad_file", "formats", "d_flags", "extra_flags",
+                              "timeout", "max_rss"}; d_flags must all be -D options and
+                              extra_flags options chosen by autotuning
+                          -> 200 with the file (a zip archive of all files for several
+                             formats), 409 if the bundle is missing, 422 if the render
+                             failed, 504 if it timed out
+"""
+
+import io
+import os
+import json
+import time
+import shutil
+import zipfile
+import tempfile
+import threading
+import http.client
+import urllib.error
+import urllib.request
+import socketserver
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from openscad_export.autotune import CANDIDATE_FLAGS
+from openscad_export.cache import default_cache_dir, source_digest
+from openscad_export.events import print_log
+from openscad_export.formats import FORMAT_EXTENSIONS
+from openscad_export.scad import find_dependencies
+from openscad_export.watchdog import RenderTimeout
+
+DEFAULT_PORT = 8765
+
+# Bytes read or written at a time when streaming files
+CHUNK_SIZE = 1024 * 1024
+
+# Socket timeout for requests without a render timeout, in seconds
+REQUEST_TIMEOUT = 3600
+
+# Seconds before a lost worker is contacted again
+RECONNECT_INTERVAL = 30.0
+
+# Weight of the latest render in a worker's moving average render time
+THROUGHPUT_SMOOTHING = 0.2
+
+
+class WorkerLost(Exception):
+    """
+    Raised when a worker does not respond or breaks the protocol.
+    """
+
+
+class NoWorkers(Exception):
+    """
+    Raised when no worker is reachable.
+    """
+
+
+def build_bundle(scad_file):
+    """
+    Pack a model and the files it includes into a zip archive.
+
+    Files are stored relative to the deepest directory containing all of them. Libraries
+    found through OPENSCADPATH are included as well, but workers resolve library includes
+    through their own OPENSCADPATH, so such libraries have to be installed on the workers.
+
+    Args:
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+
+    Returns:
+        tuple:
+            str: Digest of the model and its dependencies.
+            str: Path of the model inside the archive.
+            bytes: Zip archive.
+    """
+    scad_file = os.path.abspath(scad_file)
+    files = [scad_file] + find_dependencies(scad_file)
+    root = os.path.commonpath([os.path.dirname(path) for path in files])
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for path in files:
+            archive.write(path, os.path.relpath(path, root).replace(os.sep, "/"))
+    scad_name = os.path.relpath(scad_file, root).replace(os.sep, "/")
+    return source_digest(scad_file), scad_name, buffer.getvalue()
+
+
+def safe_member(name):
+    """
+    Check that an archive member stays inside the extraction directory.
+    """
+    parts = name.replace("\\", "/").split("/")
+    return bool(name) and not os.path.isabs(name) and ".." not in parts and ":" not in name
+
+
+class WorkerServer(socketserver.ThreadingMixIn, HTTPServer):
+    """
+    HTTP server handling every request in its own thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, render, openscad_path, admission, bundle_dir, version):
+        """
+        Initialize the server.
+
+        Args:
+            address (tuple): (host, port) to listen on.
+            render (callable): Function with the signature of export.export_outputs.
+            openscad_path (str): Path to the OpenSCAD executable.
+            admission (AdmissionController): Limits the number of concurrent renders.
+            bundle_dir (str): Directory where uploaded bundles are extracted.
+            version (str): Version string of the OpenSCAD executable.
+        """
+        super().__init__(address, WorkerHandler)
+        self.render = render
+        self.openscad_path = openscad_path
+        self.admission = admission
+        self.bundle_dir = bundle_dir
+        self.version = version
+        self.multiple_outputs = False
+
+
+class WorkerHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of a render worker.
+    """
+
+    def send_json(self, status, data):
+        """
+        Send a JSON response.
+        """
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_file(self, path, content_type, headers):
+        """
+        Stream a file as the response body.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile, CHUNK_SIZE)
+
+    def bundle_path(self, digest):
+        """
+        Return the extraction directory of a bundle, or None for malformed digests.
+        """
+        if not digest or not all(c in "0123456789abcdef" for c in digest):
+            return None
+        return os.path.join(self.server.bundle_dir, digest)
+
+    def do_GET(self):
+        if self.path == "/info":
+            self.send_json(
+                200,
+                {"jobs": self.server.admission.jobs, "openscad_version": self.server.version},
+            )
+        elif self.path.startswith("/bundle/"):
+            path = self.bundle_path(self.path[len("/bundle/"):])
+            self.send_json(200 if path and os.path.isdir(path) else 404, {})
+        else:
+            self.send_json(404, {"error": "Not found."})
+
+    def do_PUT(self):
+        if not self.path.startswith("/bundle/"):
+            self.send_json(404, {"error": "Not found."})
+            return
+        path = self.bundle_path(self.path[len("/bundle/"):])
+        if path is None:
+            self.send_json(400, {"error": "Invalid bundle digest."})
+            return
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if not all(safe_member(name) for name in archive.namelist()):
+                    self.send_json(400, {"error": "Bundle contains unsafe paths."})
+                    return
+                os.makedirs(self.server.bundle_dir, exist_ok=True)
+                # Extract next to the final location and rename, so concurrent uploads of
+                # the same bundle never see a partial directory
+                tmp_dir = tempfile.mkdtemp(dir=self.server.bundle_dir)
+                archive.extractall(tmp_dir)
+        except zipfile.BadZipFile:
+            self.send_json(400, {"error": "Bundle is not a zip archive."})
+            return
+        try:
+            os.rename(tmp_dir, path)
+        except OSError:
+            # Another upload of the same bundle won
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.send_json(201, {})
+
+    def do_POST(self):
+        if self.path != "/render":
+            self.send_json(404, {"error": "Not found."})
+            return
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            bundle = self.bundle_path(job["bundle"])
+            formats = job["formats"]
+            d_flags = job.get("d_flags") or []
+            extra_flags = job.get("extra_flags") or []
+            # Anything else would let a client pass arbitrary options to OpenSCAD, such as
+            # extra -o outputs written anywhere on the worker
+            if (
+                not safe_member(job["scad_file"])
+                or not all(fmt in FORMAT_EXTENSIONS for fmt in formats)
+                or not all(flag.startswith("-D") for flag in d_flags)
+                or not all(flag in CANDIDATE_FLAGS for flag in extra_flags)
+            ):
+                raise ValueError
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self.send_json(400, {"error": "Invalid render request."})
+            return
+        if bundle is None or not os.path.isdir(bundle):
+            self.send_json(409, {"error": "Unknown bundle."})
+            return
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            outputs = [
+                (fmt, os.path.join(tmp_dir, f"output{FORMAT_EXTENSIONS[fmt]}"))
+                for fmt in formats
+            ]
+            with self.server.admission:
+                try:
+                    success, error, duration = self.server.render(
+                        self.server.openscad_path,
+                        os.path.join(bundle, job["scad_file"]),
+                        outputs,
+                        d_flags,
+                        job.get("timeout"),
+                        job.get("max_rss"),
+                        extra_flags,
+                        self.server.multiple_outputs,
+                    )
+                except RenderTimeout as e:
+                    self.send_json(504, {"error": str(e), "duration": e.duration})
+                    return
+            if not success:
+                self.send_json(422, {"error": error, "duration": duration})
+                return
+            headers = {"X-Render-Duration": repr(duration)}
+            if len(outputs) == 1:
+                self.send_file(outputs[0][1], "application/octet-stream", headers)
+                return
+            archive_path = os.path.join(tmp_dir, "outputs.zip")
+            with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                for fmt, path in outputs:
+                    archive.write(path, fmt)
+            self.send_file(archive_path, "application/zip", headers)
+
+    def log_message(self, format, *args):
+        print(f"[{self.address_string()}] {format % args}")
+
+
+def serve_worker(
+    render,
+    openscad_path,
+    admission,
+    host="127.0.0.1",
+    port=DEFAULT_PORT,
+    bundle_dir=None,
+    multiple_outputs=False,
+    version="unknown",
+):
+    """
+    Run a render worker until interrupted.
+
+    Args:
+        render (callable): Function with the signature of export.export_outputs.
+        openscad_path (str): Path to the OpenSCAD executable.
+        admission (AdmissionController): Limits the number of concurrent renders.
+        host (str): Address to listen on.
+        port (int): Port to listen on.
+        bundle_dir (str or None): Directory for uploaded models. Defaults to
+            worker-bundles in the cache directory.
+        multiple_outputs (bool): Whether the OpenSCAD version accepts several -o options.
+        version (str): Version string of the OpenSCAD executable.
+    """
+    bundle_dir = bundle_dir or os.path.join(default_cache_dir(), "worker-bundles")
+    server = WorkerServer(
+        (host, port), render, openscad_path, admission, bundle_dir, version
+    )
+    server.multiple_outputs = multiple_outputs
+    print(f"Render worker listening on {host}:{port} ({admission.describe()}).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class RemoteWorker:
+    """
+    Coordinator-side state of one worker.
+    """
+
+    def __init__(self, address):
+        """
+        Initialize the worker state.
+
+        Args:
+            address (str): 'host:port' or a base URL of the worker.
+        """
+        if "://" not in address:
+            address = f"http://{address}"
+        self.url = address.rstrip("/")
+        self.jobs = 0
+        self.running = 0
+        self.version = None
+        self.average = None  # Moving average render time in seconds
+        self.lost_at = None
+        self.bundles = set()
+        self.lock = threading.Lock()
+
+    def request(self, method, path, data=None, headers=None, timeout=REQUEST_TIMEOUT):
+        """
+        Send a request to the worker.
+
+        Returns:
+            http.client.HTTPResponse: Response; error statuses are returned, not raised.
+
+        Raises:
+            WorkerLost: If the worker cannot be reached.
+        """
+        request = urllib.request.Request(
+            self.url + path, data=data, headers=headers or {}, method=method
+        )
+        try:
+            return urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            return e
+        except (OSError, http.client.HTTPException) as e:
+            raise WorkerLost(f"{self.url}: {e}") from e
+
+    def connect(self):
+        """
+        Query the number of render slots and the OpenSCAD version of the worker.
+
+        Raises:
+            WorkerLost: If the worker cannot be reached.
+        """
+        with self.request("GET", "/info", timeout=10) as response:
+            if response.getcode() != 200:
+                raise WorkerLost(f"{self.url}: unexpected status {response.getcode()}")
+            try:
+                info = json.loads(response.read())
+                self.jobs = int(info["jobs"])
+                self.version = info.get("openscad_version")
+            except (ValueError, KeyError, TypeError) as e:
+                raise WorkerLost(f"{self.url}: invalid worker info") from e
+
+    def ensure_bundle(self, digest, archive):
+        """
+        Upload a bundle unless the worker already has it.
+        """
+        with self.lock:
+            if digest in self.bundles:
+                return
+            with self.request("GET", f"/bundle/{digest}", timeout=30) as response:
+                present = response.getcode() == 200
+            if not present:
+                with self.request(
+                    "PUT",
+                    f"/bundle/{digest}",
+                    data=archive,
+                    headers={"Content-Type": "application/zip"},
+                ) as response:
+                    if response.getcode() not in (200, 201):
+                        raise WorkerLost(f"{self.url}: bundle upload failed")
+            self.bundles.add(digest)
+
+
+class WorkerPool:
+    """
+    Dispatches renders to remote workers.
+    """
+
+    def __init__(self, addresses, scad_file, log=print_log):
+        """
+        Connect to the workers and pack the model.
+
+        Args:
+            addresses (list of str): 'host:port' of every worker.
+            scad_file (str): Path to the OpenSCAD (.scad) file rendered by all workers.
+            log (callable): Called with messages about lost and recovered workers, like
+                the log callback of batch_export().
+
+        Raises:
+            NoWorkers: If no worker is reachable.
+        """
+        self.workers = [RemoteWorker(address) for address in addresses]
+        self.digest, self.scad_name, self.archive = build_bundle(scad_file)
+        self.condition = threading.Condition()
+        self.log = log
+        for worker in self.workers:
+            try:
+                worker.connect()
+            except WorkerLost as e:
+                log(f"Render worker unavailable: {e}", "warning")
+                worker.lost_at = time.monotonic()
+        if not self.slots:
+            raise NoWorkers("No render worker is reachable.")
+
+    @property
+    def slots(self):
+        """
+        Total number of render slots of the reachable workers.
+        """
+        return sum(worker.jobs for worker in self.workers if worker.lost_at is None)
+
+    @property
+    def version(self):
+        """
+        OpenSCAD version of the reachable workers, for cache keys and the render history.
+
+        Workers running different versions give all of them joined, so their renders are
+        never taken for those of a single version.
+        """
+        return " + ".join(
+            sorted({str(worker.version) for worker in self.workers if worker.lost_at is None})
+        )
+
+    def describe(self):
+        """
+        Describe the reachable workers.
+
+        Returns:
+            str: Human-readable summary.
+        """
+        return ", ".join(
+            f"{worker.url} ({worker.jobs} slots)"
+            for worker in self.workers
+            if worker.lost_at is None
+        )
+
+    def reconnect(self):
+        """
+        Try to reach lost workers again once RECONNECT_INTERVAL has passed.
+
+        Must be called without holding the condition; the workers are contacted outside it
+        so other threads can take and return slots meanwhile.
+        """
+        with self.condition:
+            now = time.monotonic()
+            due = [
+                worker
+                for worker in self.workers
+                if worker.lost_at is not None and now - worker.lost_at >= RECONNECT_INTERVAL
+            ]
+            for worker in due:
+                # Other threads wait another interval instead of contacting it as well
+                worker.lost_at = now
+        for worker in due:
+            try:
+                worker.connect()
+            except WorkerLost:
+                continue
+            with self.condition:
+                worker.bundles.clear()
+                worker.lost_at = None
+                self.condition.notify_all()
+            self.log(f"Render worker {worker.url} is back.")
+
+    def acquire(self):
+        """
+        Wait for a free render slot.
+
+        Returns:
+            RemoteWorker: Worker whose slot was taken; the fastest one with a free slot.
+
+        Raises:
+            NoWorkers: If every worker has been lost.
+        """
+        while True:
+            self.reconnect()
+            with self.condition:
+                alive = [worker for worker in self.workers if worker.lost_at is None]
+                if not alive and all(worker.running == 0 for worker in self.workers):
+                    raise NoWorkers("All render workers were lost.")
+                free = [worker for worker in alive if worker.running < worker.jobs]
+                if free:
+                    # Workers without measurements yet are tried first
+                    worker = min(
+                        free,
+                        key=lambda w: (w.average or 0.0, w.running / w.jobs),
+                    )
+                    worker.running += 1
+                    return worker
+                self.condition.wait(1.0)
+
+    def release(self, worker, duration=None):
+        """
+        Return a render slot, updating the worker's throughput.
+        """
+        with self.condition:
+            worker.running -= 1
+            if duration is not None:
+                if worker.average is None:
+                    worker.average = duration
+                else:
+                    worker.average += THROUGHPUT_SMOOTHING * (duration - worker.average)
+            self.condition.notify_all()
+
+    def mark_lost(self, worker, error):
+        """
+        Stop sending renders to a worker.
+        """
+        with self.condition:
+            if worker.lost_at is None:
+                self.log(f"Lost render worker: {error}", "warning")
+            worker.lost_at = time.monotonic()
+            self.condition.notify_all()
+
+    def render(self, outputs, d_flags, timeout=None, max_rss=None, extra_flags=None):
+        """
+        Render one parameter set on a worker, retrying on other workers if it is lost.
+
+        Args:
+            outputs (list of tuple): (format, path) pairs to write locally.
+            d_flags (list of str): List of -D flags for OpenSCAD.
+            timeout (float or None): Maximum wall-clock time of the render in seconds.
+            max_rss (int or None): Maximum resident memory of the render in bytes.
+            extra_flags (list of str or None): Further OpenSCAD options.
+
+        Returns:
+            tuple:
+                bool: Success status.
+                str: Error message if any.
+                float: Render duration on the worker in seconds.
+
+        Raises:
+            RenderTimeout: If the render timed out on the worker.
+        """
+        job = json.dumps(
+            {
+                "bundle": self.digest,
+                "scad_file": self.scad_name,
+                "formats": [fmt for fmt, _ in outputs],
+                "d_flags": d_flags,
+                "extra_flags": extra_flags or [],
+                "timeout": timeout,
+                "max_rss": max_rss,
+            }
+        ).encode()
+        while True:
+            try:
+                worker = self.acquire()
+            except NoWorkers as e:
+                return False, str(e), 0.0
+            duration = None
+            try:
+                result = self.render_on(worker, job, outputs, timeout)
+                duration = result[2]
+                return result
+            except WorkerLost as e:
+                self.mark_lost(worker, e)
+            finally:
+                self.release(worker, duration)
+
+    def render_on(self, worker, job, outputs, timeout):
+        """
+        Send a render request to a worker and store the returned files.
+
+        Raises:
+            WorkerLost: If the worker cannot be reached or the transfer breaks off.
+            RenderTimeout: If the render timed out on the worker.
+        """
+        socket_timeout = timeout + 60 if timeout is not None else REQUEST_TIMEOUT
+        for attempt in range(2):
+            worker.ensure_bundle(self.digest, self.archive)
+            response = worker.request(
+                "POST",
+                "/render",
+                data=job,
+                headers={"Content-Type": "application/json"},
+                timeout=socket_timeout,
+            )
+            with response:
+                if response.getcode() == 409 and not attempt:
+                    # The worker lost the bundle, e.g. after a restart
+                    worker.bundles.discard(self.digest)
+                    continue
+                if response.getcode() in (422, 504):
+                    try:
+                        failure = json.loads(response.read())
+                    except ValueError as e:
+                        raise WorkerLost(f"{worker.url}: invalid response") from e
+                    if response.getcode() == 504:
+                        raise RenderTimeout(timeout, failure.get("duration", 0.0))
+                    return False, failure.get("error", ""), failure.get("duration", 0.0)
+                if response.getcode() != 200:
+                    raise WorkerLost(f"{worker.url}: unexpected status {response.getcode()}")
+                duration = float(response.headers.get("X-Render-Duration", 0.0))
+                try:
+                    self.store(response, outputs)
+                except (OSError, http.client.HTTPException, zipfile.BadZipFile) as e:
+                    raise WorkerLost(f"{worker.url}: transfer failed ({e})") from e
+                return True, "", duration
+        raise WorkerLost(f"{worker.url}: bundle upload did not take effect")
+
+    def store(self, response, outputs):
+        """
+        Stream a render response into the output files.
+        """
+        first_path = outputs[0][1]
+        tmp_path = f"{first_path}.{os.getpid()}.{threading.get_ident()}.download"
+        try:
+            with open(tmp_path, "wb") as f:
+                shutil.copyfileobj(response, f, CHUNK_SIZE)
+            length = response.headers.get("Content-Length")
+            if length is not None and os.path.getsize(tmp_path) != int(length):
+                raise http.client.IncompleteRead(b"")
+            if len(outputs) == 1:
+                os.replace(tmp_path, first_path)
+                return
+            with zipfile.ZipFile(tmp_path) as archive:
+                for fmt, path in outputs:
+                    with archive.open(fmt) as source, open(path, "wb") as target:
+                        shutil.copyfileobj(source, target, CHUNK_SIZE)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
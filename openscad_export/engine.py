@@ -0,0 +1,325 @@
+# openscad_export/engine.py
+
+"""
+asyncio engine for running very large numbers of OpenSCAD renders.
+
+The default engine runs every render on a worker thread that blocks in
+subprocess.communicate(). This engine runs all renders from a single event loop instead:
+processes are started with asyncio.create_subprocess_exec, stderr is read incrementally and
+only its tail is kept, time and memory limits are enforced by coroutines instead of the
+watchdog thread, and cancelling a render (for example on Ctrl-C) kills its process group
+right away. Results are produced by an async iterator in completion order.
+"""
+
+import os
+import sys
+import time
+import heapq
+import signal
+import asyncio
+import warnings
+import subprocess
+
+from openscad_export.cache import format_size
+from openscad_export.watchdog import (
+    WATCHDOG,
+    KILL_GRACE_PERIOD,
+    RenderTimeout,
+    limit_address_space,
+    popen_group_kwargs,
+    resident_memory,
+    signal_group,
+)
+
+# Bytes of stderr kept per render for error messages
+STDERR_TAIL = 64 * 1024
+
+# Seconds between resident memory checks of a render with a memory limit
+MEMORY_POLL_INTERVAL = 0.5
+
+
+async def kill_process_group_async(process):
+    """
+    Kill a process started by run_openscad_async() and every process in its group.
+
+    Children may outlive the process, so on POSIX the group is signalled even after the
+    process itself has exited.
+
+    Args:
+        process (asyncio.subprocess.Process): Process to kill.
+    """
+    if sys.platform == "win32":
+        if process.returncode is not None:
+            return
+        killer = await asyncio.create_subprocess_exec(
+            "taskkill", "/F", "/T", "/PID", str(process.pid),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        await killer.wait()
+        return
+    signal_group(process.pid, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), KILL_GRACE_PERIOD)
+    except asyncio.TimeoutError:
+        pass
+    signal_group(process.pid, signal.SIGKILL)
+    await process.wait()
+
+
+async def read_tail(stream, limit=STDERR_TAIL):
+    """
+    Read a stream to its end, keeping only its last bytes.
+
+    Args:
+        stream (asyncio.StreamReader): Stream to read.
+        limit (int): Number of bytes to keep.
+
+    Returns:
+        bytes: The last `limit` bytes of the stream.
+    """
+    tail = bytearray()
+    while True:
+        chunk = await stream.read(65536)
+        if not chunk:
+            return bytes(tail)
+        tail += chunk
+        if len(tail) > limit:
+            del tail[: len(tail) - limit]
+
+
+async def run_openscad_async(
+    openscad_path,
+    scad_file,
+    output_args,
+    d_flags,
+    timeout=None,
+    max_rss=None,
+    extra_flags=None,
+    renders=None,
+):
+    """
+    Run OpenSCAD once from the event loop.
+
+    Takes the same arguments and returns the same result as export.run_openscad.
+
+    Returns:
+        tuple:
+            bool: Success status.
+            str: Error message if any.
+            float: Duration of the export process in seconds.
+
+    Raises:
+        RenderTimeout: If the render was killed for exceeding `timeout`.
+    """
+    start_time = time.perf_counter()
+    # Time spent paused counts towards neither the timeout nor the duration
+    renders = renders or WATCHDOG.renders
+    paused_before = renders.paused_seconds()
+    command = [openscad_path] + output_args + (extra_flags or []) + d_flags + [scad_file]
+    process = await asyncio.create_subprocess_exec(
+        *command,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        **popen_group_kwargs(),
+    )
+    limit_address_space(process.pid, max_rss)
+    # Pausing or cancelling the batch suspends or kills the render through its group
+    renders.track(process.pid)
+    killed = None
+
+    def elapsed():
+        return (
+            time.perf_counter() - start_time - (renders.paused_seconds() - paused_before)
+        )
+
+    async def watch_memory():
+        """
+        Kill the render once it exceeds its resident memory limit.
+        """
+        nonlocal killed
+        while True:
+            await asyncio.sleep(MEMORY_POLL_INTERVAL)
+            rss = resident_memory(process.pid)
+            if rss is not None and rss > max_rss:
+                killed = "memory"
+                await kill_process_group_async(process)
+                return
+
+    watcher = asyncio.ensure_future(watch_memory()) if max_rss is not None else None
+    finished = asyncio.ensure_future(
+        asyncio.gather(read_tail(process.stderr), process.wait())
+    )
+    try:
+        while True:
+            remaining = None if timeout is None else timeout - elapsed()
+            if remaining is not None and remaining <= 0:
+                killed = "timeout"
+                finished.cancel()
+                break
+            # Wakes up at the deadline, which moves later if the batch was paused meanwhile
+            done, _ = await asyncio.wait([finished], timeout=remaining)
+            if done:
+                stderr, _ = finished.result()
+                break
+    finally:
+        if watcher is not None:
+            watcher.cancel()
+        if process.returncode is None:
+            finished.cancel()
+        # Never leave a render or its children running, e.g. when cancelled while waiting
+        await asyncio.shield(kill_process_group_async(process))
+        renders.untrack(process.pid)
+    duration = elapsed()
+    if killed == "timeout":
+        raise RenderTimeout(timeout, duration)
+    if killed == "memory":
+        return (
+            False,
+            f"Killed after exceeding the memory limit of {format_size(max_rss)}.",
+            duration,
+        )
+    if process.returncode != 0:
+        return False, stderr.decode(errors="replace").strip(), duration
+    return True, "", duration
+
+
+def pidfd_supported():
+    """
+    Check whether child processes can be awaited through Linux pid file descriptors.
+    """
+    if not hasattr(os, "pidfd_open"):
+        return False
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return False
+    return True
+
+
+def run_event_loop(main):
+    """
+    Run a coroutine function on a new event loop.
+
+    Before Python 3.12 the default child watcher starts a thread for every subprocess, which
+    costs more than the render itself for short renders; where available the loop awaits
+    its children through pid file descriptors instead.
+
+    Args:
+        main (callable): Coroutine function to run.
+
+    Returns:
+        Result of the coroutine.
+    """
+    if sys.version_info >= (3, 12) or not pidfd_supported():
+        return asyncio.run(main())
+
+    async def with_pidfd_watcher():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            watcher = asyncio.PidfdChildWatcher()
+            watcher.attach_loop(asyncio.get_running_loop())
+            asyncio.set_child_watcher(watcher)
+        try:
+            return await main()
+        finally:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", DeprecationWarning)
+                asyncio.set_child_watcher(None)
+            watcher.close()
+
+    return asyncio.run(with_pidfd_watcher())
+
+
+class AsyncAdmission:
+    """
+    Event loop counterpart of scheduler.AdmissionController.
+
+    Applies the job, load and memory limits of an AdmissionController to coroutines.
+    """
+
+    def __init__(self, admission):
+        """
+        Initialize the gate.
+
+        Args:
+            admission (AdmissionController): Limits to apply.
+        """
+        self.admission = admission
+        self.running = 0
+        self.free_slots = list(range(admission.jobs))
+        self.released = asyncio.Event()
+
+    async def acquire(self):
+        """
+        Wait until another render may start, then reserve a slot for it.
+
+        Returns:
+            int: Number of the slot, from 0 to jobs - 1.
+
+        Raises:
+            BatchCancelled: If the batch was cancelled.
+        """
+        while not (
+            not self.admission.held()
+            and self.running < self.admission.jobs
+            and (self.running == 0 or self.admission.limits_exceeded() is None)
+        ):
+            # Woken early when a render finishes; otherwise re-check load and memory
+            self.released.clear()
+            try:
+                await asyncio.wait_for(self.released.wait(), self.admission.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        self.running += 1
+        return heapq.heappop(self.free_slots)
+
+    def release(self, slot):
+        """
+        Release the slot of a finished render.
+
+        Args:
+            slot (int): Slot returned by acquire().
+        """
+        self.running -= 1
+        heapq.heappush(self.free_slots, slot)
+        self.released.set()
+
+
+async def bounded_as_completed(fn, iterable, window):
+    """
+    Run the coroutine function fn on every item, keeping at most `window` tasks in flight.
+
+    The asynchronous counterpart of scheduler.bounded_map.
+
+    Args:
+        fn (callable): Coroutine function applied to each item.
+        iterable (iterable): Items to process, consumed lazily.
+        window (int): Maximum number of unfinished tasks.
+
+    Yields:
+        Results of fn in completion order.
+    """
+    iterator = iter(iterable)
+    pending = set()
+    # Finished tasks are queued by a callback, so waiting does not scale with the window
+    finished = asyncio.Queue()
+    try:
+        for item in iterator:
+            task = asyncio.ensure_future(fn(item))
+            task.add_done_callback(finished.put_nowait)
+            pending.add(task)
+            if len(pending) >= window:
+                task = await finished.get()
+                pending.discard(task)
+                yield task.result()
+        while pending:
+            task = await finished.get()
+            pending.discard(task)
+            yield task.result()
+    finally:
+        # Cancelling a task kills its render
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.wait(pending)
@@ -0,0 +1,204 @@
+# openscad_export/events.py
+
+"""
+Events and results reported by a batch export.
+
+batch_export() reports every render through an on_event callback instead of leaving callers
+to parse its printed output: ExportStarted when a render starts, then one of ExportFinished,
+ExportFailed or ExportSkipped when the row is done. Result events carry the progress of the
+batch, so a consumer needs nothing else to draw a progress bar. Progress messages go to a
+separate log callback, called with the message and, for warnings and errors, their level. When the batch ends,
+batch_export() returns an ExportResult.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+class ExportError(Exception):
+    """
+    Raised when a batch cannot start because of invalid settings or input files.
+    """
+
+
+@dataclass(frozen=True)
+class BatchStarted:
+    """
+    The batch starts rendering.
+
+    Attributes:
+        total (int): Number of rows to export.
+        jobs (int): Maximum number of concurrent renders.
+        time (float): Wall-clock time of the event (time.time()).
+    """
+
+    total: int
+    jobs: int
+    time: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True)
+class ExportStarted:
+    """
+    A render of a row starts. Sent from the thread running the render.
+
+    Attributes:
+        row (int): Row index in the parameter file.
+        filename (str): Output name of the row (exported_filename).
+        attempt (int): Number of the attempt, starting at 0; retried renders start again.
+        slot (int or None): Render slot running the row, from 0 to BatchStarted.jobs - 1.
+            A slot runs one render at a time; the rows of a packed render share one slot.
+        time (float): Wall-clock time of the event.
+    """
+
+    row: int
+    filename: str
+    attempt: int = 0
+    slot: Optional[int] = None
+    time: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True)
+class ExportFinished:
+    """
+    A row was rendered.
+
+    Attributes:
+        row (int): Row index in the parameter file.
+        files (list of str): Files written, including the copies for rows repeating it.
+        duration (float): Render time in seconds.
+        completed (int), total (int): Rows done and rows to export in the batch.
+        eta (float or None): Estimated remaining time in seconds.
+        time (float): Wall-clock time of the event.
+    """
+
+    row: int
+    files: List[str]
+    duration: float
+    completed: int
+    total: int
+    eta: Optional[float] = None
+    time: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True)
+class ExportFailed:
+    """
+    A row could not be rendered.
+
+    Attributes:
+        row (int): Row index in the parameter file.
+        file (str): First file the row would have written.
+        error (str): OpenSCAD's error message.
+        duration (float): Render time in seconds.
+        timed_out (bool): Whether the render was killed for exceeding the timeout.
+        completed (int), total (int): Rows done and rows to export in the batch.
+        eta (float or None): Estimated remaining time in seconds.
+        time (float): Wall-clock time of the event.
+    """
+
+    row: int
+    file: str
+    error: str
+    duration: float
+    timed_out: bool
+    completed: int
+    total: int
+    eta: Optional[float] = None
+    time: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True)
+class ExportSkipped:
+    """
+    A row was done without rendering it.
+
+    Attributes:
+        row (int): Row index in the parameter file.
+        files (list of str): The row's files; for a cancelled row, the first file it would
+            have written.
+        reason (str): 'cached' if restored from the render cache, 'resumed' if the journal
+            proved it complete, or 'cancelled' if the batch was cancelled first.
+        completed (int), total (int): Rows done and rows to export in the batch.
+        eta (float or None): Estimated remaining time in seconds.
+        time (float): Wall-clock time of the event.
+    """
+
+    row: int
+    files: List[str]
+    reason: str
+    completed: int
+    total: int
+    eta: Optional[float] = None
+    time: float = field(default_factory=time.time)
+
+
+@dataclass(frozen=True)
+class LogMessage:
+    """
+    A progress message of the batch, as the command line prints it.
+
+    Attributes:
+        text (str): The message.
+        level (str): 'info', 'warning' or 'error'.
+        time (float): Wall-clock time of the event.
+    """
+
+    text: str
+    level: str = "info"
+    time: float = field(default_factory=time.time)
+
+
+def print_log(text, level="info"):
+    """
+    Print a progress message of the batch; the default log callback of batch_export().
+
+    Args:
+        text (str): The message.
+        level (str): 'info', 'warning' or 'error'; printed messages do not show it.
+    """
+    print(text)
+
+
+@dataclass
+class ExportResult:
+    """
+    Outcome of a batch export.
+
+    Attributes:
+        succeeded (list of str): Files written or restored, including copies.
+        failed (list of tuple): (file, error) of every row that could not be rendered.
+        cached (list of str): Files restored from the render cache.
+        resumed (list of str): Files an earlier, interrupted run already wrote.
+        timed_out (list of str): Files whose render exceeded the timeout.
+        cancelled (list of str): Files whose render was cancelled.
+        not_started (int): Rows never started because the batch was cancelled.
+        unchanged (int): Rows an incremental export left alone.
+        queued (int): Jobs queued in the spool directory instead of being rendered.
+        mesh_problems (dict): Problems of the exported meshes by file, if inspected.
+        plates (dict or None): Layout of the build plates, if the parts were arranged.
+        duration (float): Wall-clock time of the batch in seconds.
+        interrupted (bool): Whether the batch was cancelled.
+    """
+
+    succeeded: List[str] = field(default_factory=list)
+    failed: List[Tuple[str, str]] = field(default_factory=list)
+    cached: List[str] = field(default_factory=list)
+    resumed: List[str] = field(default_factory=list)
+    timed_out: List[str] = field(default_factory=list)
+    cancelled: List[str] = field(default_factory=list)
+    not_started: int = 0
+    unchanged: int = 0
+    queued: int = 0
+    mesh_problems: Dict[str, List[str]] = field(default_factory=dict)
+    plates: Optional[dict] = None
+    duration: float = 0.0
+    interrupted: bool = False
+
+    @property
+    def ok(self):
+        """
+        bool: Whether the batch ran to the end and every row was exported.
+        """
+        return not self.failed and not self.interrupted
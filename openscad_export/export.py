@@ -10,17 +10,150 @@ Available subcommands:
 - export: Batch export STL files.
 - csv2json: Convert CSV parameter files to JSON.
 - json2csv: Convert JSON parameter files to CSV.
+- cache: Inspect or prune the render cache.
+- history: Show render throughput trends and regressions between runs.
+- worker: Serve renders to a coordinating export on another machine.
+- drain: Render jobs queued in a spool directory by 'export --spool'.
+- merge: Combine the manifests of sharded exports and check them for missing rows.
 - gui: Launch the graphical user interface.
 """
 
 import os
 import csv
+import glob
 import json
+import asyncio
 import subprocess
 import argparse
+import signal
 import sys
 import concurrent.futures
+import itertools
+import math
 import time
+import hashlib
+import threading
+import tempfile
+from datetime import datetime
+
+from openscad_export.cache import (
+    RenderCache,
+    DEFAULT_MAX_SIZE,
+    link_or_copy,
+    parse_size,
+    format_size,
+    hash_file,
+    source_digest,
+)
+from openscad_export.scad import csg_digest, get_openscad_version, unused_parameters
+from openscad_export.watchdog import (
+    WATCHDOG,
+    RenderTimeout,
+    popen_group_kwargs,
+    kill_process_group,
+    limit_address_space,
+)
+from openscad_export.scheduler import (
+    AdmissionController,
+    BatchCancelled,
+    BatchControl,
+    bounded_map,
+    default_jobs,
+    longest_first,
+)
+from openscad_export.history import (
+    RenderHistory,
+    CostModel,
+    EtaEstimator,
+    params_key,
+    format_duration,
+)
+from openscad_export.selection import compile_selection
+from openscad_export.stl import stl_summary
+from openscad_export.distributed import (
+    DEFAULT_PORT,
+    NoWorkers,
+    WorkerPool,
+    serve_worker,
+)
+from openscad_export.packing import (
+    cell_spacing,
+    choose_pack_size,
+    split_mesh,
+    startup_source,
+    wrapper_source,
+)
+from openscad_export.engine import (
+    AsyncAdmission,
+    bounded_as_completed,
+    run_event_loop,
+    run_openscad_async,
+)
+from openscad_export.spool import DEFAULT_LEASE, Spool, drain_spool
+from openscad_export.incremental import (
+    changed_dependencies,
+    dependency_hashes,
+    load_manifest,
+    manifest_entry,
+    prune_outputs,
+    save_manifest,
+    unchanged,
+)
+from openscad_export.events import (
+    BatchStarted,
+    ExportError,
+    ExportFailed,
+    ExportFinished,
+    ExportResult,
+    ExportSkipped,
+    ExportStarted,
+    print_log,
+)
+from openscad_export.arrange import DEFAULT_SPACING, arrange_files, parse_plate
+from openscad_export.inspection import (
+    REPORT_FILE,
+    inspect_files,
+    inspection_available,
+    write_report,
+)
+from openscad_export.journal import (
+    Journal,
+    journal_name,
+    partial_path,
+    remove_partials,
+    row_identity,
+)
+from openscad_export.sharding import (
+    find_manifests,
+    manifest_name,
+    merge_manifests,
+    parse_shard,
+    partition,
+    plan_fingerprint,
+    shared_plan,
+    write_manifest,
+)
+from openscad_export.autotune import choose_flags, recorded_flags, probe_capabilities
+from openscad_export.formats import (
+    FORMAT_EXTENSIONS,
+    MESH_WRITERS,
+    STL_FORMATS,
+    ensure_stl_flavour,
+    import_wrapper,
+    parse_formats,
+    stl_format,
+    transcode,
+)
+
+
+# Rows held at once for longest-first ordering; larger batches are ordered per window
+LPT_WINDOW = 100000
+
+# Rows rendered under every candidate configuration when autotuning
+AUTOTUNE_SAMPLES = 3
+
+# Error of a render that exited successfully without writing its files
+NO_OUTPUT_ERROR = "OpenSCAD wrote no output"
 
 
 def parse_arguments():
@@ -55,9 +188,11 @@ def parse_arguments():
     )
     export_parser.add_argument(
         "--export_format",
-        choices=["asciistl", "binstl"],
         default="binstl",
-        help="Export format: asciistl or binstl. Defaults to binstl.",
+        help=(
+            "Export format, or a comma-separated list of formats rendered from a single "
+            f"evaluation of each row: {', '.join(FORMAT_EXTENSIONS)}. Defaults to binstl."
+        ),
     )
     export_parser.add_argument(
         "--select",
@@ -70,7 +205,9 @@ def parse_arguments():
             "'2,4' (specific indices), "
             "'every:2 in 0-10' (every 2nd index in range), "
             "'from:5' (from index 5 onward), "
-            "'up_to:4' (up to index 4 inclusive). "
+            "'up_to:4' (up to index 4 inclusive), "
+            "'where:gx>=3 and height<5' (rows whose column values match a predicate; "
+            "supports ==, !=, <, <=, >, >=, and, or, not, parentheses and the 'index' pseudo-column). "
             "You can combine multiple selections separated by commas. "
             "Indices are zero-based."
         ),
@@ -80,6 +217,404 @@ def parse_arguments():
         action="store_true",
         help="Disable parallel processing and export sequentially.",
     )
+    export_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum number of concurrent OpenSCAD renders. Defaults to the number of CPUs.",
+    )
+    export_parser.add_argument(
+        "--max_load",
+        type=float,
+        default=None,
+        help="Do not start another render while the one-minute load average is at or above this value.",
+    )
+    export_parser.add_argument(
+        "--max_memory",
+        default=None,
+        help=(
+            "Do not start another render while system memory usage is at or above this limit, "
+            "given as a percentage of total memory (e.g. '80%%') or a size (e.g. '24G')."
+        ),
+    )
+    export_parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help=(
+            "Kill a render (including any processes it started) that runs longer than this "
+            "many seconds and report it as timed out."
+        ),
+    )
+    export_parser.add_argument(
+        "--max_rss",
+        type=parse_size,
+        default=None,
+        help="Kill a render whose resident memory exceeds this size, e.g. '4G'.",
+    )
+    export_parser.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        help="Number of times a timed-out render is retried. Defaults to 0.",
+    )
+    export_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help=(
+            "Reuse previously rendered files from the render cache when neither the model, "
+            "its include<>/use<> files, the parameters, the format nor the OpenSCAD version changed."
+        ),
+    )
+    add_cache_location_arguments(export_parser)
+    export_parser.add_argument(
+        "--order",
+        choices=["longest-first", "file"],
+        default="longest-first",
+        help=(
+            "Order in which renders are started: 'longest-first' starts the renders predicted "
+            "to take longest first (from the timing history), 'file' keeps the parameter file "
+            "order. Defaults to longest-first."
+        ),
+    )
+    export_parser.add_argument(
+        "--history_db",
+        default=None,
+        help="Path to the render history database. Defaults to history.sqlite3 in the cache directory.",
+    )
+    export_parser.add_argument(
+        "--no_history",
+        action="store_true",
+        help="Neither record renders in the history nor use it to order renders and estimate the remaining time.",
+    )
+    export_parser.add_argument(
+        "--prune_unused",
+        action="store_true",
+        help=(
+            "Leave parameters that the model and its include<>/use<> files never read out of "
+            "the -D flags, so rows differing only in them share cache entries and renders."
+        ),
+    )
+    export_parser.add_argument(
+        "--two_stage",
+        action="store_true",
+        help=(
+            "Evaluate every row to a CSG tree first (cheap) and render each distinct tree only "
+            "once (expensive), copying the result to every row with the same geometry."
+        ),
+    )
+    export_parser.add_argument(
+        "--pack",
+        action="store_true",
+        help=(
+            "Render several small parameter sets side by side in one OpenSCAD invocation and "
+            "split the mesh per row. The number per invocation is chosen from the measured "
+            "startup and render times."
+        ),
+    )
+    export_parser.add_argument(
+        "--workers",
+        type=lambda value: [address for address in value.split(",") if address],
+        default=None,
+        help=(
+            "Comma-separated host:port list of render workers started with "
+            "'openscad-export worker'. Rows are rendered on the workers instead of locally."
+        ),
+    )
+    export_parser.add_argument(
+        "--shard",
+        default=None,
+        help=(
+            "Export only part i of n of the selected rows, given as i/n (1 <= i <= n), to run "
+            "one batch as n independent processes. Rows are split by predicted render time "
+            "when the history has predictions and round-robin otherwise. Every shard writes "
+            "a manifest of its results to the output folder."
+        ),
+    )
+    export_parser.add_argument(
+        "--engine",
+        choices=["threads", "asyncio"],
+        default="threads",
+        help=(
+            "How renders are run: on one worker thread each (threads, the default) or all "
+            "from a single asyncio event loop, which needs no thread per render, keeps only "
+            "the tail of each render's error output and kills running renders as soon as "
+            "the export is interrupted."
+        ),
+    )
+    export_parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Skip rows that the journal of the previous run in the output folder proves "
+            "complete, and render only unfinished rows and rows whose files are missing or "
+            "changed."
+        ),
+    )
+    export_parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Render only rows that were added or whose parameters, model files, formats or "
+            "geometry flags changed since the last export to the output folder, as recorded "
+            "in its export manifest. Rows are identified by exported_filename."
+        ),
+    )
+    export_parser.add_argument(
+        "--prune_removed",
+        action="store_true",
+        help=(
+            "Delete the files of rows that were in the last export to the output folder but "
+            "are no longer in the parameter file."
+        ),
+    )
+    export_parser.add_argument(
+        "--inspect",
+        action="store_true",
+        help=(
+            "After exporting, check every STL file for its triangle count, bounding box, "
+            "surface area, volume and watertightness, and write the results to "
+            f"{REPORT_FILE} in the output folder. Requires NumPy."
+        ),
+    )
+    export_parser.add_argument(
+        "--arrange",
+        metavar="PLATE",
+        default=None,
+        help=(
+            "After exporting, arrange the STL files on build plates of this size, given as "
+            "WIDTHxDEPTH (e.g. 256x256), and write one STL file per plate to the 'plates' "
+            "folder inside the output folder. Requires NumPy."
+        ),
+    )
+    export_parser.add_argument(
+        "--spool",
+        default=None,
+        help=(
+            "Queue one job per row in this directory on shared storage instead of rendering. "
+            "The jobs are rendered by 'openscad-export drain' processes on any number of hosts."
+        ),
+    )
+    export_parser.add_argument(
+        "--autotune",
+        action="store_true",
+        help=(
+            "Use the fastest geometry backend and flags (Manifold, fast-csg, lazy-union) that "
+            "the OpenSCAD binary supports and that render a few sample rows identically. "
+            "The choice is recorded and reused by later runs."
+        ),
+    )
+    export_parser.add_argument(
+        "--retune",
+        action="store_true",
+        help="With --autotune, tune again even if a configuration was recorded earlier.",
+    )
+
+    # drain subcommand
+    drain_parser = subparsers.add_parser(
+        "drain", help="Render jobs queued in a spool directory by 'export --spool'."
+    )
+    drain_parser.add_argument("spool_dir", help="Spool directory.")
+    drain_parser.add_argument(
+        "--openscad_path",
+        default="openscad",
+        help='Path to the OpenSCAD executable. Defaults to "openscad" assuming it is in PATH.',
+    )
+    drain_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum number of concurrent renders. Defaults to the number of CPUs.",
+    )
+    drain_parser.add_argument(
+        "--max_load",
+        type=float,
+        default=None,
+        help="Do not start another render while the one-minute load average is at or above this value.",
+    )
+    drain_parser.add_argument(
+        "--max_memory",
+        default=None,
+        help="Do not start another render while memory usage is at or above this limit, e.g. '80%%' or '24G'.",
+    )
+    drain_parser.add_argument(
+        "--lease",
+        type=float,
+        default=DEFAULT_LEASE,
+        help=(
+            "Seconds after which a job claimed by a drain that stopped refreshing its claim "
+            f"is taken over. Defaults to {DEFAULT_LEASE:.0f}."
+        ),
+    )
+    drain_parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="Keep waiting for new jobs instead of exiting once the spool is empty.",
+    )
+
+    # merge subcommand
+    merge_parser = subparsers.add_parser(
+        "merge", help="Combine the manifests of a sharded export and check for missing rows."
+    )
+    merge_parser.add_argument(
+        "manifests",
+        nargs="+",
+        help="Shard manifests, or folders containing them.",
+    )
+    merge_parser.add_argument(
+        "--output",
+        default=None,
+        help="Path of the combined manifest. Defaults to manifest.json next to the first manifest.",
+    )
+
+    # inspect subcommand
+    inspect_parser = subparsers.add_parser(
+        "inspect", help="Check STL files for empty, open or inverted meshes. Requires NumPy."
+    )
+    inspect_parser.add_argument(
+        "paths",
+        nargs="+",
+        help="STL files, or folders whose STL files are checked.",
+    )
+    inspect_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of files checked at once. Defaults to the number of CPUs.",
+    )
+    inspect_parser.add_argument(
+        "--output",
+        default=None,
+        help="Path of the JSON report. By default no report is written.",
+    )
+
+    # arrange subcommand
+    arrange_parser = subparsers.add_parser(
+        "arrange", help="Arrange STL files on build plates. Requires NumPy."
+    )
+    arrange_parser.add_argument(
+        "paths",
+        nargs="+",
+        help="STL files, or folders whose STL files are arranged.",
+    )
+    arrange_parser.add_argument(
+        "--plate",
+        required=True,
+        help="Size of a build plate as WIDTHxDEPTH, e.g. 256x256.",
+    )
+    arrange_parser.add_argument(
+        "--spacing",
+        type=float,
+        default=DEFAULT_SPACING,
+        help=f"Minimum distance between parts. Defaults to {DEFAULT_SPACING:g}.",
+    )
+    arrange_parser.add_argument(
+        "--no_rotate",
+        action="store_true",
+        help="Never turn parts by 90 degrees to fit them better.",
+    )
+    arrange_parser.add_argument(
+        "--output_folder",
+        default=None,
+        help="Folder for the plate files. Defaults to 'plates' inside the first folder given.",
+    )
+    arrange_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of files read or written at once. Defaults to the number of CPUs.",
+    )
+
+    # worker subcommand
+    worker_parser = subparsers.add_parser(
+        "worker", help="Serve renders to a coordinating export on another machine."
+    )
+    worker_parser.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help=(
+            "Address to listen on. Defaults to 127.0.0.1; use 0.0.0.0 to accept other "
+            "machines. Only expose workers on trusted networks."
+        ),
+    )
+    worker_parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"Port to listen on. Defaults to {DEFAULT_PORT}.",
+    )
+    worker_parser.add_argument(
+        "--openscad_path",
+        default="openscad",
+        help='Path to the OpenSCAD executable. Defaults to "openscad" assuming it is in PATH.',
+    )
+    worker_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="Maximum number of concurrent renders. Defaults to the number of CPUs.",
+    )
+    worker_parser.add_argument(
+        "--max_load",
+        type=float,
+        default=None,
+        help="Do not start another render while the one-minute load average is at or above this value.",
+    )
+    worker_parser.add_argument(
+        "--max_memory",
+        default=None,
+        help="Do not start another render while memory usage is at or above this limit, e.g. '80%%' or '24G'.",
+    )
+    worker_parser.add_argument(
+        "--bundle_dir",
+        default=None,
+        help="Directory for models received from coordinators. Defaults to worker-bundles in the cache directory.",
+    )
+
+    # cache subcommand
+    cache_parser = subparsers.add_parser("cache", help="Inspect or prune the render cache.")
+    cache_subparsers = cache_parser.add_subparsers(
+        dest="cache_command", required=True, help="Cache commands"
+    )
+    cache_stats_parser = cache_subparsers.add_parser(
+        "stats", help="Show the number and total size of cached renders."
+    )
+    add_cache_location_arguments(cache_stats_parser)
+    cache_prune_parser = cache_subparsers.add_parser(
+        "prune",
+        help="Evict least-recently-used renders until the cache fits within --cache_max_size.",
+    )
+    add_cache_location_arguments(cache_prune_parser)
+
+    # history subcommand
+    history_parser = subparsers.add_parser(
+        "history", help="Show render throughput trends and regressions between runs."
+    )
+    history_parser.add_argument(
+        "--scad_file", default=None, help="Only show runs of this OpenSCAD (.scad) file."
+    )
+    history_parser.add_argument(
+        "--limit", type=int, default=10, help="Number of recent runs to show. Defaults to 10."
+    )
+    history_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help=(
+            "Relative slowdown between the two most recent runs of a model above which a "
+            "parameter set is reported as a regression. Defaults to 0.2 (20%%)."
+        ),
+    )
+    history_parser.add_argument(
+        "--history_db",
+        default=None,
+        help="Path to the render history database. Defaults to history.sqlite3 in the cache directory.",
+    )
 
     # csv2json subcommand
     csv2json_parser = subparsers.add_parser(
@@ -103,6 +638,29 @@ def parse_arguments():
     return parser.parse_args()
 
 
+def add_cache_location_arguments(parser):
+    """
+    Add the options selecting the render cache location and size limit to a parser.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to extend.
+    """
+    parser.add_argument(
+        "--cache_dir",
+        default=None,
+        help=(
+            "Directory of the render cache. Defaults to $OPENSCAD_EXPORT_CACHE or the "
+            "user cache directory (e.g., ~/.cache/openscad-export)."
+        ),
+    )
+    parser.add_argument(
+        "--cache_max_size",
+        type=parse_size,
+        default=DEFAULT_MAX_SIZE,
+        help="Maximum size of the render cache, e.g. '500M' or '10G'. Defaults to 5G.",
+    )
+
+
 def read_csv(csv_path):
     """
     Read parameters from a CSV file.
@@ -113,10 +671,38 @@ def read_csv(csv_path):
     Returns:
         list of dict: List of parameter dictionaries.
     """
+    return list(iter_csv(csv_path))
+
+
+def iter_csv(csv_path):
+    """
+    Lazily read parameters from a CSV file, one row at a time.
+
+    Args:
+        csv_path (str): Path to the CSV file.
+
+    Yields:
+        dict: Parameter dictionary of each row.
+    """
     with open(csv_path, newline="") as csvfile:
-        reader = csv.DictReader(csvfile)
-        parameters = [row for row in reader]
-    return parameters
+        for row in csv.DictReader(csvfile):
+            yield row
+
+
+def count_csv_rows(csv_path):
+    """
+    Count the parameter rows of a CSV file without building parameter dictionaries.
+
+    Args:
+        csv_path (str): Path to the CSV file.
+
+    Returns:
+        int: Number of rows, excluding the header.
+    """
+    with open(csv_path, newline="") as csvfile:
+        # csv.reader handles quoted fields spanning several lines; blank lines are
+        # skipped just like csv.DictReader does
+        return max(sum(1 for row in csv.reader(csvfile) if row) - 1, 0)
 
 
 def read_json(json_path):
@@ -140,6 +726,58 @@ def read_json(json_path):
     return parameters
 
 
+def iter_parameters(parameter_file):
+    """
+    Lazily iterate over the parameter sets of a CSV or JSON file.
+
+    CSV files are streamed row by row. JSON files have to be parsed as a whole, but the
+    parameter dictionaries are still produced one at a time.
+
+    Args:
+        parameter_file (str): Path to the CSV or JSON file containing parameters.
+
+    Returns:
+        tuple:
+            int: Total number of parameter sets.
+            iterator of dict: Parameter dictionaries in file order.
+
+    Raises:
+        ValueError: If the file extension is not supported.
+    """
+    _, ext = os.path.splitext(parameter_file)
+    ext = ext.lower()
+    if ext == ".csv":
+        return count_csv_rows(parameter_file), iter_csv(parameter_file)
+    elif ext == ".json":
+        parameters = read_json(parameter_file)
+        return len(parameters), iter(parameters)
+    raise ValueError(f"Unsupported parameter file format: {ext}")
+
+
+def parameter_columns(parameter_file):
+    """
+    Return the parameter names used in a CSV or JSON file.
+
+    Args:
+        parameter_file (str): Path to the CSV or JSON file containing parameters.
+
+    Returns:
+        list of str: Parameter names in file order, without 'exported_filename'.
+
+    Raises:
+        ValueError: If the file extension is not supported.
+    """
+    _, ext = os.path.splitext(parameter_file)
+    if ext.lower() == ".csv":
+        with open(parameter_file, newline="") as csvfile:
+            columns = next(csv.reader(csvfile), [])
+    else:
+        _, parameters = iter_parameters(parameter_file)
+        # Parameter sets of a JSON file may each define different keys
+        columns = list(dict.fromkeys(key for params in parameters for key in params))
+    return [column for column in columns if column != "exported_filename"]
+
+
 def ensure_output_folder(folder):
     """
     Ensure that the output folder exists; create it if it does not.
@@ -151,105 +789,45 @@ def ensure_output_folder(folder):
         os.makedirs(folder)
 
 
-def parse_selection(selection_str, total_params):
+def parse_selection(selection_str, total_params, parameter_file=None):
     """
-    Parse a selection string and return a sorted list of unique indices.
+    Parse a selection string into a compact Selection of parameter set indices.
+
+    Ranges are stored as intervals and strides rather than expanded into individual indices,
+    so selections over very large parameter files stay cheap. 'where:' clauses select rows by
+    their column values and read the columns they reference from parameter_file.
 
     Args:
-        selection_str (str): Selection string (e.g., "0-5,7,10-12, every:2 in 0-10, from:15, up_to:20").
+        selection_str (str): Selection string (e.g., "0-5,7,10-12, every:2 in 0-10, from:15, up_to:20, where:gx>=3 and height<5").
         total_params (int): Total number of parameter sets.
+        parameter_file (str or None): Path to the parameter file, required for 'where:' clauses.
 
     Returns:
-        list of int: Sorted list of unique selected indices.
+        Selection: Selected indices; supports membership tests, len() and ascending iteration.
 
     Raises:
         ValueError: If the selection string is invalid.
     """
-    selected_indices = set()
-    parts = selection_str.split(",")
-    for part in parts:
-        part = part.strip()
-        if not part:
-            continue
-        if part.startswith("every:"):
-            try:
-                _, rest = part.split(":", 1)
-                step, range_part = rest.split(" in ")
-                step = int(step)
-                start, end = map(int, range_part.split("-"))
-                if start > end:
-                    raise ValueError(f"Invalid range '{range_part}': start > end.")
-                for i in range(start, end + 1, step):
-                    if i < 0 or i >= total_params:
-                        raise ValueError(
-                            f"Index {i} out of range (0-{total_params -1})."
-                        )
-                    selected_indices.add(i)
-            except ValueError as ve:
-                raise ValueError(f"Invalid step selection '{part}': {ve}")
-        elif part.startswith("from:"):
-            try:
-                _, start_str = part.split(":", 1)
-                start = int(start_str)
-                if start < 0 or start >= total_params:
-                    raise ValueError(
-                        f"Start index {start} out of range (0-{total_params -1})."
-                    )
-                for i in range(start, total_params):
-                    selected_indices.add(i)
-            except ValueError as ve:
-                raise ValueError(f"Invalid 'from' selection '{part}': {ve}")
-        elif part.startswith("up_to:"):
-            try:
-                _, end_str = part.split(":", 1)
-                end = int(end_str)
-                if end < 0 or end >= total_params:
-                    raise ValueError(
-                        f"End index {end} out of range (0-{total_params -1})."
-                    )
-                for i in range(0, end + 1):
-                    selected_indices.add(i)
-            except ValueError as ve:
-                raise ValueError(f"Invalid 'up_to' selection '{part}': {ve}")
-        elif "-" in part:
-            try:
-                start, end = map(int, part.split("-"))
-                if start > end:
-                    raise ValueError(f"Invalid range '{part}': start > end.")
-                for i in range(start, end + 1):
-                    if i < 0 or i >= total_params:
-                        raise ValueError(
-                            f"Index {i} out of range (0-{total_params -1})."
-                        )
-                    selected_indices.add(i)
-            except ValueError as ve:
-                raise ValueError(f"Invalid range '{part}': {ve}")
-        else:
-            try:
-                index = int(part)
-                if index < 0 or index >= total_params:
-                    raise ValueError(
-                        f"Index {index} out of range (0-{total_params -1})."
-                    )
-                selected_indices.add(index)
-            except ValueError as ve:
-                raise ValueError(f"Invalid index '{part}': {ve}")
-    return sorted(selected_indices)
+    rows = None
+    if parameter_file is not None:
+        rows = lambda: iter_parameters(parameter_file)[1]  # noqa: E731
+    return compile_selection(selection_str, total_params, rows)
 
 
-def construct_d_flags(params):
+def construct_d_flags(params, ignored=()):
     """
     Construct a list of -D flags for OpenSCAD based on parameters.
 
     Args:
         params (dict): Dictionary of parameters.
+        ignored (collection of str): Parameters to leave out, e.g. ones the model never reads.
 
     Returns:
         list of str: List of -D flags.
     """
     d_flags = []
     for key, value in params.items():
-        if key != "exported_filename":
+        if key != "exported_filename" and key not in ignored:
             if isinstance(value, bool):
                 # Booleans should be lowercased and not quoted
                 d_flags.append(f"-D{key}={'true' if value else 'false'}")
@@ -288,47 +866,758 @@ def construct_d_flags(params):
     return d_flags
 
 
-def export_stl(openscad_path, scad_file, output_file, export_format, d_flags):
+def run_openscad(
+    openscad_path,
+    scad_file,
+    output_args,
+    d_flags,
+    timeout=None,
+    max_rss=None,
+    extra_flags=None,
+    renders=None,
+):
     """
-    Export an STL file using OpenSCAD with the specified parameters.
+    Run OpenSCAD once under the watchdog.
+
+    OpenSCAD runs in its own process group under the watchdog, which kills the whole group
+    when the render exceeds `timeout` or `max_rss`.
 
     Args:
         openscad_path (str): Path to the OpenSCAD executable.
         scad_file (str): Path to the OpenSCAD (.scad) file.
-        output_file (str): Path where the STL file will be saved.
-        export_format (str): Export format ('asciistl' or 'binstl').
+        output_args (list of str): Output options, e.g. ['-o', 'model.stl'].
         d_flags (list of str): List of -D flags for OpenSCAD.
+        timeout (float or None): Maximum wall-clock time of the render in seconds.
+        max_rss (int or None): Maximum resident memory of the render in bytes.
+        extra_flags (list of str or None): Further OpenSCAD options, e.g. '--backend=manifold'.
+        renders (RenderGroup or None): Group the render is paused, resumed and cancelled with.
 
     Returns:
         tuple:
             bool: Success status.
             str: Error message if any.
             float: Duration of the export process in seconds.
+
+    Raises:
+        RenderTimeout: If the render was killed for exceeding `timeout`.
     """
     start_time = time.perf_counter()
-    command = (
-        [
-            openscad_path,
-            "-o",
-            output_file,
-            f"--export-format={export_format}",
-        ]
-        + d_flags
-        + [scad_file]
+    # Time spent paused counts towards neither the timeout nor the duration
+    renders = renders or WATCHDOG.renders
+    paused_before = renders.paused_seconds()
+    command = [openscad_path] + output_args + (extra_flags or []) + d_flags + [scad_file]
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        **popen_group_kwargs(),
+    )
+    limit_address_space(process.pid, max_rss)
+    watched = WATCHDOG.watch(process, timeout, max_rss, renders)
+    try:
+        _, stderr = process.communicate()
+    finally:
+        WATCHDOG.unwatch(watched)
+        # Never leave a render or its children running, e.g. when interrupted while waiting
+        kill_process_group(process)
+    duration = (
+        time.perf_counter() - start_time - (renders.paused_seconds() - paused_before)
+    )
+    if watched.killed == "timeout":
+        raise RenderTimeout(timeout, duration)
+    if watched.killed == "memory":
+        return (
+            False,
+            f"Killed after exceeding the memory limit of {format_size(max_rss)}.",
+            duration,
+        )
+    if watched.killed == "cancelled":
+        return False, "Cancelled.", duration
+    if process.returncode != 0:
+        return False, stderr.decode(errors="replace").strip(), duration
+    return True, "", duration
+
+
+def export_stl(
+    openscad_path,
+    scad_file,
+    output_file,
+    export_format,
+    d_flags,
+    timeout=None,
+    max_rss=None,
+    extra_flags=None,
+    renders=None,
+):
+    """
+    Export an STL file using OpenSCAD with the specified parameters.
+
+    Args:
+        openscad_path (str): Path to the OpenSCAD executable.
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+        output_file (str): Path where the STL file will be saved.
+        export_format (str): Export format, e.g. 'asciistl', 'binstl' or 'png'.
+        d_flags (list of str): List of -D flags for OpenSCAD.
+        timeout (float or None): Maximum wall-clock time of the render in seconds.
+        max_rss (int or None): Maximum resident memory of the render in bytes.
+        extra_flags (list of str or None): Further OpenSCAD options, e.g. '--backend=manifold'.
+        renders (RenderGroup or None): Group the render is paused, resumed and cancelled with.
+
+    Returns:
+        tuple:
+            bool: Success status.
+            str: Error message if any.
+            float: Duration of the export process in seconds.
+
+    Raises:
+        RenderTimeout: If the render was killed for exceeding `timeout`.
+    """
+    return run_openscad(
+        openscad_path,
+        scad_file,
+        ["-o", output_file, f"--export-format={export_format}"],
+        d_flags,
+        timeout,
+        max_rss,
+        extra_flags,
+        renders,
     )
-    print(f"Running command: {' '.join(command)}")  # Debug print
+
+
+def check_written(result, paths):
+    """
+    Turn a successful render that did not write all of its files into a failure.
+
+    Older OpenSCAD releases exit successfully without writing anything when the model has
+    no top-level geometry.
+
+    Args:
+        result (tuple): (success, error, duration) of the render.
+        paths (list of str): Files the render should have written.
+
+    Returns:
+        tuple: The result, or a failure if a file is missing.
+    """
+    success, error, duration = result
+    if success and not all(os.path.exists(path) for path in paths):
+        return False, NO_OUTPUT_ERROR, duration
+    return result
+
+
+def output_size(paths):
+    """
+    Return the total size of the files of a render.
+
+    Args:
+        paths (list of str): Files written by the render.
+
+    Returns:
+        int or None: Size in bytes, or None if a file is missing.
+    """
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def export_outputs(
+    openscad_path,
+    scad_file,
+    outputs,
+    d_flags,
+    timeout=None,
+    max_rss=None,
+    extra_flags=None,
+    multiple_outputs=False,
+    renders=None,
+):
+    """
+    Export one parameter set in several formats while evaluating the model only once.
+
+    With `multiple_outputs`, all formats are written by a single OpenSCAD invocation with
+    several -o options. Otherwise the model is rendered once to STL, the other mesh formats
+    are converted in-process and PNG images are rendered from a wrapper that only imports
+    the mesh.
+
+    Args:
+        openscad_path (str): Path to the OpenSCAD executable.
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+        outputs (list of tuple): (format, path) pairs to write.
+        d_flags (list of str): List of -D flags for OpenSCAD.
+        timeout (float or None): Maximum wall-clock time of each invocation in seconds.
+        max_rss (int or None): Maximum resident memory of each invocation in bytes.
+        extra_flags (list of str or None): Further OpenSCAD options, e.g. '--backend=manifold'.
+        multiple_outputs (bool): Whether the OpenSCAD version accepts several -o options.
+        renders (RenderGroup or None): Group the invocations are paused, resumed and cancelled
+            with.
+
+    Returns:
+        tuple:
+            bool: Success status.
+            str: Error message if any.
+            float: Total duration of the OpenSCAD invocations in seconds.
+
+    Raises:
+        RenderTimeout: If an invocation was killed for exceeding `timeout`.
+    """
+    if len(outputs) == 1:
+        fmt, path = outputs[0]
+        return check_written(
+            export_stl(
+                openscad_path,
+                scad_file,
+                path,
+                fmt,
+                d_flags,
+                timeout,
+                max_rss,
+                extra_flags,
+                renders,
+            ),
+            [path],
+        )
+
+    formats = [fmt for fmt, _ in outputs]
+    if multiple_outputs:
+        output_args = []
+        for _, path in outputs:
+            output_args += ["-o", path]
+        # --export-format would apply to every output, so the STL flavour is fixed afterwards
+        success, error, duration = check_written(
+            run_openscad(
+                openscad_path,
+                scad_file,
+                output_args,
+                d_flags,
+                timeout,
+                max_rss,
+                extra_flags,
+                renders,
+            ),
+            [path for _, path in outputs],
+        )
+        if success:
+            for fmt, path in outputs:
+                if fmt in STL_FORMATS:
+                    ensure_stl_flavour(path, fmt)
+        return success, error, duration
+
+    mesh_format = stl_format(formats)
+    if mesh_format is not None:
+        mesh_file = dict(outputs)[mesh_format]
+    else:
+        mesh_format = "binstl"
+        first_path = outputs[0][1]
+        mesh_file = f"{first_path}.{os.getpid()}.mesh.stl"
     try:
-        subprocess.run(
-            command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        success, error, duration = check_written(
+            export_stl(
+                openscad_path,
+                scad_file,
+                mesh_file,
+                mesh_format,
+                d_flags,
+                timeout,
+                max_rss,
+                extra_flags,
+                renders,
+            ),
+            [mesh_file],
         )
-        end_time = time.perf_counter()
-        duration = end_time - start_time
+        if not success:
+            return success, error, duration
+        transcode(
+            mesh_file,
+            [(fmt, path) for fmt, path in outputs if fmt in MESH_WRITERS and path != mesh_file],
+        )
+        for fmt, path in outputs:
+            if fmt != "png":
+                continue
+            wrapper_file = f"{path}.{os.getpid()}.scad"
+            with open(wrapper_file, "w") as f:
+                f.write(import_wrapper(mesh_file))
+            try:
+                success, error, png_duration = check_written(
+                    export_stl(
+                        openscad_path,
+                        wrapper_file,
+                        path,
+                        "png",
+                        [],
+                        timeout,
+                        max_rss,
+                        renders=renders,
+                    ),
+                    [path],
+                )
+            finally:
+                os.remove(wrapper_file)
+            duration += png_duration
+            if not success:
+                return success, error, duration
         return True, "", duration
-    except subprocess.CalledProcessError as e:
-        error_message = e.stderr.decode().strip()
-        end_time = time.perf_counter()
-        duration = end_time - start_time
-        return False, error_message, duration
+    finally:
+        if mesh_file not in dict(outputs).values() and os.path.exists(mesh_file):
+            os.remove(mesh_file)
+
+
+async def export_outputs_async(
+    openscad_path,
+    scad_file,
+    outputs,
+    d_flags,
+    timeout=None,
+    max_rss=None,
+    extra_flags=None,
+    multiple_outputs=False,
+    renders=None,
+):
+    """
+    Event loop counterpart of export_outputs, taking the same arguments.
+
+    Single invocations run on the event loop; exports that convert the mesh in-process or
+    render PNG images from it run export_outputs on a thread.
+
+    Returns:
+        tuple:
+            bool: Success status.
+            str: Error message if any.
+            float: Total duration of the OpenSCAD invocations in seconds.
+
+    Raises:
+        RenderTimeout: If an invocation was killed for exceeding `timeout`.
+    """
+    if len(outputs) == 1:
+        fmt, path = outputs[0]
+        output_args = ["-o", path, f"--export-format={fmt}"]
+    elif multiple_outputs:
+        output_args = []
+        for _, path in outputs:
+            output_args += ["-o", path]
+    else:
+        return await asyncio.get_event_loop().run_in_executor(
+            None,
+            export_outputs,
+            openscad_path,
+            scad_file,
+            outputs,
+            d_flags,
+            timeout,
+            max_rss,
+            extra_flags,
+            multiple_outputs,
+            renders,
+        )
+    success, error, duration = check_written(
+        await run_openscad_async(
+            openscad_path,
+            scad_file,
+            output_args,
+            d_flags,
+            timeout,
+            max_rss,
+            extra_flags,
+            renders,
+        ),
+        [path for _, path in outputs],
+    )
+    if success and len(outputs) > 1:
+        for fmt, path in outputs:
+            if fmt in STL_FORMATS:
+                ensure_stl_flavour(path, fmt)
+    return success, error, duration
+
+
+def evaluate_csg(
+    openscad_path, scad_file, csg_file, d_flags, timeout=None, max_rss=None, renders=None
+):
+    """
+    Evaluate a parameter set to a CSG tree without rendering its geometry.
+
+    Args:
+        openscad_path (str): Path to the OpenSCAD executable.
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+        csg_file (str): Path where the .csg file will be saved.
+        d_flags (list of str): List of -D flags for OpenSCAD.
+        timeout (float or None): Maximum wall-clock time of the evaluation in seconds.
+        max_rss (int or None): Maximum resident memory of the evaluation in bytes.
+        renders (RenderGroup or None): Group the evaluation is paused, resumed and cancelled
+            with.
+
+    Returns:
+        str or None: Digest of the normalised tree, or None if the evaluation failed.
+    """
+    try:
+        success, _, _ = run_openscad(
+            openscad_path,
+            scad_file,
+            ["-o", csg_file],
+            d_flags,
+            timeout,
+            max_rss,
+            renders=renders,
+        )
+    except RenderTimeout:
+        return None
+    if not success or not os.path.isfile(csg_file):
+        return None
+    return csg_digest(csg_file)
+
+
+def plan_geometry(
+    openscad_path, scad_file, rows, admission, timeout=None, max_rss=None, renders=None
+):
+    """
+    Evaluate rows to CSG trees in parallel and group the rows that produce the same tree.
+
+    The .csg files are written next to the model, so that relative paths in import() and
+    surface() calls keep resolving when the trees are rendered. Only the file of the first
+    row of every distinct tree is kept.
+
+    Args:
+        openscad_path (str): Path to the OpenSCAD executable.
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+        rows (iterable of tuple): (index, output name, -D flags) of every row to evaluate.
+        admission (AdmissionController): Limits the number of concurrent evaluations.
+        timeout (float or None): Maximum wall-clock time of an evaluation in seconds.
+        max_rss (int or None): Maximum resident memory of an evaluation in bytes.
+        renders (RenderGroup or None): Group the evaluations are paused, resumed and
+            cancelled with.
+
+    Returns:
+        tuple:
+            list of tuple: (index, index of the first row with the same tree, output name)
+                for every row whose tree repeats an earlier one.
+            dict: Index of the first row of every distinct tree mapped to its .csg file.
+                Rows that failed to evaluate are in neither result.
+    """
+    directory = os.path.dirname(os.path.abspath(scad_file))
+    prefix = f".{os.path.basename(scad_file)}.{os.getpid()}"
+
+    def evaluate(row):
+        idx, filename, d_flags = row
+        csg_file = os.path.join(directory, f"{prefix}.{idx}.csg")
+        try:
+            with admission:
+                digest = evaluate_csg(
+                    openscad_path, scad_file, csg_file, d_flags, timeout, max_rss, renders
+                )
+        except BatchCancelled:
+            # Rendering the row later reports it as cancelled
+            digest = None
+        return idx, filename, csg_file, digest
+
+    first_row = {}
+    same_tree = []
+    csg_files = {}
+    with concurrent.futures.ThreadPoolExecutor(admission.jobs) as executor:
+        for idx, filename, csg_file, digest in bounded_map(
+            executor, evaluate, rows, admission.jobs * 2
+        ):
+            if digest is not None and digest not in first_row:
+                first_row[digest] = idx
+                csg_files[idx] = csg_file
+                continue
+            if digest is not None:
+                same_tree.append((idx, first_row[digest], filename))
+            if os.path.exists(csg_file):
+                os.remove(csg_file)
+    return same_tree, csg_files
+
+
+def calibrate_packing(
+    openscad_path,
+    scad_file,
+    samples,
+    timeout=None,
+    max_rss=None,
+    extra_flags=None,
+    renders=None,
+):
+    """
+    Measure whether packing several parameter sets into one invocation pays off.
+
+    The startup cost is measured by exporting a model that only parses the model and its
+    libraries; the render cost and the size of the models from rendering sample rows.
+
+    Args:
+        openscad_path (str): Path to the OpenSCAD executable.
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+        samples (list of list of str): -D flags of the sample rows.
+        timeout (float or None): Maximum wall-clock time of each render in seconds.
+        max_rss (int or None): Maximum resident memory of each render in bytes.
+        extra_flags (list of str or None): Further OpenSCAD options, e.g. '--backend=manifold'.
+        renders (RenderGroup or None): Group the renders are paused, resumed and cancelled
+            with.
+
+    Returns:
+        tuple:
+            int: Parameter sets per invocation; 1 if packing does not pay off or the
+                calibration failed.
+            float or None: Grid spacing for packed models.
+    """
+    scad_file = os.path.abspath(scad_file)
+    wrapper_file = os.path.join(
+        os.path.dirname(scad_file),
+        f".{os.path.basename(scad_file)}.{os.getpid()}.startup.scad",
+    )
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(wrapper_file, "w") as f:
+                f.write(startup_source(scad_file))
+            success, _, startup_time = run_openscad(
+                openscad_path,
+                wrapper_file,
+                ["-o", os.path.join(tmp_dir, "startup.csg")],
+                [],
+                timeout,
+                max_rss,
+                renders=renders,
+            )
+            if not success:
+                return 1, None
+            render_times = []
+            boxes = []
+            for number, d_flags in enumerate(samples):
+                output_file = os.path.join(tmp_dir, f"sample_{number}.stl")
+                success, _, duration = export_stl(
+                    openscad_path,
+                    scad_file,
+                    output_file,
+                    "asciistl",
+                    d_flags,
+                    timeout,
+                    max_rss,
+                    extra_flags,
+                    renders,
+                )
+                _, box = stl_summary(output_file) if success else (0, None)
+                if box is None:
+                    return 1, None
+                render_times.append(duration)
+                boxes.append(box)
+    except RenderTimeout:
+        return 1, None
+    finally:
+        if os.path.exists(wrapper_file):
+            os.remove(wrapper_file)
+    if not render_times:
+        return 1, None
+    render_time = sum(render_times) / len(render_times) - startup_time
+    return choose_pack_size(startup_time, render_time), cell_spacing(boxes)
+
+
+def export_pack(
+    openscad_path,
+    scad_file,
+    variants,
+    spacing,
+    timeout=None,
+    max_rss=None,
+    extra_flags=None,
+    renders=None,
+):
+    """
+    Render several parameter sets with a single OpenSCAD invocation.
+
+    Args:
+        openscad_path (str): Path to the OpenSCAD executable.
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+        variants (list of list of str): -D flags of every parameter set.
+        spacing (float): Grid spacing from calibrate_packing().
+        timeout (float or None): Maximum wall-clock time per parameter set in seconds.
+        max_rss (int or None): Maximum resident memory of the invocation in bytes.
+        extra_flags (list of str or None): Further OpenSCAD options, e.g. '--backend=manifold'.
+        renders (RenderGroup or None): Group the render is paused, resumed and cancelled with.
+
+    Returns:
+        tuple:
+            list of list or None: Triangles of every parameter set, or None if the render
+                failed or the mesh could not be split.
+            str: Error message if any.
+            float: Duration of the invocation in seconds.
+
+    Raises:
+        RenderTimeout: If the invocation was killed for exceeding its timeout.
+    """
+    scad_file = os.path.abspath(scad_file)
+    # Next to the model, so relative paths inside it resolve as usual
+    wrapper_file = os.path.join(
+        os.path.dirname(scad_file),
+        f".{os.path.basename(scad_file)}.{os.getpid()}.{threading.get_ident()}.pack.scad",
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mesh_file = os.path.join(tmp_dir, "pack.stl")
+        with open(wrapper_file, "w") as f:
+            f.write(wrapper_source(scad_file, variants, spacing))
+        try:
+            # ASCII output keeps more precision for models far from the origin
+            success, error, duration = export_stl(
+                openscad_path,
+                wrapper_file,
+                mesh_file,
+                "asciistl",
+                [],
+                timeout * len(variants) if timeout is not None else None,
+                max_rss,
+                extra_flags,
+                renders,
+            )
+        finally:
+            os.remove(wrapper_file)
+        if not success:
+            return None, error, duration
+        meshes = split_mesh(mesh_file, len(variants), spacing)
+        if meshes is None:
+            return None, "Packed models overlap their grid cells.", duration
+        return meshes, "", duration
+
+
+def predict_duration(cost_model, param_set, ignored=()):
+    """
+    Predict the render duration of a parameter set.
+
+    Args:
+        cost_model (CostModel or None): Model predicting durations from the history.
+        param_set (dict): Parameter set of the row.
+        ignored (collection of str): Parameters left out of the -D flags.
+
+    Returns:
+        float or None: Predicted duration in seconds, or None if there is no prediction.
+    """
+    if cost_model is None:
+        return None
+    return cost_model.predict(params_key(construct_d_flags(param_set, ignored)), param_set)
+
+
+def predict_durations(parameter_file, selected_indices, cost_model, ignored=()):
+    """
+    Predict the render duration of every selected parameter set.
+
+    The predictions are produced lazily, so no per-row state is kept.
+
+    Args:
+        parameter_file (str): Path to the CSV or JSON file containing parameters.
+        selected_indices (Selection or None): Selected indices, or None for all rows.
+        cost_model (CostModel or None): Model predicting durations from the history.
+        ignored (collection of str): Parameters left out of the -D flags.
+
+    Yields:
+        tuple: Row index and predicted duration in seconds, or None if there is no
+            prediction, of every selected row in file order.
+    """
+    _, rows = iter_parameters(parameter_file)
+    if selected_indices is not None:
+        rows = itertools.islice(rows, selected_indices.stop)
+    for idx, param_set in enumerate(rows):
+        if selected_indices is None or idx in selected_indices:
+            yield idx, predict_duration(cost_model, param_set, ignored)
+
+
+def sample_rows(parameter_file, selected_indices, total_params, count):
+    """
+    Pick parameter sets spread evenly over the selection.
+
+    Args:
+        parameter_file (str): Path to the CSV or JSON file containing parameters.
+        selected_indices (Selection or None): Selected indices, or None for all rows.
+        total_params (int): Number of parameter sets in the file.
+        count (int): Maximum number of rows to pick.
+
+    Returns:
+        list of dict: Picked parameter sets.
+    """
+    indices = selected_indices if selected_indices is not None else range(total_params)
+    total = len(indices)
+    if not total:
+        return []
+    count = min(count, total)
+    positions = {round(i * (total - 1) / max(count - 1, 1)) for i in range(count)}
+    picked = {idx for position, idx in enumerate(indices) if position in positions}
+    _, rows = iter_parameters(parameter_file)
+    rows = itertools.islice(rows, max(picked) + 1)
+    return [param_set for idx, param_set in enumerate(rows) if idx in picked]
+
+
+def plan_duplicates(parameter_file, selected_indices, ignored=()):
+    """
+    Find selected rows that repeat an earlier row and output names used more than once.
+
+    Rows are compared by their canonical -D flags, so rows that differ only in column order
+    or in the formatting of numbers are rendered once and copied to every requested name.
+
+    Args:
+        parameter_file (str): Path to the CSV or JSON file containing parameters.
+        selected_indices (Selection or None): Selected indices, or None for all rows.
+        ignored (collection of str): Parameters left out of the -D flags.
+
+    Returns:
+        tuple:
+            dict: Row index of every duplicate row mapped to the index of the row it repeats.
+            dict: Row index of every rendered row mapped to the extra file names it is copied to.
+            dict: Output name mapped to the row indices using it, for names used by rows with
+                different parameters.
+    """
+    _, rows = iter_parameters(parameter_file)
+    if selected_indices is not None:
+        rows = itertools.islice(rows, selected_indices.stop)
+    # Short digests of the parameters and names keep the planning memory small and
+    # independent of the length of the rows for very large parameter files
+    first_row = {}
+    names = {}
+    duplicate_of = {}
+    copies = {}
+    collisions = {}
+    for idx, param_set in enumerate(rows):
+        if selected_indices is not None and idx not in selected_indices:
+            continue
+        digest = hashlib.blake2b(
+            params_key(construct_d_flags(param_set, ignored)).encode(), digest_size=16
+        ).digest()
+        filename = str(param_set.get("exported_filename", f"model_{idx}"))
+        name = hashlib.blake2b(filename.encode(), digest_size=16).digest()
+        if name in names:
+            other_idx, other_digest = names[name]
+            if other_digest == digest:
+                # Same name and same parameters: the later row is simply redundant
+                duplicate_of[idx] = first_row[digest]
+            else:
+                collisions.setdefault(filename, [other_idx]).append(idx)
+            continue
+        names[name] = (idx, digest)
+        if digest in first_row:
+            duplicate_of[idx] = first_row[digest]
+            copies.setdefault(first_row[digest], []).append(filename)
+        else:
+            first_row[digest] = idx
+    return duplicate_of, copies, collisions
+
+
+def describe_outputs(parameter_file, selected_indices, ignored=()):
+    """
+    Collect the output name and -D flags of every selected row for the export manifest.
+
+    A name used by several identical rows belongs to the first of them, which is the row
+    that renders it (see plan_duplicates).
+
+    Args:
+        parameter_file (str): Path to the CSV or JSON file containing parameters.
+        selected_indices (Selection or None): Selected indices, or None for all rows.
+        ignored (collection of str): Parameters left out of the -D flags.
+
+    Returns:
+        tuple:
+            dict: Output name of every selected row mapped to its index and -D flags.
+            set: Output names of all rows in the file, selected or not.
+    """
+    _, rows = iter_parameters(parameter_file)
+    selected = {}
+    names = set()
+    for idx, param_set in enumerate(rows):
+        filename = str(param_set.get("exported_filename", f"model_{idx}"))
+        names.add(filename)
+        if (selected_indices is None or idx in selected_indices) and filename not in selected:
+            selected[filename] = (idx, construct_d_flags(param_set, ignored))
+    return selected, names
 
 
 def batch_export(
@@ -339,6 +1628,34 @@ def batch_export(
     export_format,
     selection,
     sequential,
+    cache=None,
+    cache_dir=None,
+    jobs=None,
+    max_load=None,
+    max_memory=None,
+    history=None,
+    order="longest-first",
+    progress_callback=None,
+    timeout=None,
+    max_rss=None,
+    retries=0,
+    autotune=False,
+    retune=False,
+    prune_unused=False,
+    two_stage=False,
+    pack=False,
+    workers=None,
+    shard=None,
+    spool=None,
+    engine="threads",
+    control=None,
+    resume=False,
+    incremental=False,
+    prune_removed=False,
+    inspect=False,
+    arrange=None,
+    on_event=None,
+    log=print_log,
 ):
     """
     Perform batch export of STL files based on parameter sets.
@@ -348,138 +1665,1482 @@ def batch_export(
         parameter_file (str): Path to the CSV or JSON file containing parameters.
         output_folder (str): Directory where STL files will be saved.
         openscad_path (str): Path to the OpenSCAD executable.
-        export_format (str): Export format ('asciistl' or 'binstl').
+        export_format (str or list of str): Export format, or several formats as a list or
+            comma-separated string (see FORMAT_EXTENSIONS).
         selection (str or None): Selection string to specify which parameter sets to export.
         sequential (bool): Whether to process exports sequentially.
+        cache (RenderCache or None): Render cache to reuse earlier renders from, or None to always render.
+        cache_dir (str or None): Directory of the autotuning and capability records. Defaults to the directory of `cache`, or default_cache_dir().
+        jobs (int or None): Maximum number of concurrent renders. Defaults to the number of CPUs.
+        max_load (float or None): Load average at or above which no further render is started.
+        max_memory (str or None): Memory usage ("80%" or "24G") at or above which no further render is started.
+        history (RenderHistory or None): Run history to record renders in and predict durations from.
+        order (str): 'longest-first' to start the longest predicted renders first, or 'file' for file order.
+        progress_callback (callable or None): Called as progress_callback(completed, total, eta)
+            after every finished export, where eta is the estimated remaining time in seconds or None.
+        timeout (float or None): Wall-clock limit per render in seconds.
+        max_rss (int or None): Resident memory limit per render in bytes.
+        retries (int): Number of times a timed-out render is retried.
+        autotune (bool): Render with the fastest equivalent geometry flags of the binary.
+        retune (bool): Tune again even if flags were recorded for this binary and model.
+        prune_unused (bool): Leave parameters the model never reads out of the -D flags, the
+            render cache key and duplicate detection.
+        two_stage (bool): Evaluate every row to a CSG tree first and render each distinct
+            tree only once.
+        pack (bool): Render several small parameter sets per OpenSCAD invocation when the
+            measured startup time makes it worthwhile.
+        workers (list of str or None): 'host:port' of render workers to dispatch the renders
+            to instead of running OpenSCAD locally.
+        shard (str or None): Shard "i/n" to export only the i-th of n parts of the selected
+            rows, for running one batch as several independent processes.
+        spool (str or None): Spool directory to queue one job per row in instead of
+            rendering; the jobs are rendered by 'openscad-export drain' processes.
+        engine (str): 'threads' to run every render on a worker thread, or 'asyncio' to run
+            all renders from a single event loop without a thread per render.
+        control (BatchControl or None): Control to cancel, pause and resume the batch from
+            another thread or a signal handler.
+        resume (bool): Skip rows that the journal of the previous run proves complete.
+        incremental (bool): Render only rows that were added or changed since the last
+            export to the output folder.
+        prune_removed (bool): Delete the files of rows that were in the last export but are
+            no longer in the parameter file.
+        inspect (bool): Check the exported STL files and write their mesh statistics to a
+            report in the output folder.
+        arrange (str or None): Build plate size "WIDTHxDEPTH" to arrange the exported STL
+            files on, writing the plates to the 'plates' folder in the output folder.
+        on_event (callable or None): Called with every event of the batch (see events.py).
+            ExportStarted is sent from the thread running the render, so the callback must
+            be thread-safe.
+        log (callable): Called with every progress message and, for warnings and errors,
+            'warning' or 'error'. Defaults to print_log.
+
+    Returns:
+        ExportResult: Outcome of the batch.
+
+    Raises:
+        ExportError: If the settings or input files are invalid.
     """
-    # Determine parameter file type based on extension
-    _, ext = os.path.splitext(parameter_file)
-    ext = ext.lower()
-    if ext == ".csv":
-        parameters = read_csv(parameter_file)
-    elif ext == ".json":
-        parameters = read_json(parameter_file)
-    else:
-        print(f"Unsupported parameter file format: {ext}")
-        sys.exit(1)
+    if control is None:
+        control = BatchControl()
+    if on_event is None:
+        on_event = lambda event: None
+
+    # Parameter sets are read lazily so memory does not grow with the file size
+    try:
+        total_params, parameters = iter_parameters(parameter_file)
+        formats = parse_formats(export_format)
+        if shard is not None:
+            shard = parse_shard(shard)
+        if arrange is not None:
+            plate = parse_plate(arrange)
+    except ValueError as ve:
+        raise ExportError(str(ve))
+
+    if spool is not None and workers:
+        raise ExportError("--spool and --workers cannot be combined.")
+    if (incremental or prune_removed) and (shard is not None or spool is not None):
+        raise ExportError(
+            "--incremental and --prune_removed cannot be combined with --shard or --spool."
+        )
 
     ensure_output_folder(output_folder)
 
-    total_params = len(parameters)
     selected_indices = None
     if selection:
         try:
-            selected_indices = parse_selection(selection, total_params)
-            print(f"Selected parameter set indices: {selected_indices}")
+            selected_indices = parse_selection(selection, total_params, parameter_file)
+            log(
+                f"Selected {len(selected_indices)} parameter sets: {selected_indices}"
+            )
         except ValueError as ve:
-            print(f"Selection parsing error: {ve}")
-            sys.exit(1)
+            raise ExportError(f"Selection parsing error: {ve}")
+        # Stop reading the parameter file after the last selected row
+        parameters = itertools.islice(parameters, selected_indices.stop)
+
+    ignored = frozenset()
+    # Scanning the model and every column only pays off when the result is used
+    unused = unused_parameters(scad_file, parameter_columns(parameter_file)) if prune_unused else []
+    if unused is None:
+        log(
+            "Not all include<>/use<> files of the model were found; "
+            "keeping every parameter."
+        )
+    elif unused:
+        log(f"Parameters never read by the model: {', '.join(unused)}")
+        ignored = frozenset(unused)
+        log("These parameters are left out of the -D flags and the render identity.")
+
+    duplicate_of, copies, collisions = plan_duplicates(
+        parameter_file, selected_indices, ignored
+    )
+    if collisions:
+        raise ExportError(
+            "Rows with different parameters would write the same output file:\n"
+            + "".join(
+                f"  - {filename}: rows {', '.join(str(idx) for idx in rows)}\n"
+                for filename, rows in collisions.items()
+            )
+            + "Give these rows distinct exported_filename values."
+        )
+    if duplicate_of:
+        log(
+            f"Skipping {len(duplicate_of)} rows that repeat the parameters of an earlier row; "
+            "their files are copied from the first occurrence."
+        )
+
+    cost_model = None
+    if history is not None:
+        cost_model = CostModel(history, scad_file)
+        if not cost_model.known and cost_model.weights is None:
+            cost_model = None
+
+    # Predictions of the rows read ahead for ordering or running; never of the whole file
+    predictions = {}
+
+    def predicted_duration(task):
+        """
+        Return the predicted render duration of a task, or None if there is no prediction.
+
+        The prediction is kept until the result of the row is recorded.
+        """
+        idx, param_set = task
+        if idx not in predictions:
+            predictions[idx] = predict_duration(cost_model, param_set, ignored)
+        return predictions[idx]
+
+    def remember_predictions(items):
+        """
+        Predict every task as it is handed to the executor.
+        """
+        for task in items:
+            predicted_duration(task)
+            yield task
+
+    indices = selected_indices if selected_indices is not None else range(total_params)
+    total_tasks = len(indices) - len(duplicate_of)
+
+    shard_rows = None
+    if shard is not None:
+        shard_index, shard_count = shard
+        parameter_digest = hash_file(parameter_file)
+        fingerprint = plan_fingerprint(parameter_digest, selection, shard_count, ignored)
+
+        def compute_plan():
+            """
+            Partition the rows, by predicted render time where the history allows it.
+            """
+            cost = None
+            if cost_model is not None:
+                cost = dict(
+                    predict_durations(parameter_file, selected_indices, cost_model, ignored)
+                ).get
+            # Duplicate rows follow the row they repeat, which renders and copies them
+            return partition(
+                (idx for idx in indices if idx not in duplicate_of), shard_count, cost
+            )
+
+        method, shards = shared_plan(output_folder, fingerprint, compute_plan)
+        shard_rows = set(shards[shard_index - 1])
+        log(
+            f"Shard {shard_index}/{shard_count}: rendering {len(shard_rows)} of "
+            f"{total_tasks} rows, split "
+            + ("by predicted render time." if method == "cost" else "round-robin.")
+        )
+        total_tasks = len(shard_rows)
+
+    # Non-selected, duplicate and other shards' parameter sets are filtered out before any
+    # work is scheduled
+    tasks = (
+        (idx, param_set)
+        for idx, param_set in enumerate(parameters)
+        if (selected_indices is None or idx in selected_indices)
+        and idx not in duplicate_of
+        and (shard_rows is None or idx in shard_rows)
+    )
+
+    try:
+        admission = AdmissionController(
+            1 if sequential else jobs, max_load, max_memory, control=control
+        )
+    except ValueError as ve:
+        raise ExportError(f"Invalid resource limit: {ve}")
+
+    pool = None
+    if workers:
+        try:
+            pool = WorkerPool(workers, scad_file, log)
+        except NoWorkers as e:
+            raise ExportError(str(e))
+        log(f"Rendering on workers: {pool.describe()}")
+        # The workers apply their own resource limits; locally only transfers run
+        admission = AdmissionController(1 if sequential else pool.slots, control=control)
+
+    # Autotuning and capability records are kept next to the render cache
+    state_dir = cache_dir or (cache.directory if cache is not None else None)
+
+    extra_flags = []
+    if autotune:
+        # Geometry flags are compared on STL renders whatever the requested formats
+        tune_format = stl_format(formats) or "binstl"
+        extra_flags = None if retune else recorded_flags(
+            openscad_path, scad_file, tune_format, state_dir
+        )
+        if extra_flags is None:
+            log("Autotuning geometry flags on sample rows...")
+            samples = sample_rows(
+                parameter_file, selected_indices, total_params, AUTOTUNE_SAMPLES
+            )
+            extra_flags = choose_flags(
+                export_stl,
+                openscad_path,
+                scad_file,
+                tune_format,
+                [construct_d_flags(param_set, ignored) for param_set in samples],
+                state_dir,
+            )
+        log(
+            f"Using geometry flags: {' '.join(extra_flags) if extra_flags else '(default)'}"
+        )
+
+    # Computed once per batch; every row shares the same source
+    source_hash = source_digest(scad_file)
+
+    output_rows = None
+    unchanged_rows = set()
+    if incremental or prune_removed:
+        # The manifest of an incremental export records what it wrote for the next one
+        output_rows, all_names = describe_outputs(parameter_file, selected_indices, ignored)
+        previous = load_manifest(output_folder) or {"dependencies": {}, "rows": {}}
+        dependencies = dependency_hashes(scad_file)
+
+        def entry_for(filename):
+            """
+            Return the manifest entry of an output name of the current batch.
+            """
+            return manifest_entry(
+                output_rows[filename][1],
+                source_hash,
+                formats,
+                extra_flags,
+                [f"{filename}{FORMAT_EXTENSIONS[fmt]}" for fmt in formats],
+            )
+
+        if incremental:
+            changed_files = changed_dependencies(previous["dependencies"], dependencies)
+            if previous["rows"] and changed_files:
+                log(f"Model files changed since the last export: {', '.join(changed_files)}")
+            same = {
+                filename
+                for filename in output_rows
+                if unchanged(previous["rows"].get(filename), entry_for(filename), output_folder)
+            }
+            added = sum(1 for filename in output_rows if filename not in previous["rows"])
+            for filename in same:
+                idx = output_rows[filename][0]
+                # A row is rendered again if any row repeating it has to be written
+                if idx not in duplicate_of and all(
+                    name in same for name in copies.get(idx, ())
+                ):
+                    unchanged_rows.add(idx)
+            log(
+                f"Incremental export: {added} added, {len(output_rows) - len(same) - added} "
+                f"changed and {len(same)} unchanged rows."
+            )
+            total_tasks -= len(unchanged_rows)
+            tasks = (task for task in tasks if task[0] not in unchanged_rows)
+
+        removed = sorted(set(previous["rows"]) - all_names)
+        if removed and prune_removed:
+            deleted = prune_outputs(
+                output_folder, [previous["rows"].pop(name) for name in removed]
+            )
+            log(f"Deleted {deleted} files of {len(removed)} rows removed from the parameter file.")
+        elif removed and incremental:
+            log(
+                f"{len(removed)} rows of the last export are no longer in the parameter file; "
+                "--prune_removed deletes their files."
+            )
+        name_of = {idx: filename for filename, (idx, _) in output_rows.items()}
+        finished_names = set()
+        lost_names = set()
+
+    if spool is not None:
+        if two_stage or pack:
+            log("Two-stage export and packing are not used with --spool; every row is a job.")
+        if cost_model is not None and order == "longest-first":
+            # Drains take jobs in queue order, so the longest predicted rows start first
+            tasks = longest_first(
+                tasks, lambda task: predict_duration(cost_model, task[1], ignored), LPT_WINDOW
+            )
+
+        def job_paths(filename):
+            """
+            Return the (format, absolute path) pairs written for an output name.
+            """
+            folder = os.path.abspath(output_folder)
+            return [
+                (fmt, os.path.join(folder, f"{filename}{FORMAT_EXTENSIONS[fmt]}"))
+                for fmt in formats
+            ]
+
+        queue = Spool(spool)
+        count = queue.enqueue(
+            {
+                "row": idx,
+                "scad_file": os.path.abspath(scad_file),
+                "d_flags": construct_d_flags(param_set, ignored),
+                "outputs": job_paths(param_set.get("exported_filename", f"model_{idx}")),
+                "copies": [
+                    [path for _, path in job_paths(filename)]
+                    for filename in copies.get(idx, ())
+                ],
+                "extra_flags": extra_flags,
+                "timeout": timeout,
+                "max_rss": max_rss,
+                "retries": retries,
+            }
+            for idx, param_set in tasks
+        )
+        log(
+            f"Queued {count} jobs in {queue.directory}. Render them with "
+            f"'openscad-export drain {spool}' on any number of hosts."
+        )
+        return ExportResult(queued=count)
+
+    multiple_outputs = False
+    if len(formats) > 1:
+        multiple_outputs = probe_capabilities(openscad_path, state_dir)["multiple_outputs"]
+        log(
+            f"Exporting {', '.join(formats)} "
+            + (
+                "from a single OpenSCAD invocation per row."
+                if multiple_outputs
+                else "from a single render per row, converting the mesh in-process."
+            )
+        )
+
+    csg_files = {}
+    if two_stage:
+        log("Evaluating parameter sets to CSG trees...")
+        _, rows = iter_parameters(parameter_file)
+        if selected_indices is not None:
+            rows = itertools.islice(rows, selected_indices.stop)
+        same_tree, csg_files = plan_geometry(
+            openscad_path,
+            scad_file,
+            (
+                (
+                    idx,
+                    param_set.get("exported_filename", f"model_{idx}"),
+                    construct_d_flags(param_set, ignored),
+                )
+                for idx, param_set in enumerate(rows)
+                if (selected_indices is None or idx in selected_indices)
+                and idx not in duplicate_of
+                and idx not in unchanged_rows
+                and (shard_rows is None or idx in shard_rows)
+            ),
+            admission,
+            timeout,
+            max_rss,
+            control.renders,
+        )
+        for idx, first_idx, filename in same_tree:
+            # The row and every row repeating it are copied from the first row of the tree
+            duplicate_of[idx] = first_idx
+            copies.setdefault(first_idx, []).append(filename)
+            copies[first_idx] += copies.pop(idx, [])
+        total_tasks -= len(same_tree)
+        log(
+            f"{len(csg_files)} distinct geometries; {len(same_tree)} more rows share "
+            "the geometry of an earlier row and are copied from it."
+        )
+
+    pack_size, spacing = 1, None
+    if pack and pool is not None:
+        log("Packing is not supported with render workers; rendering rows one by one.")
+    elif pack:
+        if not all(fmt in MESH_WRITERS for fmt in formats):
+            log(f"Packing supports only {', '.join(MESH_WRITERS)}; rendering rows one by one.")
+        else:
+            log("Measuring OpenSCAD startup and render times for packing...")
+            samples = sample_rows(
+                parameter_file, selected_indices, total_params, AUTOTUNE_SAMPLES
+            )
+            pack_size, spacing = calibrate_packing(
+                openscad_path,
+                scad_file,
+                [construct_d_flags(param_set, ignored) for param_set in samples],
+                timeout,
+                max_rss,
+                extra_flags,
+                control.renders,
+            )
+            # Never pack so many rows that some workers are left idle
+            pack_size = min(pack_size, math.ceil(total_tasks / admission.jobs))
+            if pack_size > 1:
+                log(f"Packing up to {pack_size} rows into each OpenSCAD invocation.")
+            else:
+                log("Startup time is small compared to render time; not packing.")
+
+    openscad_version = None
+    if pool is not None:
+        # The workers render with their own binaries
+        openscad_version = pool.version
+    elif cache is not None or history is not None:
+        # Computed once per batch; every row shares the same binary
+        openscad_version = get_openscad_version(openscad_path)
+    if cache is not None:
+        log(f"Using render cache at {cache.directory} ({openscad_version}).")
+
+    if shard is None:
+        # Shards sharing the folder may be writing their own temporary files
+        remove_partials(output_folder)
+    journal = Journal(os.path.join(output_folder, journal_name(shard)), resume)
+    if resume:
+        log(f"Resuming from {journal.path} ({len(journal.entries)} rows recorded).")
+
+    run_id = None
+    eta = EtaEstimator(admission.jobs)
+    if history is not None:
+        run_id = history.start_run(
+            scad_file, source_hash, openscad_version, admission.jobs, total_tasks
+        )
+
+    if cost_model is not None:
+        row_predictions = predict_durations(
+            parameter_file, selected_indices, cost_model, ignored
+        )
+    else:
+        row_predictions = ((idx, None) for idx in indices)
+    for idx, predicted in row_predictions:
+        if (
+            idx not in duplicate_of
+            and idx not in unchanged_rows
+            and (shard_rows is None or idx in shard_rows)
+        ):
+            eta.add(predicted)
+    estimate = eta.remaining()
+    if estimate is not None:
+        log(
+            f"Predicted batch time: {format_duration(estimate)} for {total_tasks} renders."
+        )
+
+    if cost_model is not None and order == "longest-first" and not sequential:
+        log("Starting renders in longest-predicted-first order.")
+        tasks = longest_first(tasks, predicted_duration, LPT_WINDOW)
+    tasks = remember_predictions(tasks)
+
+    followers = {}
+    manifest_rows = []
+    if shard is not None:
+        for idx, first_idx in duplicate_of.items():
+            # Rows sharing a CSG tree may point at a row that repeats another one
+            while first_idx in duplicate_of:
+                first_idx = duplicate_of[first_idx]
+            if first_idx in shard_rows:
+                followers.setdefault(first_idx, []).append(idx)
 
     successes = []
     failures = []
+    cached = []
+    resumed = []
+    cancelled = []
+    timeouts = []
     export_times = []
+    completed = 0
+    started_at = time.time()
     total_start_time = time.perf_counter()
 
-    def process_export(idx_param):
+    def output_paths(filename):
         """
-        Helper function to process a single export task.
+        Return the (format, path) pairs written for an output name.
+        """
+        return [
+            (fmt, os.path.join(output_folder, f"{filename}{FORMAT_EXTENSIONS[fmt]}"))
+            for fmt in formats
+        ]
+
+    def place_copies(idx, output_files):
+        """
+        Link or copy the files of a row to the names of the rows repeating it.
+
+        Returns:
+            list of str: Paths of the copies.
+        """
+        placed = []
+        for filename in copies.get(idx, ()):
+            for source, (_, path) in zip(output_files, output_paths(filename)):
+                link_or_copy(source, path)
+                placed.append(path)
+        return placed
+
+    def prepare_export(idx_param):
+        """
+        Skip a row the journal proves complete, restore it from the cache or prepare its
+        render.
 
         Args:
             idx_param (tuple): Tuple containing index and parameter set.
 
         Returns:
-            tuple or None: Result of the export process or None if skipped.
+            tuple:
+                tuple or None: Result as returned by process_export if the row was complete
+                    or restored from the cache.
+                dict or None: Otherwise the render job for render_attempt and finish_export.
         """
         idx, param_set = idx_param
-        if selected_indices is not None and idx not in selected_indices:
-            return None  # Skip non-selected parameter sets
-
         filename = param_set.get("exported_filename", f"model_{idx}")
-        output_file = os.path.join(output_folder, f"{filename}.stl")
+        outputs = output_paths(filename)
+        output_files = [path for _, path in outputs]
 
         # Construct -D flags
-        d_flags = construct_d_flags(param_set)
+        d_flags = construct_d_flags(param_set, ignored)
+        identity = row_identity(source_hash, d_flags, formats, extra_flags)
+
+        if resume:
+            start_time = time.perf_counter()
+            if journal.completed(idx, identity) == output_files:
+                # Copies are cheap to place again and may belong to rows added since
+                output_files += place_copies(idx, output_files)
+                return ("resumed", output_files, time.perf_counter() - start_time, idx), None
+
+        cache_keys = {}
+        if cache is not None:
+            start_time = time.perf_counter()
+            missing = []
+            for fmt, path in outputs:
+                cache_keys[fmt] = cache.key(
+                    source_hash, d_flags, fmt, openscad_version, extra_flags
+                )
+                if cache.fetch(cache_keys[fmt], path):
+                    continue
+                missing.append((fmt, path))
+            if not missing:
+                journal.record(idx, identity, output_files)
+                output_files += place_copies(idx, output_files)
+                result = ("cached", output_files, time.perf_counter() - start_time, idx)
+                return result, None
+            # Only the formats missing from the cache are rendered
+            outputs = missing
+        for _, path in outputs:
+            if os.path.exists(path):
+                # A failed render leaves no file from an earlier run behind
+                os.remove(path)
+
+        return None, {
+            "idx": idx,
+            "filename": filename,
+            "param_set": param_set,
+            # Rendered under temporary names and renamed into place once complete
+            "outputs": [(fmt, partial_path(path)) for fmt, path in outputs],
+            "final_paths": [path for _, path in outputs],
+            "output_files": output_files,
+            "d_flags": d_flags,
+            "identity": identity,
+            "cache_keys": cache_keys,
+            # Rows evaluated in the first stage render their CSG tree instead of the model
+            "source_file": csg_files.get(idx, scad_file),
+            "source_flags": [] if idx in csg_files else d_flags,
+        }
+
+    def render_attempt(job, attempt, success, error, duration, status):
+        """
+        Record a render attempt and decide whether to retry it.
 
-        # Export STL using OpenSCAD with -D flags
-        success, error, duration = export_stl(
-            openscad_path, scad_file, output_file, export_format, d_flags
-        )
+        Args:
+            job (dict): Job returned by prepare_export.
+            attempt (int): Number of the attempt, starting at 0.
+            success (bool), error (str), duration (float): Result of the render.
+            status (str): 'success', 'failure' or 'timeout'.
+
+        Returns:
+            bool: True if the render timed out and should be retried.
+        """
+        if history is not None:
+            history.record(
+                run_id,
+                scad_file,
+                params_key(job["d_flags"]),
+                job["param_set"],
+                duration,
+                status,
+                error or None,
+                output_size([path for _, path in job["outputs"]]) if success else None,
+            )
+        if status != "timeout":
+            return False
+        if attempt < retries:
+            log(f"Retrying {job['output_files'][0]} ({error})", "warning")
+            return True
+        return False
+
+    def discard_partials(job):
+        """
+        Remove the temporary files of a render that did not complete.
+        """
+        for _, path in job["outputs"]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def cancel_export(job, duration):
+        """
+        Discard the partial output of a row whose render was cancelled.
+
+        Args:
+            job (dict): Job returned by prepare_export.
+            duration (float): Time the render ran before it was cancelled.
+
+        Returns:
+            tuple: Result as returned by process_export.
+        """
+        discard_partials(job)
+        return ("cancelled", job["output_files"][0], duration, job["idx"])
+
+    def finish_export(job, success, error, duration, status):
+        """
+        Store a rendered row in the cache, place its copies and build its result.
+
+        Args:
+            job (dict): Job returned by prepare_export.
+            success (bool), error (str), duration (float): Result of the last render.
+            status (str): 'success', 'failure' or 'timeout'.
+
+        Returns:
+            tuple: Result as returned by process_export.
+        """
+        idx = job["idx"]
+        output_files = job["output_files"]
+        output_file = output_files[0]
+        if idx in csg_files:
+            os.remove(csg_files.pop(idx))
+        if status == "timeout":
+            discard_partials(job)
+            return ("timeout", (output_file, error), duration, idx)
+        if success and not all(os.path.exists(partial) for _, partial in job["outputs"]):
+            success, error = False, NO_OUTPUT_ERROR
         if success:
-            return ("success", output_file, duration)
+            for (fmt, partial), path in zip(job["outputs"], job["final_paths"]):
+                os.replace(partial, path)
+                if fmt in job["cache_keys"]:
+                    cache.store(job["cache_keys"][fmt], path)
+            journal.record(idx, job["identity"], output_files)
+            output_files += place_copies(idx, output_files)
+            return ("success", output_files, duration, idx)
         else:
-            return ("failure", (output_file, error), duration)
+            discard_partials(job)
+            return ("failure", (output_file, error), duration, idx)
 
-    if sequential:
-        print("Running exports sequentially.")
-        for idx, param_set in enumerate(parameters):
-            if selected_indices is not None and idx not in selected_indices:
-                continue  # Skip non-selected parameter sets
+    def process_export(idx_param):
+        """
+        Helper function to process a single export task.
+
+        Args:
+            idx_param (tuple): Tuple containing index and parameter set.
+
+        Returns:
+            tuple: Result of the export process.
+        """
+        result, job = prepare_export(idx_param)
+        if result is not None:
+            return result
+
+        # Export using OpenSCAD with -D flags once the resource limits allow it;
+        # timed-out renders are retried a bounded number of times
+        for attempt in range(retries + 1):
+            try:
+                slot = admission.acquire()
+            except BatchCancelled:
+                return cancel_export(job, 0.0)
+            try:
+                on_event(ExportStarted(job["idx"], job["filename"], attempt, slot))
+                try:
+                    if pool is not None:
+                        success, error, duration = pool.render(
+                            job["outputs"], job["d_flags"], timeout, max_rss, extra_flags
+                        )
+                    else:
+                        success, error, duration = export_outputs(
+                            openscad_path,
+                            job["source_file"],
+                            job["outputs"],
+                            job["source_flags"],
+                            timeout,
+                            max_rss,
+                            extra_flags,
+                            multiple_outputs,
+                            control.renders,
+                        )
+                    status = "success" if success else "failure"
+                except RenderTimeout as e:
+                    success, error, duration = False, str(e), e.duration
+                    status = "timeout"
+            finally:
+                admission.release(slot)
+            if control.cancelled and not success:
+                return cancel_export(job, duration)
+            if not render_attempt(job, attempt, success, error, duration, status):
+                break
+        return finish_export(job, success, error, duration, status)
+
+    async def process_export_async(idx_param, gate):
+        """
+        Event loop counterpart of process_export.
+
+        Preparing and finishing a row reads, hashes, renames and fsyncs files and writes the
+        history, so those steps run on the loop's default executor instead of blocking the
+        event loop.
+
+        Args:
+            idx_param (tuple): Tuple containing index and parameter set.
+            gate (AsyncAdmission): Resource limits of the event loop.
 
+        Returns:
+            tuple: Result of the export process.
+        """
+        loop = asyncio.get_event_loop()
+        result, job = await loop.run_in_executor(None, prepare_export, idx_param)
+        if result is not None:
+            return result
+        for attempt in range(retries + 1):
+            try:
+                slot = await gate.acquire()
+            except BatchCancelled:
+                return await loop.run_in_executor(None, cancel_export, job, 0.0)
+            try:
+                on_event(ExportStarted(job["idx"], job["filename"], attempt, slot))
+                try:
+                    success, error, duration = await export_outputs_async(
+                        openscad_path,
+                        job["source_file"],
+                        job["outputs"],
+                        job["source_flags"],
+                        timeout,
+                        max_rss,
+                        extra_flags,
+                        multiple_outputs,
+                        control.renders,
+                    )
+                    status = "success" if success else "failure"
+                except RenderTimeout as e:
+                    success, error, duration = False, str(e), e.duration
+                    status = "timeout"
+            finally:
+                gate.release(slot)
+            if control.cancelled and not success:
+                return await loop.run_in_executor(None, cancel_export, job, duration)
+            if not await loop.run_in_executor(
+                None, render_attempt, job, attempt, success, error, duration, status
+            ):
+                break
+        return await loop.run_in_executor(
+            None, finish_export, job, success, error, duration, status
+        )
+
+    def process_pack(chunk):
+        """
+        Render a chunk of rows with a single OpenSCAD invocation.
+
+        Rows restored from the cache, rows whose model came out empty and all rows of a pack
+        that failed or could not be split are exported one by one instead.
+
+        Args:
+            chunk (list of tuple): Index and parameter set of every row.
+
+        Returns:
+            list of tuple: Results of the rows, as returned by process_export.
+        """
+        results = []
+        pending = []
+        for idx, param_set in chunk:
+            d_flags = construct_d_flags(param_set, ignored)
+            if cache is not None and all(
+                os.path.isfile(
+                    cache.path_for(
+                        cache.key(source_hash, d_flags, fmt, openscad_version, extra_flags)
+                    )
+                )
+                for fmt in formats
+            ):
+                results.append(process_export((idx, param_set)))
+            else:
+                pending.append((idx, param_set, d_flags))
+        if len(pending) < 2:
+            return results + [process_export((idx, p)) for idx, p, _ in pending]
+
+        try:
+            slot = admission.acquire()
+        except BatchCancelled:
+            # Every row is reported as cancelled when exported one by one
+            return results + [process_export((idx, p)) for idx, p, _ in pending]
+        try:
+            for idx, param_set, _ in pending:
+                on_event(
+                    ExportStarted(
+                        idx, param_set.get("exported_filename", f"model_{idx}"), slot=slot
+                    )
+                )
+            try:
+                meshes, error, duration = export_pack(
+                    openscad_path,
+                    scad_file,
+                    [d_flags for _, _, d_flags in pending],
+                    spacing,
+                    timeout,
+                    max_rss,
+                    extra_flags,
+                    control.renders,
+                )
+            except RenderTimeout as e:
+                meshes, error = None, str(e)
+        finally:
+            admission.release(slot)
+        if meshes is None:
+            if not control.cancelled:
+                log(f"Packed render failed ({error}); exporting its rows one by one.", "warning")
+            return results + [process_export((idx, p)) for idx, p, _ in pending]
+
+        share = duration / len(pending)
+        for (idx, param_set, d_flags), triangles in zip(pending, meshes):
+            if not triangles:
+                # Exporting alone reports OpenSCAD's own error for empty models
+                results.append(process_export((idx, param_set)))
+                continue
             filename = param_set.get("exported_filename", f"model_{idx}")
-            output_file = os.path.join(output_folder, f"{filename}.stl")
+            outputs = output_paths(filename)
+            for fmt, path in outputs:
+                partial = partial_path(path)
+                MESH_WRITERS[fmt](triangles, partial)
+                os.replace(partial, path)
+                if cache is not None:
+                    cache.store(
+                        cache.key(source_hash, d_flags, fmt, openscad_version, extra_flags),
+                        path,
+                    )
+            if history is not None:
+                history.record(
+                    run_id,
+                    scad_file,
+                    params_key(d_flags),
+                    param_set,
+                    share,
+                    "success",
+                    None,
+                    output_size([path for _, path in outputs]),
+                )
+            output_files = [path for _, path in outputs]
+            journal.record(
+                idx, row_identity(source_hash, d_flags, formats, extra_flags), output_files
+            )
+            output_files += place_copies(idx, output_files)
+            results.append(("success", output_files, share, idx))
+        return results
 
-            # Construct -D flags
-            d_flags = construct_d_flags(param_set)
+    def controlled(items):
+        """
+        Pass items on while the batch runs, waiting while it is paused.
 
-            # Export STL using OpenSCAD with -D flags
-            success, error, duration = export_stl(
-                openscad_path, scad_file, output_file, export_format, d_flags
+        The asyncio engine consumes the items on its event loop, which must not block; there
+        AsyncAdmission holds back renders while the batch is paused.
+        """
+        for item in items:
+            if control.cancelled or (engine != "asyncio" and not control.wait()):
+                return
+            yield item
+
+    tasks = controlled(tasks)
+    if pack_size > 1:
+        work = iter(lambda: list(itertools.islice(tasks, pack_size)), [])
+        run = process_pack
+    else:
+        work = tasks
+
+        def run(task):
+            return [process_export(task)]
+
+    def record_result(result):
+        """
+        Record and report the result of a single export task.
+
+        Args:
+            result (tuple): Value returned by process_export.
+        """
+        nonlocal completed
+        status, info, duration, idx = result
+        completed += 1
+        if status in ("cached", "resumed", "cancelled"):
+            # Skipped, restored and cancelled renders say nothing about render speed
+            eta.discard(predictions.pop(idx, None))
+        else:
+            eta.finish(predictions.pop(idx, None), duration)
+        remaining = eta.remaining()
+        progress = f"[{completed}/{total_tasks}" + (
+            f", ETA {format_duration(remaining)}]" if remaining is not None else "]"
+        )
+        if status == "success":
+            successes.extend(info)
+            export_times.append(duration)
+            log(f"Exported: {', '.join(info)} in {duration:.2f} seconds. {progress}")
+            on_event(ExportFinished(idx, info, duration, completed, total_tasks, remaining))
+        elif status == "cached":
+            successes.extend(info)
+            cached.extend(info)
+            log(f"Restored from cache: {', '.join(info)} {progress}")
+            on_event(ExportSkipped(idx, info, status, completed, total_tasks, remaining))
+        elif status == "resumed":
+            successes.extend(info)
+            resumed.extend(info)
+            log(f"Already exported: {', '.join(info)} {progress}")
+            on_event(ExportSkipped(idx, info, status, completed, total_tasks, remaining))
+        elif status in ("failure", "timeout"):
+            failures.append(info)
+            # Rows repeating a failed row fail with it
+            for filename in copies.get(idx, ()):
+                failures.append((output_paths(filename)[0][1], info[1]))
+            export_times.append(duration)
+            if status == "timeout":
+                timeouts.append(info[0])
+            log(
+                f"Error exporting {info[0]}: {info[1]} (Time: {duration:.2f} seconds) {progress}",
+                "error",
             )
-            if success:
-                successes.append(output_file)
-                export_times.append(duration)
-                print(f"Exported: {output_file} in {duration:.2f} seconds.")
-            else:
-                failures.append((output_file, error))
-                export_times.append(duration)
-                print(
-                    f"Error exporting {output_file}: {error} (Time: {duration:.2f} seconds)"
+            on_event(
+                ExportFailed(
+                    idx,
+                    info[0],
+                    info[1],
+                    duration,
+                    status == "timeout",
+                    completed,
+                    total_tasks,
+                    remaining,
                 )
+            )
+        elif status == "cancelled":
+            cancelled.append(info)
+            log(f"Cancelled: {info} {progress}", "warning")
+            on_event(ExportSkipped(idx, [info], status, completed, total_tasks, remaining))
+        if output_rows is not None:
+            names = [name_of[idx]] + list(copies.get(idx, ()))
+            if status in ("success", "cached", "resumed"):
+                finished_names.update(names)
+            else:
+                # The files of the row were removed before rendering it
+                lost_names.update(names)
+        if shard is not None:
+            entry = {"row": idx, "status": status, "duration": round(duration, 3)}
+            if status in ("success", "cached", "resumed"):
+                entry["files"] = info
+            elif status != "cancelled":
+                entry["error"] = info[1]
+            manifest_rows.append(entry)
+            for follower in followers.get(idx, ()):
+                manifest_rows.append({"row": follower, "status": status, "copy_of": idx})
+        if progress_callback is not None:
+            progress_callback(completed, total_tasks, remaining)
+
+    if engine == "asyncio" and (pool is not None or pack_size > 1):
+        log("The asyncio engine renders locally one row at a time; using threads.")
+        engine = "threads"
+
+    on_event(BatchStarted(total_tasks, admission.jobs))
+
+    if sequential:
+        log("Running exports sequentially.")
+        for item in work:
+            for result in run(item):
+                record_result(result)
+    elif engine == "asyncio":
+        log(f"Running exports in parallel on the asyncio engine ({admission.describe()}).")
+
+        async def run_all():
+            """
+            Render every task from the event loop and record the results.
+            """
+            gate = AsyncAdmission(admission)
+            async for result in bounded_as_completed(
+                lambda task: process_export_async(task, gate), work, admission.jobs * 2
+            ):
+                record_result(result)
+
+        run_event_loop(run_all)
     else:
-        print("Running exports in parallel.")
+        log(f"Running exports in parallel ({admission.describe()}).")
         # Use ThreadPoolExecutor for I/O-bound operations
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            # Prepare iterable of (index, param_set)
-            iterable = enumerate(parameters)
-            # Submit all tasks
-            future_to_export = {
-                executor.submit(process_export, idx_param): idx_param
-                for idx_param in iterable
-            }
+        with concurrent.futures.ThreadPoolExecutor(admission.jobs) as executor:
+            # Keep only a bounded window of tasks in flight while streaming the rest
+            for results in bounded_map(executor, run, work, admission.jobs * 2):
+                for result in results:
+                    record_result(result)
+
+    if failures or control.cancelled:
+        journal.close()
+    else:
+        # Every row is done, so there is nothing left to resume
+        journal.discard()
+
+    if output_rows is not None:
+        rows = previous["rows"]
+        for filename in lost_names:
+            rows.pop(filename, None)
+        for filename in finished_names:
+            rows[filename] = entry_for(filename)
+        save_manifest(
+            output_folder,
+            {
+                "scad_file": os.path.abspath(scad_file),
+                "dependencies": dependencies,
+                "finished_at": time.time(),
+                "rows": rows,
+            },
+        )
 
-            for future in concurrent.futures.as_completed(future_to_export):
-                result = future.result()
-                if result is None:
-                    continue  # Skipped parameter set
-                status, info, duration = result
-                if status == "success":
-                    successes.append(info)
-                    export_times.append(duration)
-                    print(f"Exported: {info} in {duration:.2f} seconds.")
-                elif status == "failure":
-                    failures.append(info)
-                    export_times.append(duration)
-                    print(
-                        f"Error exporting {info[0]}: {info[1]} (Time: {duration:.2f} seconds)"
-                    )
+    # CSG trees of rows restored from the cache were never rendered
+    for csg_file in csg_files.values():
+        if os.path.exists(csg_file):
+            os.remove(csg_file)
+
+    if history is not None:
+        history.finish_run(run_id, len(successes), len(failures))
+
+    if shard is not None:
+        manifest_file = os.path.join(output_folder, manifest_name(*shard))
+        write_manifest(
+            manifest_file,
+            {
+                "shard": shard[0],
+                "shards": shard[1],
+                "method": method,
+                "fingerprint": fingerprint,
+                "scad_file": os.path.abspath(scad_file),
+                "parameter_file": os.path.abspath(parameter_file),
+                "parameter_digest": parameter_digest,
+                "selection": selection,
+                "total_rows": len(indices),
+                "started_at": started_at,
+                "finished_at": time.time(),
+                "rows": sorted(manifest_rows, key=lambda entry: entry["row"]),
+            },
+        )
+        log(f"Wrote shard manifest {manifest_file}.")
+
+    mesh_problems = {}
+    if inspect and not inspection_available():
+        log("Inspecting meshes requires NumPy ('pip install numpy'); skipping.", "warning")
+    elif inspect:
+        stl_files = [path for path in successes if path.lower().endswith(".stl")]
+        log(f"Inspecting {len(stl_files)} STL files...")
+        inspect_start = time.perf_counter()
+        report = inspect_files(stl_files, admission.jobs)
+        report_file = os.path.join(
+            output_folder,
+            REPORT_FILE if shard is None else f"shard-{shard[0]}-of-{shard[1]}.{REPORT_FILE}",
+        )
+        write_report(report_file, report)
+        mesh_problems = {
+            path: stats["problems"] for path, stats in report.items() if stats["problems"]
+        }
+        log(
+            f"Inspected {len(report)} files in "
+            f"{time.perf_counter() - inspect_start:.2f} seconds; wrote {report_file}."
+        )
+
+    plates = None
+    if arrange is not None and not inspection_available():
+        log("Arranging parts requires NumPy ('pip install numpy'); skipping.", "warning")
+    elif arrange is not None and control.cancelled:
+        log("Not arranging parts of a cancelled batch.")
+    elif arrange is not None:
+        part_files = list(successes)
+        # Parts of unchanged rows belong on the plates too
+        part_files += [
+            os.path.join(output_folder, name)
+            for filename in sorted(output_rows or ())
+            if duplicate_of.get(output_rows[filename][0], output_rows[filename][0])
+            in unchanged_rows
+            for name in entry_for(filename)["files"]
+        ]
+        plates_folder = os.path.join(
+            output_folder,
+            "plates" if shard is None else f"plates-shard-{shard[0]}-of-{shard[1]}",
+        )
+        plates = arrange_files(
+            [path for path in part_files if path.lower().endswith(".stl")],
+            plates_folder,
+            plate,
+            jobs=admission.jobs,
+        )
+        report_arrangement(plates, log)
+
+    if cache is not None:
+        removed, freed = cache.prune()
+        if removed:
+            log(f"Evicted {removed} cached renders ({format_size(freed)}).")
 
     total_end_time = time.perf_counter()
     total_duration = total_end_time - total_start_time
 
     # Summary of the batch export process
-    print("\nBatch export completed.")
-    print(f"Total exports attempted: {len(successes) + len(failures)}")
-    print(f"Successful exports: {len(successes)}")
+    if control.cancelled:
+        log("\nBatch export cancelled.", "warning")
+    else:
+        log("\nBatch export completed.")
+    log(f"Total exports attempted: {len(successes) + len(failures)}")
+    log(f"Successful exports: {len(successes)}")
+    if cache is not None:
+        log(f"Restored from cache: {len(cached)}")
+    if resume:
+        log(f"Already exported before resuming: {len(resumed)}")
+    if incremental:
+        log(f"Unchanged rows skipped: {len(unchanged_rows)}")
     if successes:
-        print("Successfully exported files:")
+        log("Successfully exported files:")
         for file in successes:
-            print(f"  - {file}")
-    print(f"Failed exports: {len(failures)}")
+            log(f"  - {file}")
+    log(f"Failed exports: {len(failures)}")
+    if timeout is not None:
+        log(f"Timed out exports: {len(timeouts)}")
+    if control.cancelled:
+        log(f"Cancelled exports: {len(cancelled)}")
+        log(f"Exports not started: {total_tasks - completed}")
     if failures:
-        print("Failed to export the following files:")
+        log("Failed to export the following files:", "error")
         for file, error in failures:
-            print(f"  - {file}: {error}")
-    print(f"\nTotal time taken: {total_duration:.2f} seconds.")
+            log(f"  - {file}: {error}", "error")
+    if inspect and inspection_available():
+        log(f"Meshes with problems: {len(mesh_problems)}")
+        for file, problems in mesh_problems.items():
+            log(f"  - {file}: {', '.join(problems)}")
+    log(f"\nTotal time taken: {total_duration:.2f} seconds.")
+
+    return ExportResult(
+        succeeded=successes,
+        failed=failures,
+        cached=cached,
+        resumed=resumed,
+        timed_out=timeouts,
+        cancelled=cancelled,
+        not_started=total_tasks - completed if control.cancelled else 0,
+        unchanged=len(unchanged_rows),
+        mesh_problems=mesh_problems,
+        plates=plates,
+        duration=total_duration,
+        interrupted=control.cancelled,
+    )
+
+
+def cache_command(cache_command, cache_dir, max_size):
+    """
+    Run a render cache maintenance command.
+
+    Args:
+        cache_command (str): Either 'stats' or 'prune'.
+        cache_dir (str or None): Cache directory, or None for the default location.
+        max_size (int): Maximum size of the cache in bytes.
+    """
+    cache = RenderCache(cache_dir, max_size)
+    if cache_command == "prune":
+        removed, freed = cache.prune()
+        print(f"Removed {removed} cached renders ({format_size(freed)}).")
+    stats = cache.stats()
+    print(f"Cache directory: {stats['directory']}")
+    print(f"Cached renders: {stats['entries']}")
+    print(
+        f"Total size: {format_size(stats['size'])} of {format_size(stats['max_size'])}"
+    )
+
+
+def history_command(history_db, scad_file, limit, threshold):
+    """
+    Show recent runs with their throughput and the regressions of the latest run.
+
+    Args:
+        history_db (str or None): History database, or None for the default location.
+        scad_file (str or None): Only show runs of this model.
+        limit (int): Number of recent runs to show.
+        threshold (float): Relative slowdown above which a parameter set counts as a regression.
+    """
+    history = RenderHistory(history_db)
+    try:
+        runs = history.runs(scad_file, limit)
+        if not runs:
+            print("No runs recorded.")
+            return
+        print(f"Recent runs ({history.path}):")
+        for run in runs:
+            started = datetime.fromtimestamp(run["started_at"]).strftime("%Y-%m-%d %H:%M")
+            line = f"  #{run['id']} {started} {os.path.basename(run['scad_file'])}: "
+            line += f"{run['succeeded'] or 0}/{run['renders']} renders succeeded"
+            if run["finished_at"] and run["renders"]:
+                wall = max(run["finished_at"] - run["started_at"], 1e-6)
+                line += f", wall time {format_duration(wall)}"
+                line += f", {run['renders'] / wall * 60:.1f} renders/min"
+                line += f", mean render {run['mean_duration']:.2f}s"
+            elif not run["finished_at"]:
+                line += " (unfinished)"
+            print(line)
+
+        # Compare the latest run with the previous run of the same model
+        latest = runs[0]
+        previous = next(
+            (
+                run
+                for run in history.runs(latest["scad_file"], limit + 1)
+                if run["id"] != latest["id"] and run["renders"]
+            ),
+            None,
+        )
+        if previous is None:
+            return
+        current_durations = history.run_durations(latest["id"])
+        previous_durations = history.run_durations(previous["id"])
+        common = [key for key in current_durations if key in previous_durations]
+        if not common:
+            print(f"\nRun #{latest['id']} shares no parameter sets with run #{previous['id']}.")
+            return
+        ratio = sum(current_durations[k] for k in common) / max(
+            sum(previous_durations[k] for k in common), 1e-9
+        )
+        print(
+            f"\nRun #{latest['id']} vs #{previous['id']}: {len(common)} common parameter sets "
+            f"took {abs(ratio - 1) * 100:.0f}% {'longer' if ratio >= 1 else 'less'}."
+        )
+        regressions = sorted(
+            (
+                (current_durations[k] / max(previous_durations[k], 1e-9), k)
+                for k in common
+                if current_durations[k] > previous_durations[k] * (1 + threshold)
+            ),
+            reverse=True,
+        )
+        if regressions:
+            print(f"Regressions (slower by more than {threshold * 100:.0f}%):")
+            for slowdown, key in regressions[:10]:
+                print(
+                    f"  - {previous_durations[key]:.2f}s -> {current_durations[key]:.2f}s "
+                    f"(x{slowdown:.2f}): {key.replace(chr(10), ' ')}"
+                )
+            if len(regressions) > 10:
+                print(f"  ... and {len(regressions) - 10} more.")
+    finally:
+        history.close()
+
+
+def drain_command(spool_dir, openscad_path, jobs, max_load, max_memory, lease, wait):
+    """
+    Render the jobs of a spool directory and report the results of this process.
+
+    Args:
+        spool_dir (str): Spool directory.
+        openscad_path (str): Path to the OpenSCAD executable.
+        jobs (int or None): Maximum number of concurrent renders.
+        max_load (float or None): Load average at or above which no further render is started.
+        max_memory (str or None): Memory usage at or above which no further render is started.
+        lease (float): Seconds after which unrefreshed claims of other drains are taken over.
+        wait (bool): Keep waiting for new jobs once the spool is empty.
+    """
+    try:
+        admission = AdmissionController(jobs, max_load, max_memory)
+    except ValueError as ve:
+        print(f"Invalid resource limit: {ve}")
+        sys.exit(1)
+    start_time = time.perf_counter()
+    successes, failures = drain_spool(
+        export_outputs,
+        spool_dir,
+        openscad_path,
+        admission,
+        lease,
+        probe_capabilities(openscad_path)["multiple_outputs"],
+        wait,
+    )
+    print("\nSpool drained.")
+    print(f"Jobs rendered by this process: {len(successes) + len(failures)}")
+    print(f"Successful jobs: {len(successes)}")
+    print(f"Failed jobs: {len(failures)}")
+    for record in failures:
+        print(f"  - row {record['row']}: {record['error']}")
+    print(f"\nTotal time taken: {time.perf_counter() - start_time:.2f} seconds.")
+
+
+def merge_command(paths, output):
+    """
+    Combine the manifests of a sharded export and report missing, duplicate and failed rows.
+
+    Exits with status 1 if any shard or row is missing, reported twice or failed.
+
+    Args:
+        paths (list of str): Manifest files or folders containing them.
+        output (str or None): Path of the combined report; defaults to manifest.json next
+            to the first manifest.
+    """
+    manifest_files = find_manifests(paths)
+    if not manifest_files:
+        print("No shard manifests found.")
+        sys.exit(1)
+    manifests = []
+    for path in manifest_files:
+        try:
+            with open(path) as f:
+                manifests.append(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Cannot read manifest {path}: {e}")
+            sys.exit(1)
+    batches = {
+        (m["shards"], m["parameter_digest"], m["selection"]) for m in manifests
+    }
+    if len(batches) > 1:
+        print("The manifests belong to different batches (shard count, parameter file or selection differ).")
+        sys.exit(1)
+
+    # The expected rows are recomputed when the parameter file is still unchanged
+    first = manifests[0]
+    expected_rows = None
+    try:
+        if hash_file(first["parameter_file"]) == first["parameter_digest"]:
+            total_params, _ = iter_parameters(first["parameter_file"])
+            expected_rows = (
+                parse_selection(first["selection"], total_params, first["parameter_file"])
+                if first["selection"]
+                else range(total_params)
+            )
+    except (OSError, ValueError):
+        pass
+    if expected_rows is None:
+        print(
+            f"Parameter file {first['parameter_file']} is missing or has changed; "
+            "only counting rows."
+        )
+
+    report = merge_manifests(manifests, expected_rows)
+    covered = report["total_rows"] - report["unaccounted_rows"]
+    print(
+        f"Merged {report['shards'] - len(report['missing_shards'])} of "
+        f"{report['shards']} shards covering {covered} of {report['total_rows']} rows."
+    )
+    problems = False
+    if len(report["fingerprints"]) > 1:
+        print("Warning: the shards were partitioned differently (changed plan or history).")
+    if report["missing_shards"]:
+        problems = True
+        print(f"Missing shards: {', '.join(map(str, report['missing_shards']))}")
+    if report["missing_rows"]:
+        problems = True
+        print(f"Missing rows: {', '.join(map(str, report['missing_rows']))}")
+    elif report["missing_rows"] is None and report["unaccounted_rows"]:
+        problems = True
+        print(f"Missing rows: {report['unaccounted_rows']}")
+    if report["duplicate_rows"]:
+        problems = True
+        print("Rows reported by more than one shard:")
+        for row, shards in report["duplicate_rows"].items():
+            print(f"  - row {row}: shards {', '.join(map(str, shards))}")
+    if report["failed_rows"]:
+        problems = True
+        print(f"Failed rows: {', '.join(map(str, report['failed_rows']))}")
+
+    if output is None:
+        output = os.path.join(os.path.dirname(os.path.abspath(manifest_files[0])), "manifest.json")
+    write_manifest(output, report)
+    print(f"Wrote merged manifest {output}.")
+    if problems:
+        sys.exit(1)
+
+
+def report_arrangement(layout, log=print):
+    """
+    Print the result of arranging parts on build plates.
+
+    Args:
+        layout (dict): Layout returned by arrange_files().
+        log (callable): Called with every line of the report. Defaults to print.
+    """
+    placed = sum(len(plate["parts"]) for plate in layout["plates"])
+    log(f"Arranged {placed} parts on {len(layout['plates'])} plates:")
+    for plate in layout["plates"]:
+        log(f"  - {plate['file']}: {len(plate['parts'])} parts")
+    if layout["too_large"]:
+        log("Parts larger than a plate:")
+        for path in layout["too_large"]:
+            log(f"  - {path}")
+    if layout["empty"]:
+        log(f"Empty parts left out: {', '.join(layout['empty'])}")
+
+
+def arrange_command(paths, plate, spacing, rotate, output_folder, jobs):
+    """
+    Arrange STL files on build plates and write one STL file per plate.
+
+    Args:
+        paths (list of str): STL files or folders containing them.
+        plate (str): Plate size as "WIDTHxDEPTH".
+        spacing (float): Minimum distance between parts.
+        rotate (bool): Whether parts may be turned by 90 degrees.
+        output_folder (str or None): Folder for the plates; defaults to 'plates' inside the
+            first folder given.
+        jobs (int or None): Number of files read or written at once.
+    """
+    if not inspection_available():
+        print("Arranging parts requires NumPy; install it with 'pip install numpy'.")
+        sys.exit(1)
+    try:
+        plate = parse_plate(plate)
+    except ValueError as ve:
+        print(ve)
+        sys.exit(1)
+    stl_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            stl_files += sorted(glob.glob(os.path.join(path, "*.stl")))
+            if output_folder is None:
+                output_folder = os.path.join(path, "plates")
+        else:
+            stl_files.append(path)
+    if output_folder is None:
+        output_folder = os.path.join(os.path.dirname(paths[0]) or ".", "plates")
+    start_time = time.perf_counter()
+    layout = arrange_files(
+        stl_files, output_folder, plate, spacing, rotate, jobs or default_jobs()
+    )
+    report_arrangement(layout)
+    print(f"\nTotal time taken: {time.perf_counter() - start_time:.2f} seconds.")
+
+
+def inspect_command(paths, jobs, output):
+    """
+    Check STL files and report the meshes that are empty, open or inverted.
+
+    Exits with status 1 if any mesh has a problem.
+
+    Args:
+        paths (list of str): STL files or folders containing them.
+        jobs (int or None): Number of files checked at once.
+        output (str or None): Path of the JSON report, or None to write no report.
+    """
+    if not inspection_available():
+        print("Inspecting meshes requires NumPy; install it with 'pip install numpy'.")
+        sys.exit(1)
+    stl_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            stl_files += sorted(glob.glob(os.path.join(path, "*.stl")))
+        else:
+            stl_files.append(path)
+    start_time = time.perf_counter()
+    report = inspect_files(stl_files, jobs or default_jobs())
+    problems = {path: stats for path, stats in report.items() if stats["problems"]}
+    for path, stats in problems.items():
+        detail = stats.get("error") or f"{stats['triangles']} triangles"
+        print(f"{path}: {', '.join(stats['problems'])} ({detail})")
+    print(
+        f"Checked {len(report)} STL files in {time.perf_counter() - start_time:.2f} seconds; "
+        f"{len(problems)} with problems."
+    )
+    if output is not None:
+        write_report(output, report)
+        print(f"Wrote report {output}.")
+    if problems:
+        sys.exit(1)
 
 
 def csv_to_json(csv_file, json_file):
@@ -555,6 +3216,28 @@ def json_to_csv(json_file, csv_file):
     print(f"Converted {json_file} to {csv_file}.")
 
 
+def cancel_on_signals(control):
+    """
+    Cancel a batch on Ctrl-C or SIGTERM instead of aborting it.
+
+    The first signal kills the running renders and lets the batch report its results; a
+    second Ctrl-C aborts right away.
+
+    Args:
+        control (BatchControl): Control of the batch to cancel.
+    """
+
+    def handle(signum, frame):
+        if control.cancelled and signum == signal.SIGINT:
+            raise KeyboardInterrupt
+        print("\nCancelling the batch export; press Ctrl-C again to abort.")
+        control.cancel()
+
+    signal.signal(signal.SIGINT, handle)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, handle)
+
+
 def main():
     """
     Entry point of the module. Parses arguments and executes the corresponding subcommand.
@@ -562,15 +3245,96 @@ def main():
     args = parse_arguments()
 
     if args.command == "export":
-        batch_export(
-            args.scad_file,
-            args.parameter_file,
-            args.output_folder,
+        cache = RenderCache(args.cache_dir, args.cache_max_size) if args.cache else None
+        history = None if args.no_history else RenderHistory(args.history_db)
+        control = BatchControl()
+        cancel_on_signals(control)
+        try:
+            batch_export(
+                args.scad_file,
+                args.parameter_file,
+                args.output_folder,
+                args.openscad_path,
+                args.export_format,
+                args.select,
+                args.sequential,
+                cache=cache,
+                cache_dir=args.cache_dir,
+                jobs=args.jobs,
+                max_load=args.max_load,
+                max_memory=args.max_memory,
+                history=history,
+                order=args.order,
+                timeout=args.timeout,
+                max_rss=args.max_rss,
+                retries=args.retries,
+                autotune=args.autotune,
+                retune=args.retune,
+                prune_unused=args.prune_unused,
+                two_stage=args.two_stage,
+                pack=args.pack,
+                workers=args.workers,
+                shard=args.shard,
+                spool=args.spool,
+                engine=args.engine,
+                control=control,
+                resume=args.resume,
+                incremental=args.incremental,
+                prune_removed=args.prune_removed,
+                inspect=args.inspect,
+                arrange=args.arrange,
+            )
+        except ExportError as e:
+            print(e)
+            sys.exit(1)
+        finally:
+            if history is not None:
+                history.close()
+        if control.cancelled:
+            sys.exit(130)
+    elif args.command == "worker":
+        try:
+            admission = AdmissionController(args.jobs, args.max_load, args.max_memory)
+        except ValueError as ve:
+            print(f"Invalid resource limit: {ve}")
+            sys.exit(1)
+        serve_worker(
+            export_outputs,
             args.openscad_path,
-            args.export_format,
-            args.select,
-            args.sequential,
+            admission,
+            args.host,
+            args.port,
+            args.bundle_dir,
+            probe_capabilities(args.openscad_path)["multiple_outputs"],
+            get_openscad_version(args.openscad_path),
+        )
+    elif args.command == "drain":
+        drain_command(
+            args.spool_dir,
+            args.openscad_path,
+            args.jobs,
+            args.max_load,
+            args.max_memory,
+            args.lease,
+            args.wait,
+        )
+    elif args.command == "merge":
+        merge_command(args.manifests, args.output)
+    elif args.command == "inspect":
+        inspect_command(args.paths, args.jobs, args.output)
+    elif args.command == "arrange":
+        arrange_command(
+            args.paths,
+            args.plate,
+            args.spacing,
+            not args.no_rotate,
+            args.output_folder,
+            args.jobs,
         )
+    elif args.command == "cache":
+        cache_command(args.cache_command, args.cache_dir, args.cache_max_size)
+    elif args.command == "history":
+        history_command(args.history_db, args.scad_file, args.limit, args.threshold)
     elif args.command == "csv2json":
         csv_to_json(args.csv_file, args.json_file)
     elif args.command == "json2csv":
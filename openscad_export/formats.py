@@ -0,0 +1,268 @@
+# openscad_export/formats.py
+
+"""
+Export formats and in-process conversion between mesh formats.
+
+A row can be exported in several formats at once. OpenSCAD versions that accept multiple
+-o options produce all of them from a single evaluation. For older versions the row is
+rendered once to STL and the other formats are written from that mesh here, so the CSG
+tree is still evaluated only once per row.
+"""
+
+import os
+import struct
+import zipfile
+
+from openscad_export.stl import BINARY_HEADER_SIZE, BINARY_TRIANGLE, is_binary_stl, iter_triangles
+
+# File extension per export format
+FORMAT_EXTENSIONS = {
+    "asciistl": ".stl",
+    "binstl": ".stl",
+    "off": ".off",
+    "3mf": ".3mf",
+    "png": ".png",
+}
+
+STL_FORMATS = ("asciistl", "binstl")
+
+THREEMF_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>
+</Types>
+"""
+
+THREEMF_RELATIONSHIPS = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Target="/3D/3dmodel.model" Id="rel0" Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>
+</Relationships>
+"""
+
+
+def parse_formats(export_format):
+    """
+    Parse a comma-separated list of export formats.
+
+    Args:
+        export_format (str or list of str): Formats such as "binstl,3mf,png".
+
+    Returns:
+        list of str: Formats in the given order without duplicates.
+
+    Raises:
+        ValueError: If a format is unknown or two formats would write the same file.
+    """
+    if isinstance(export_format, str):
+        export_format = export_format.split(",")
+    formats = []
+    for fmt in export_format:
+        fmt = fmt.strip().lower()
+        if not fmt or fmt in formats:
+            continue
+        if fmt not in FORMAT_EXTENSIONS:
+            raise ValueError(
+                f"Unknown export format '{fmt}'. "
+                f"Supported formats: {', '.join(FORMAT_EXTENSIONS)}."
+            )
+        formats.append(fmt)
+    if not formats:
+        raise ValueError("No export format given.")
+    if all(fmt in formats for fmt in STL_FORMATS):
+        raise ValueError("asciistl and binstl cannot be exported together.")
+    return formats
+
+
+def stl_format(formats):
+    """
+    Return the STL format among the requested formats.
+
+    Args:
+        formats (list of str): Requested formats.
+
+    Returns:
+        str or None: 'asciistl' or 'binstl', or None if no STL is requested.
+    """
+    for fmt in formats:
+        if fmt in STL_FORMATS:
+            return fmt
+    return None
+
+
+def facet_normal(a, b, c):
+    """
+    Compute the unit normal of a triangle.
+
+    Args:
+        a, b, c (tuple): Vertices in counter-clockwise order.
+
+    Returns:
+        tuple: (x, y, z) unit normal, or (0, 0, 0) for degenerate triangles.
+    """
+    u = (b[0] - a[0], b[1] - a[1], b[2] - a[2])
+    v = (c[0] - a[0], c[1] - a[1], c[2] - a[2])
+    n = (u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0])
+    length = (n[0] ** 2 + n[1] ** 2 + n[2] ** 2) ** 0.5
+    if not length:
+        return (0.0, 0.0, 0.0)
+    return (n[0] / length, n[1] / length, n[2] / length)
+
+
+def indexed_mesh(triangles):
+    """
+    Convert a triangle soup into shared vertices and index triples.
+
+    Args:
+        triangles (iterable): Triangles as three (x, y, z) tuples.
+
+    Returns:
+        tuple:
+            list of tuple: Unique vertices.
+            list of tuple: Vertex indices per triangle.
+    """
+    index = {}
+    vertices = []
+    faces = []
+    for triangle in triangles:
+        face = []
+        for vertex in triangle:
+            if vertex not in index:
+                index[vertex] = len(vertices)
+                vertices.append(vertex)
+            face.append(index[vertex])
+        faces.append(tuple(face))
+    return vertices, faces
+
+
+def write_binary_stl(triangles, path):
+    """
+    Write triangles to a binary STL file.
+
+    Args:
+        triangles (list): Triangles as three (x, y, z) tuples.
+        path (str): Output path.
+    """
+    with open(path, "wb") as f:
+        f.write(b"OpenSCAD Model".ljust(BINARY_HEADER_SIZE, b"\0"))
+        f.write(struct.pack("<I", len(triangles)))
+        for a, b, c in triangles:
+            f.write(BINARY_TRIANGLE.pack(*facet_normal(a, b, c), *a, *b, *c, 0))
+
+
+def write_ascii_stl(triangles, path):
+    """
+    Write triangles to an ASCII STL file.
+
+    Args:
+        triangles (list): Triangles as three (x, y, z) tuples.
+        path (str): Output path.
+    """
+    with open(path, "w") as f:
+        f.write("solid OpenSCAD_Model\n")
+        for triangle in triangles:
+            f.write("  facet normal %g %g %g\n    outer loop\n" % facet_normal(*triangle))
+            for vertex in triangle:
+                f.write("      vertex %.9g %.9g %.9g\n" % vertex)
+            f.write("    endloop\n  endfacet\n")
+        f.write("endsolid OpenSCAD_Model\n")
+
+
+def write_off(triangles, path):
+    """
+    Write triangles to an OFF file.
+
+    Args:
+        triangles (list): Triangles as three (x, y, z) tuples.
+        path (str): Output path.
+    """
+    vertices, faces = indexed_mesh(triangles)
+    with open(path, "w") as f:
+        f.write(f"OFF {len(vertices)} {len(faces)} 0\n")
+        for vertex in vertices:
+            f.write("%.9g %.9g %.9g\n" % vertex)
+        for face in faces:
+            f.write("3 %d %d %d\n" % face)
+
+
+def write_3mf(triangles, path):
+    """
+    Write triangles to a 3MF file.
+
+    Args:
+        triangles (list): Triangles as three (x, y, z) tuples.
+        path (str): Output path.
+    """
+    vertices, faces = indexed_mesh(triangles)
+    model = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<model unit="millimeter" xml:lang="en-US" '
+        'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n'
+        '<resources>\n<object id="1" type="model">\n<mesh>\n<vertices>\n'
+    ]
+    model += ['<vertex x="%.9g" y="%.9g" z="%.9g"/>\n' % vertex for vertex in vertices]
+    model.append("</vertices>\n<triangles>\n")
+    model += ['<triangle v1="%d" v2="%d" v3="%d"/>\n' % face for face in faces]
+    model.append(
+        '</triangles>\n</mesh>\n</object>\n</resources>\n'
+        '<build>\n<item objectid="1"/>\n</build>\n</model>\n'
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", THREEMF_CONTENT_TYPES)
+        archive.writestr("_rels/.rels", THREEMF_RELATIONSHIPS)
+        archive.writestr("3D/3dmodel.model", "".join(model))
+
+
+# In-process writers for formats derived from a rendered STL mesh
+MESH_WRITERS = {
+    "asciistl": write_ascii_stl,
+    "binstl": write_binary_stl,
+    "off": write_off,
+    "3mf": write_3mf,
+}
+
+
+def transcode(mesh_file, outputs):
+    """
+    Write a rendered STL mesh in other mesh formats.
+
+    Args:
+        mesh_file (str): Path to the rendered STL file.
+        outputs (list of tuple): (format, path) pairs; every format must be in MESH_WRITERS.
+    """
+    triangles = list(iter_triangles(mesh_file))
+    for fmt, path in outputs:
+        MESH_WRITERS[fmt](triangles, path)
+
+
+def ensure_stl_flavour(path, fmt):
+    """
+    Convert an STL file between ASCII and binary if it is not in the requested flavour.
+
+    OpenSCAD picks the STL flavour from --export-format, which cannot be set per output
+    when several outputs are written by one invocation.
+
+    Args:
+        path (str): Path to the STL file.
+        fmt (str): 'asciistl' or 'binstl'.
+    """
+    if is_binary_stl(path) == (fmt == "binstl"):
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    transcode(path, [(fmt, tmp_path)])
+    os.replace(tmp_path, path)
+
+
+def import_wrapper(mesh_file):
+    """
+    Return OpenSCAD source that only imports a rendered mesh.
+
+    Rendering a PNG from this source skips evaluating the original model.
+
+    Args:
+        mesh_file (str): Path to the rendered STL file.
+
+    Returns:
+        str: OpenSCAD source.
+    """
+    path = os.path.abspath(mesh_file).replace("\\", "/").replace('"', '\\"')
+    return f'import("{path}");\n'
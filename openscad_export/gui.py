@@ -18,12 +18,49 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import threading
 import os
-import sys
+import queue
+import time
 import subprocess
+import collections
 from datetime import datetime
 
 # Import functions from export.py
 import openscad_export.export as export
+from openscad_export.api import BatchExporter, ExportConfig
+from openscad_export.events import (
+    BatchStarted,
+    ExportError,
+    ExportFailed,
+    ExportFinished,
+    ExportSkipped,
+    ExportStarted,
+    LogMessage,
+)
+from openscad_export.scheduler import BatchControl, default_jobs, parse_memory_limit
+from openscad_export.history import RenderHistory, format_duration
+from openscad_export.formats import FORMAT_EXTENSIONS, parse_formats
+
+
+# Log levels, from least to most severe
+LOG_LEVELS = ("info", "warning", "error")
+
+# Lines kept in the log display and its ring buffer
+LOG_LINES = 5000
+
+# Interval in milliseconds at which queued log messages are shown
+LOG_FLUSH_MS = 100
+
+# Name of the full log written to the output folder when enabled
+LOG_FILE = "export_log.txt"
+
+# Seconds of recent results the throughput is measured over
+RATE_WINDOW = 30.0
+
+# Number of recent renders the average render time is taken over
+AVERAGE_RENDERS = 20
+
+# Renders running longer than this multiple of the average are marked as stragglers
+STRAGGLER_FACTOR = 2.0
 
 
 class OpenSCADBatchExporterGUI:
@@ -66,8 +103,18 @@ class OpenSCADBatchExporterGUI:
         self.export_format = tk.StringVar(value="binstl")
         self.selection = tk.StringVar()
         self.sequential = tk.BooleanVar()
+        self.jobs = tk.StringVar(value=str(default_jobs()))
+        self.max_load = tk.StringVar()
+        self.max_memory = tk.StringVar()
         self.export_thread = None
-        self.stop_event = threading.Event()
+        # Control of the running export, used by the Stop and Pause buttons
+        self.control = None
+        # Progress of the running export, fed by the export thread and read by update_progress
+        self.tracker = ProgressTracker()
+        # Messages from any thread are queued and shown by flush_log on the Tk thread
+        self.log = LogPipeline()
+        self.log_level = tk.StringVar(value="info")
+        self.save_log = tk.BooleanVar()
 
         # Lists to keep track of widgets that support 'state'
         self.state_widgets = []
@@ -158,8 +205,8 @@ class OpenSCADBatchExporterGUI:
         export_format_menu = ttk.Combobox(
             settings_frame,
             textvariable=self.export_format,
-            values=["asciistl", "binstl"],
-            state="readonly",
+            # Several formats can be typed as a comma-separated list, e.g. "binstl,3mf,png"
+            values=list(FORMAT_EXTENSIONS),
         )
         export_format_menu.grid(row=0, column=1, sticky=tk.W, padx=5, pady=5)
         export_format_menu.current(1)  # Default to binstl
@@ -175,7 +222,8 @@ class OpenSCADBatchExporterGUI:
         )
         self.state_widgets.append(self.selection_entry)
         selection_info = (
-            "e.g., '0-5', '1-3,7,10-12', 'every:2 in 0-10', 'from:5', 'up_to:4'"
+            "e.g., '0-5', '1-3,7,10-12', 'every:2 in 0-10', 'from:5', 'up_to:4', "
+            "'where:gx>=3 and height<5'"
         )
         ttk.Label(settings_frame, text=selection_info, foreground="gray").grid(
             row=1, column=3, sticky=tk.W, padx=5, pady=5
@@ -188,6 +236,34 @@ class OpenSCADBatchExporterGUI:
         self.seq_check.grid(row=2, column=1, sticky=tk.W, padx=5, pady=5)
         self.state_widgets.append(self.seq_check)
 
+        # Resource Limits
+        ttk.Label(settings_frame, text="Resource Limits:").grid(
+            row=3, column=0, sticky=tk.W, padx=5, pady=5
+        )
+        limits_frame = ttk.Frame(settings_frame)
+        limits_frame.grid(row=3, column=1, columnspan=3, sticky=tk.W, padx=5, pady=5)
+        ttk.Label(limits_frame, text="Jobs:").grid(row=0, column=0, sticky=tk.W)
+        self.jobs_spinbox = ttk.Spinbox(
+            limits_frame, from_=1, to=1024, width=5, textvariable=self.jobs
+        )
+        self.jobs_spinbox.grid(row=0, column=1, sticky=tk.W, padx=(5, 15))
+        self.state_widgets.append(self.jobs_spinbox)
+        ttk.Label(limits_frame, text="Max Load:").grid(row=0, column=2, sticky=tk.W)
+        self.max_load_entry = ttk.Entry(
+            limits_frame, width=8, textvariable=self.max_load
+        )
+        self.max_load_entry.grid(row=0, column=3, sticky=tk.W, padx=(5, 15))
+        self.state_widgets.append(self.max_load_entry)
+        ttk.Label(limits_frame, text="Max Memory:").grid(row=0, column=4, sticky=tk.W)
+        self.max_memory_entry = ttk.Entry(
+            limits_frame, width=8, textvariable=self.max_memory
+        )
+        self.max_memory_entry.grid(row=0, column=5, sticky=tk.W, padx=(5, 15))
+        self.state_widgets.append(self.max_memory_entry)
+        ttk.Label(
+            limits_frame, text="e.g., load '8', memory '80%' or '24G'", foreground="gray"
+        ).grid(row=0, column=6, sticky=tk.W)
+
         # === Progress and Status Frame ===
         progress_frame = ttk.Frame(main_frame, padding="10 10 10 10")
         progress_frame.grid(row=2, column=0, columnspan=2, sticky=tk.EW, padx=5, pady=5)
@@ -205,12 +281,41 @@ class OpenSCADBatchExporterGUI:
         )
         self.status_label.grid(row=1, column=0, sticky=tk.W, padx=5, pady=5)
 
+        # Counts and Throughput
+        self.stats_label = ttk.Label(progress_frame, text="", foreground="gray")
+        self.stats_label.grid(row=2, column=0, sticky=tk.W, padx=5)
+
+        # Worker Timeline: what every render slot is working on and for how long
+        timeline_frame = ttk.Frame(progress_frame)
+        timeline_frame.grid(row=3, column=0, sticky=tk.EW, padx=5, pady=5)
+        timeline_frame.columnconfigure(0, weight=1)
+        self.timeline = ttk.Treeview(
+            timeline_frame,
+            columns=("slot", "row", "name", "running"),
+            show="headings",
+            height=4,
+        )
+        for column, heading, width in (
+            ("slot", "Slot", 60),
+            ("row", "Row", 80),
+            ("name", "Parameter Set", 400),
+            ("running", "Running For", 120),
+        ):
+            self.timeline.heading(column, text=heading)
+            self.timeline.column(column, width=width, stretch=column == "name")
+        self.timeline.tag_configure("straggler", foreground="red")
+        self.timeline.tag_configure("idle", foreground="gray")
+        self.timeline.grid(row=0, column=0, sticky=tk.EW)
+        timeline_scrollbar = ttk.Scrollbar(timeline_frame, command=self.timeline.yview)
+        timeline_scrollbar.grid(row=0, column=1, sticky=tk.NS)
+        self.timeline.configure(yscrollcommand=timeline_scrollbar.set)
+
         # === Buttons Frame ===
         buttons_frame = ttk.Frame(main_frame, padding="10 10 10 10")
         buttons_frame.grid(row=3, column=0, columnspan=2, sticky=tk.EW, padx=5, pady=5)
 
         # Configure grid within buttons_frame
-        for col in range(5):
+        for col in range(7):
             buttons_frame.columnconfigure(col, weight=1)
 
         # Export Button
@@ -244,6 +349,16 @@ class OpenSCADBatchExporterGUI:
         help_btn.grid(row=0, column=4, padx=5, pady=5, sticky=tk.EW)
         # Do NOT append help_btn to self.state_widgets to keep it enabled during processing
 
+        # Stop and Pause Buttons, only enabled while an export runs
+        self.stop_btn = ttk.Button(
+            buttons_frame, text="Stop", command=self.stop_export, state="disabled"
+        )
+        self.stop_btn.grid(row=0, column=5, padx=5, pady=5, sticky=tk.EW)
+        self.pause_btn = ttk.Button(
+            buttons_frame, text="Pause", command=self.toggle_pause, state="disabled"
+        )
+        self.pause_btn.grid(row=0, column=6, padx=5, pady=5, sticky=tk.EW)
+
         # === Log Output Frame ===
         log_frame = ttk.LabelFrame(main_frame, text="Log", padding="10 10 10 10")
         log_frame.grid(row=4, column=0, columnspan=2, sticky=tk.NSEW, padx=5, pady=5)
@@ -261,6 +376,32 @@ class OpenSCADBatchExporterGUI:
         scrollbar.grid(row=0, column=1, sticky=tk.NS, pady=5)
         self.log_text.configure(yscrollcommand=scrollbar.set)
 
+        # Log Level Filter and Log File
+        log_options_frame = ttk.Frame(log_frame)
+        log_options_frame.grid(row=1, column=0, columnspan=2, sticky=tk.W)
+        ttk.Label(log_options_frame, text="Show:").grid(row=0, column=0, sticky=tk.W)
+        log_level_menu = ttk.Combobox(
+            log_options_frame,
+            textvariable=self.log_level,
+            values=list(LOG_LEVELS),
+            state="readonly",
+            width=8,
+        )
+        log_level_menu.grid(row=0, column=1, sticky=tk.W, padx=(5, 15))
+        log_level_menu.bind("<<ComboboxSelected>>", lambda event: self.refresh_log())
+        ttk.Label(log_options_frame, text="and more severe messages", foreground="gray").grid(
+            row=0, column=2, sticky=tk.W, padx=(0, 15)
+        )
+        self.save_log_check = ttk.Checkbutton(
+            log_options_frame,
+            text=f"Save full log to {LOG_FILE} in the output folder",
+            variable=self.save_log,
+        )
+        self.save_log_check.grid(row=0, column=3, sticky=tk.W)
+        self.state_widgets.append(self.save_log_check)
+
+        self.master.after(LOG_FLUSH_MS, self.flush_log)
+
     def browse_scad(self):
         """
         Open a file dialog to browse and select an OpenSCAD (.scad) file.
@@ -297,27 +438,79 @@ class OpenSCADBatchExporterGUI:
         if file_path:
             self.openscad_path.set(file_path)
 
-    def append_log(self, message):
+    def append_log(self, message, level="info"):
         """
-        Append a timestamped message to the log display.
+        Queue a timestamped message for the log display.
+
+        Safe to call from any thread; the message is shown by the next flush_log.
 
         Args:
             message (str): The message to append.
+            level (str): 'info', 'warning' or 'error'.
         """
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        full_message = f"[{timestamp}] {message}"
+        self.log.put(message, level)
+
+    def shown_levels(self):
+        """
+        Return the log levels that pass the level filter.
+        """
+        return LOG_LEVELS[LOG_LEVELS.index(self.log_level.get()):]
+
+    def show_log_lines(self, lines, replace=False):
+        """
+        Add lines to the log display, keeping at most LOG_LINES.
+
+        The display only scrolls along if it was showing the end of the log, so reading
+        earlier messages is not interrupted.
+
+        Args:
+            lines (list of str): Lines to add.
+            replace (bool): Replace the displayed lines instead of adding to them.
+        """
+        following = self.log_text.yview()[1] >= 1.0
         self.log_text.configure(state=tk.NORMAL)
-        self.log_text.insert(tk.END, full_message + "\n")
-        self.log_text.see(tk.END)
+        if replace:
+            self.log_text.delete(1.0, tk.END)
+        if lines:
+            self.log_text.insert(tk.END, "\n".join(lines[-LOG_LINES:]) + "\n")
+        excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - LOG_LINES
+        if excess > 0:
+            self.log_text.delete(1.0, f"{excess + 1}.0")
         self.log_text.configure(state=tk.DISABLED)
+        if following or replace:
+            self.log_text.see(tk.END)
+
+    def show_queued_log(self):
+        """
+        Show the queued log messages in one batch.
+        """
+        levels = self.shown_levels()
+        lines = [text for level, text in self.log.drain() if level in levels]
+        if lines:
+            self.show_log_lines(lines)
+
+    def flush_log(self):
+        """
+        Show the queued log messages and schedule the next flush.
+        """
+        self.show_queued_log()
+        self.master.after(LOG_FLUSH_MS, self.flush_log)
+
+    def refresh_log(self):
+        """
+        Show the buffered log again after the level filter changed.
+        """
+        levels = self.shown_levels()
+        self.show_log_lines(
+            [text for level, text in self.log.lines if level in levels], replace=True
+        )
 
     def clear_log(self):
         """
         Clear all messages from the log display.
         """
-        self.log_text.configure(state=tk.NORMAL)
-        self.log_text.delete(1.0, tk.END)
-        self.log_text.configure(state=tk.DISABLED)
+        self.log.clear()
+        self.show_log_lines([], replace=True)
 
     def disable_controls(self):
         """
@@ -376,6 +569,33 @@ class OpenSCADBatchExporterGUI:
         sel = self.selection.get()
         seq = self.sequential.get()
 
+        # Validate resource limits
+        try:
+            jobs = int(self.jobs.get())
+            if jobs < 1:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Error", "Jobs must be a positive whole number.")
+            return
+        try:
+            max_load = float(self.max_load.get()) if self.max_load.get().strip() else None
+        except ValueError:
+            messagebox.showerror("Error", "Max load must be a number.")
+            return
+        max_memory = self.max_memory.get().strip() or None
+        if max_memory:
+            try:
+                parse_memory_limit(max_memory)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+        limits = (jobs, max_load, max_memory)
+        try:
+            parse_formats(fmt)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
         # Input validation
         if not scad or not os.path.isfile(scad):
             messagebox.showerror(
@@ -407,19 +627,31 @@ class OpenSCADBatchExporterGUI:
         # Disable controls and reset progress
         self.disable_controls()
         self.progress["value"] = 0
+        self.tracker = ProgressTracker()
         self.status_label.config(text="Status: Exporting...", foreground="green")
+        if self.save_log.get():
+            try:
+                self.log.open_file(os.path.join(output, LOG_FILE))
+            except OSError as e:
+                messagebox.showerror("Error", f"Cannot write the log file:\n{e}")
+                self.enable_controls()
+                self.status_label.config(text="Status: Idle", foreground="blue")
+                return
         self.append_log("Starting batch export...")
+        self.control = BatchControl()
+        self.stop_btn.config(state="normal")
+        self.pause_btn.config(state="normal", text="Pause")
 
         # Start export in a separate thread to keep GUI responsive
         self.export_thread = threading.Thread(
             target=self.run_export,
-            args=(scad, param, output, openscad, fmt, sel, seq),
+            args=(scad, param, output, openscad, fmt, sel, seq, limits),
             daemon=True,
         )
         self.export_thread.start()
         self.master.after(100, self.update_progress)
 
-    def run_export(self, scad, param, output, openscad, fmt, sel, seq):
+    def run_export(self, scad, param, output, openscad, fmt, sel, seq, limits):
         """
         Execute the batch export process and handle exceptions.
 
@@ -431,37 +663,157 @@ class OpenSCADBatchExporterGUI:
             fmt (str): Export format ('asciistl' or 'binstl').
             sel (str): Selection string for parameter sets.
             seq (bool): Whether to process exports sequentially.
+            limits (tuple): Maximum jobs, load average and memory usage for concurrent renders.
         """
+        jobs, max_load, max_memory = limits
+        history = None
         try:
-            # Redirect stdout to capture print statements in the GUI log
-            original_stdout = sys.stdout
-            sys.stdout = ExportLogger(self)
-            export.batch_export(scad, param, output, openscad, fmt, sel, seq)
+            history = RenderHistory()
+            exporter = BatchExporter(
+                ExportConfig(
+                    scad,
+                    param,
+                    output,
+                    openscad,
+                    fmt,
+                    sel,
+                    seq,
+                    jobs=jobs,
+                    max_load=max_load,
+                    max_memory=max_memory,
+                    history=history,
+                ),
+                self.control,
+            )
+            # Progress arrives as events, so stdout needs no redirection
+            for event in exporter.export_iter():
+                if isinstance(event, LogMessage):
+                    self.append_log(event.text.strip(), event.level)
+                else:
+                    self.tracker.handle(event)
+        except ExportError as e:
+            self.append_log(str(e), "error")
+            # Dialogs may only be opened from the Tk thread
+            self.master.after(0, messagebox.showerror, "Error", str(e))
         except Exception as e:
-            self.append_log(f"An error occurred: {str(e)}")
-            messagebox.showerror("Error", f"An error occurred during export:\n{str(e)}")
+            self.append_log(f"An error occurred: {str(e)}", "error")
+            self.master.after(
+                0,
+                messagebox.showerror,
+                "Error",
+                f"An error occurred during export:\n{str(e)}",
+            )
         finally:
-            # Restore original stdout and re-enable controls
-            sys.stdout = original_stdout
-            self.enable_controls()
-            self.status_label.config(text="Status: Idle", foreground="blue")
-            self.append_log("Batch export completed.")
+            # Controls are re-enabled by update_progress on the Tk thread
+            if history is not None:
+                history.close()
+            if self.control.cancelled:
+                self.append_log("Batch export cancelled.", "warning")
+            else:
+                self.append_log("Batch export completed.")
+
+    def stop_export(self):
+        """
+        Cancel the running export, killing the renders in progress.
+        """
+        if self.control is None or self.control.cancelled:
+            return
+        self.append_log("Stopping batch export...", "warning")
+        self.control.cancel()
+        self.stop_btn.config(state="disabled")
+        self.pause_btn.config(state="disabled")
+
+    def toggle_pause(self):
+        """
+        Pause the running export, suspending its renders, or resume it.
+        """
+        if self.control is None or self.control.cancelled:
+            return
+        if self.control.paused:
+            self.control.resume()
+            self.pause_btn.config(text="Pause")
+            self.append_log("Batch export resumed.")
+        else:
+            self.control.pause()
+            self.pause_btn.config(text="Resume")
+            self.append_log("Batch export paused.")
 
     def update_progress(self):
         """
-        Update the progress bar based on the status of the export thread.
+        Update the progress bar, the counts and the worker timeline while an export runs.
         """
+        stats = self.tracker.snapshot()
         if self.export_thread.is_alive():
-            # Update the progress bar to indeterminate mode
-            self.progress.config(mode="indeterminate")
-            if not self.progress["value"]:
-                self.progress.start(10)
+            if stats["total"] is None:
+                # Still planning the batch; show activity in indeterminate mode
+                self.progress.config(mode="indeterminate")
+                if not self.progress["value"]:
+                    self.progress.start(10)
+            else:
+                completed, total = stats["completed"], stats["total"]
+                if str(self.progress["mode"]) != "determinate":
+                    self.progress.stop()
+                    self.progress.config(mode="determinate")
+                self.progress["value"] = completed / total * 100 if total else 100
+                status = f"Status: Exporting... {completed}/{total}"
+                if self.control.paused:
+                    status = f"Status: Paused at {completed}/{total}"
+                elif stats["eta"] is not None:
+                    status += f", ETA {format_duration(stats['eta'])}"
+                self.status_label.config(text=status, foreground="green")
+            self.show_stats(stats)
             self.master.after(100, self.update_progress)
         else:
             # Stop the progress bar and set it to complete
             self.progress.stop()
             self.progress.config(mode="determinate")
             self.progress["value"] = 100
+            self.show_stats(stats)
+            self.stop_btn.config(state="disabled")
+            self.pause_btn.config(state="disabled", text="Pause")
+            self.enable_controls()
+            self.status_label.config(text="Status: Idle", foreground="blue")
+            # Everything the export logged is queued by now
+            self.show_queued_log()
+            self.log.close_file()
+
+    def show_stats(self, stats):
+        """
+        Show the counts, the throughput and the worker timeline of the export.
+
+        Args:
+            stats (dict): Result of ProgressTracker.snapshot().
+        """
+        if stats["total"] is None:
+            self.stats_label.config(text="")
+        else:
+            text = (
+                f"Completed: {stats['succeeded']}   Failed: {stats['failed']}   "
+                f"Skipped: {stats['skipped']}   Remaining: {stats['remaining']}   "
+                f"Throughput: {stats['rate']:.2f} jobs/s"
+            )
+            if stats["average"] is not None:
+                text += f"   Average render: {stats['average']:.2f} s"
+            self.stats_label.config(text=text)
+
+        slots = stats["slots"]
+        for iid in self.timeline.get_children()[len(slots):]:
+            self.timeline.delete(iid)
+        for number, slot in enumerate(slots):
+            if slot is None:
+                values, tags = (number + 1, "", "idle", ""), ("idle",)
+            else:
+                row, name, running = slot
+                values = (number + 1, row, name, format_duration(running))
+                straggling = (
+                    stats["average"] is not None
+                    and running > STRAGGLER_FACTOR * stats["average"]
+                )
+                tags = ("straggler",) if straggling else ()
+            if self.timeline.exists(str(number)):
+                self.timeline.item(str(number), values=values, tags=tags)
+            else:
+                self.timeline.insert("", tk.END, iid=str(number), values=values, tags=tags)
 
     def convert_csv_to_json(self):
         """
@@ -501,16 +853,20 @@ class OpenSCADBatchExporterGUI:
         try:
             export.csv_to_json(csv_file, json_file)
             self.append_log("CSV to JSON conversion completed successfully.")
-            messagebox.showinfo(
-                "Success", "CSV to JSON conversion completed successfully."
+            self.master.after(
+                0,
+                messagebox.showinfo,
+                "Success",
+                "CSV to JSON conversion completed successfully.",
             )
         except Exception as e:
-            self.append_log(f"Conversion failed: {str(e)}")
-            messagebox.showerror("Error", f"CSV to JSON conversion failed:\n{str(e)}")
+            self.append_log(f"Conversion failed: {str(e)}", "error")
+            self.master.after(
+                0, messagebox.showerror, "Error", f"CSV to JSON conversion failed:\n{str(e)}"
+            )
         finally:
-            # Re-enable controls and update status
-            self.enable_controls()
-            self.status_label.config(text="Status: Idle", foreground="blue")
+            # Widgets may only be touched from the Tk thread
+            self.master.after(0, self.finish_conversion)
 
     def convert_json_to_csv(self):
         """
@@ -550,16 +906,27 @@ class OpenSCADBatchExporterGUI:
         try:
             export.json_to_csv(json_file, csv_file)
             self.append_log("JSON to CSV conversion completed successfully.")
-            messagebox.showinfo(
-                "Success", "JSON to CSV conversion completed successfully."
+            self.master.after(
+                0,
+                messagebox.showinfo,
+                "Success",
+                "JSON to CSV conversion completed successfully.",
             )
         except Exception as e:
-            self.append_log(f"Conversion failed: {str(e)}")
-            messagebox.showerror("Error", f"JSON to CSV conversion failed:\n{str(e)}")
+            self.append_log(f"Conversion failed: {str(e)}", "error")
+            self.master.after(
+                0, messagebox.showerror, "Error", f"JSON to CSV conversion failed:\n{str(e)}"
+            )
         finally:
-            # Re-enable controls and update status
-            self.enable_controls()
-            self.status_label.config(text="Status: Idle", foreground="blue")
+            # Widgets may only be touched from the Tk thread
+            self.master.after(0, self.finish_conversion)
+
+    def finish_conversion(self):
+        """
+        Re-enable the controls after a conversion and reset the status.
+        """
+        self.enable_controls()
+        self.status_label.config(text="Status: Idle", foreground="blue")
 
     def show_help(self):
         """
@@ -628,35 +995,185 @@ class OpenSCADBatchExporterGUI:
         text.configure(yscrollcommand=scrollbar.set)
 
 
-class ExportLogger:
+class LogPipeline:
     """
-    A simple logger class to redirect stdout to the GUI log.
+    Thread-safe log of the GUI with a bounded history.
+
+    Any thread may put messages; the Tk thread drains them in batches, so worker threads
+    never touch the widgets and the display is updated a few times a second rather than
+    once per line. The last LOG_LINES messages are kept for the level filter, and every
+    message can also be written to a file.
     """
 
-    def __init__(self, gui):
+    def __init__(self, max_lines=LOG_LINES):
         """
-        Initialize the ExportLogger.
+        Initialize an empty log.
 
         Args:
-            gui (OpenSCADBatchExporterGUI): The GUI instance to append logs to.
+            max_lines (int): Number of messages kept in memory.
         """
-        self.gui = gui
+        self.queue = queue.SimpleQueue()
+        # (level, text) of the last messages, oldest first
+        self.lines = collections.deque(maxlen=max_lines)
+        self.file = None
 
-    def write(self, message):
+    def put(self, message, level="info"):
         """
-        Write a message to the GUI log if it's not empty.
+        Queue a message with the current time. Safe to call from any thread.
 
         Args:
-            message (str): The message to write.
+            message (str): The message.
+            level (str): 'info', 'warning' or 'error'.
         """
-        if message.strip():
-            self.gui.append_log(message.strip())
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.queue.put((level, f"[{timestamp}] {message}"))
+
+    def drain(self):
+        """
+        Take the queued messages, keep them in the history and write them to the log file.
+
+        Returns:
+            list of tuple: (level, text) of every message queued since the last call.
+        """
+        messages = []
+        while True:
+            try:
+                messages.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if messages:
+            self.lines.extend(messages)
+            if self.file is not None:
+                self.file.write("".join(f"{text}\n" for _, text in messages))
+                self.file.flush()
+        return messages
+
+    def clear(self):
+        """
+        Forget the kept messages. The log file is left as it is.
+        """
+        self.lines.clear()
+
+    def open_file(self, path):
+        """
+        Start writing every message to a file, replacing an earlier one.
+
+        Args:
+            path (str): Log file.
+        """
+        self.close_file()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, "w", encoding="utf-8")
 
-    def flush(self):
+    def close_file(self):
         """
-        Flush method required for file-like objects. No action needed.
+        Stop writing to the log file.
+        """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ProgressTracker:
+    """
+    Progress of a batch export, built from its events.
+
+    The export thread feeds the events and the Tk thread takes snapshots, so both sides
+    only hold the lock briefly. Every render is shown in the slot its ExportStarted event
+    names until its row is done or the slot starts another render, which shows how long
+    each slot has been busy and which slots are idle.
+    """
+
+    def __init__(self):
+        """
+        Initialize the progress of a batch that has not started.
+        """
+        self.lock = threading.Lock()
+        self.total = None
+        self.jobs = 0
+        self.started_at = None
+        self.counts = {"succeeded": 0, "failed": 0, "skipped": 0}
+        self.completed = 0
+        self.eta = None
+        # Finish times of recent results and durations of recent renders
+        self.finished = collections.deque()
+        self.durations = collections.deque(maxlen=AVERAGE_RENDERS)
+        # Row, parameter set name and start time of the render in every slot, or None
+        self.slots = []
+        self.slot_of = {}
+
+    def handle(self, event):
+        """
+        Update the progress with an event of the batch.
+
+        Args:
+            event: Event yielded by BatchExporter.export_iter().
+        """
+        with self.lock:
+            if isinstance(event, BatchStarted):
+                self.total = event.total
+                self.jobs = event.jobs
+                self.started_at = event.time
+                self.slots = [None] * event.jobs
+            elif isinstance(event, ExportStarted):
+                if event.slot is not None and event.slot < len(self.slots):
+                    self.slot_of[event.row] = event.slot
+                    self.slots[event.slot] = (event.row, event.filename, event.time)
+            elif isinstance(event, (ExportFinished, ExportFailed, ExportSkipped)):
+                slot = self.slot_of.pop(event.row, None)
+                render = self.slots[slot] if slot is not None else None
+                # The slot may already run the next render, or another row of its pack
+                if render is not None and render[0] == event.row:
+                    self.slots[slot] = None
+                if isinstance(event, ExportFinished):
+                    self.counts["succeeded"] += 1
+                elif isinstance(event, ExportFailed):
+                    self.counts["failed"] += 1
+                else:
+                    self.counts["skipped"] += 1
+                if not isinstance(event, ExportSkipped):
+                    self.durations.append(event.duration)
+                self.completed = event.completed
+                self.total = event.total
+                self.eta = event.eta
+                self.finished.append(event.time)
+
+    def snapshot(self):
+        """
+        Return the current progress.
+
+        Returns:
+            dict: 'total' (None until the batch starts rendering), 'completed', 'succeeded',
+                'failed', 'skipped' and 'remaining' rows, 'rate' in jobs per second over the
+                last RATE_WINDOW seconds, 'average' render time of the last renders or None,
+                'eta' in seconds or None, and 'slots' with (row, name, seconds running) of
+                every slot's render, or None for idle slots.
         """
-        pass  # No action needed
+        now = time.time()
+        with self.lock:
+            while self.finished and self.finished[0] < now - RATE_WINDOW:
+                self.finished.popleft()
+            window = min(RATE_WINDOW, now - self.started_at) if self.started_at else 0
+            rate = len(self.finished) / window if window > 0 else 0.0
+            average = sum(self.durations) / len(self.durations) if self.durations else None
+            remaining = self.total - self.completed if self.total is not None else 0
+            eta = self.eta
+            if eta is None and rate > 0:
+                # No prediction from the run history; extrapolate the throughput
+                eta = remaining / rate
+            return {
+                "total": self.total,
+                "completed": self.completed,
+                "remaining": remaining,
+                "rate": rate,
+                "average": average,
+                "eta": eta if remaining else None,
+                "slots": [
+                    None if slot is None else (slot[0], slot[1], now - slot[2])
+                    for slot in self.slots
+                ],
+                **self.counts,
+            }
 
 
 def main():
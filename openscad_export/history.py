@@ -0,0 +1,575 @@
+# openscad_export/history.py
+
+"""
+Persistent run history, render cost prediction and ETA estimation.
+
+Every batch is stored as a run and every OpenSCAD invocation as a render in a small SQLite
+database: the .scad file and its source hash, the parameters, duration, status, output size
+and OpenSCAD version. Before a batch starts, the history is used to predict how long each
+row will take: rows rendered before use their recorded timings, and rows without history
+fall back to a linear regression over the numeric parameter columns of earlier renders of
+the same model. The predictions drive longest-first scheduling and the ETA shown while the
+batch runs.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from openscad_export.cache import default_cache_dir
+from openscad_export.selection import to_number
+
+SCHEMA_VERSION = 1
+
+# Number of records after which pending inserts are committed
+COMMIT_INTERVAL = 50
+
+# Most recent renders used to fit the regression fallback
+REGRESSION_SAMPLES = 5000
+
+
+def default_history_path():
+    """
+    Return the default location of the history database.
+
+    Returns:
+        str: Path to the SQLite database inside the cache directory.
+    """
+    return os.path.join(default_cache_dir(), "history.sqlite3")
+
+
+def params_key(d_flags):
+    """
+    Return the canonical identity of a parameter set.
+
+    Args:
+        d_flags (list of str): -D flags from construct_d_flags().
+
+    Returns:
+        str: Sorted flags joined into a single string.
+    """
+    return "\n".join(sorted(d_flags))
+
+
+def numeric_params(param_set):
+    """
+    Extract the numeric parameters of a parameter set.
+
+    Args:
+        param_set (dict): Parameter dictionary.
+
+    Returns:
+        dict: Mapping of parameter name to float for every numeric parameter.
+    """
+    values = {}
+    for key, value in param_set.items():
+        if key == "exported_filename":
+            continue
+        number = to_number(value)
+        if number is not None:
+            values[key] = number
+    return values
+
+
+class RenderHistory:
+    """
+    SQLite-backed store of runs and renders, safe to share between worker threads.
+    """
+
+    def __init__(self, path=None):
+        """
+        Open (and create if necessary) the history database.
+
+        Args:
+            path (str or None): Database path. Defaults to default_history_path().
+        """
+        self.path = path or default_history_path()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.connection = sqlite3.connect(
+            self.path, timeout=30, check_same_thread=False
+        )
+        self._create_schema()
+
+    def _create_schema(self):
+        """
+        Create the tables of an empty database.
+        """
+        with self.lock:
+            self.connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY,
+                    scad_file TEXT NOT NULL,
+                    scad_hash TEXT,
+                    openscad_version TEXT,
+                    jobs INTEGER,
+                    total INTEGER,
+                    succeeded INTEGER,
+                    failed INTEGER,
+                    started_at REAL NOT NULL,
+                    finished_at REAL
+                );
+                CREATE TABLE IF NOT EXISTS renders (
+                    id INTEGER PRIMARY KEY,
+                    scad_file TEXT NOT NULL,
+                    params_key TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    duration REAL NOT NULL,
+                    recorded_at REAL NOT NULL,
+                    run_id INTEGER REFERENCES runs (id),
+                    status TEXT NOT NULL DEFAULT 'success',
+                    error TEXT,
+                    output_size INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS renders_by_params
+                    ON renders (scad_file, params_key);
+                CREATE INDEX IF NOT EXISTS renders_by_run ON renders (run_id);
+                """
+            )
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self.connection.commit()
+
+    def start_run(self, scad_file, scad_hash, openscad_version, jobs, total):
+        """
+        Record the start of a batch.
+
+        Args:
+            scad_file (str): Path to the OpenSCAD (.scad) file.
+            scad_hash (str): Digest of the model source and its dependencies.
+            openscad_version (str): Version string of the OpenSCAD executable.
+            jobs (int): Maximum number of concurrent renders.
+            total (int): Number of selected parameter sets.
+
+        Returns:
+            int: Identifier of the run.
+        """
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (scad_file, scad_hash, openscad_version, jobs, total,"
+                " started_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    os.path.abspath(scad_file),
+                    scad_hash,
+                    openscad_version,
+                    jobs,
+                    total,
+                    time.time(),
+                ),
+            )
+            self.connection.commit()
+            return cursor.lastrowid
+
+    def finish_run(self, run_id, succeeded, failed):
+        """
+        Record the end of a batch.
+
+        Args:
+            run_id (int): Identifier returned by start_run().
+            succeeded (int): Number of successful exports.
+            failed (int): Number of failed exports.
+        """
+        with self.lock:
+            self.connection.execute(
+                "UPDATE runs SET succeeded = ?, failed = ?, finished_at = ? WHERE id = ?",
+                (succeeded, failed, time.time(), run_id),
+            )
+            self.connection.commit()
+            self.pending = 0
+
+    def record(
+        self,
+        run_id,
+        scad_file,
+        key,
+        param_set,
+        duration,
+        status="success",
+        error=None,
+        output_size=None,
+    ):
+        """
+        Record a single OpenSCAD invocation.
+
+        Args:
+            run_id (int or None): Identifier of the run the render belongs to.
+            scad_file (str): Path to the OpenSCAD (.scad) file.
+            key (str): Parameter set identity from params_key().
+            param_set (dict): Parameter dictionary of the render.
+            duration (float): Render duration in seconds.
+            status (str): Outcome of the render ('success' or 'failure').
+            error (str or None): Error message of a failed render.
+            output_size (int or None): Size of the exported file in bytes.
+        """
+        params = {k: v for k, v in param_set.items() if k != "exported_filename"}
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO renders (run_id, scad_file, params_key, params, duration,"
+                " status, error, output_size, recorded_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    os.path.abspath(scad_file),
+                    key,
+                    json.dumps(params, sort_keys=True),
+                    duration,
+                    status,
+                    error,
+                    output_size,
+                    time.time(),
+                ),
+            )
+            self.pending += 1
+            if self.pending >= COMMIT_INTERVAL:
+                self.connection.commit()
+                self.pending = 0
+
+    def durations(self, scad_file):
+        """
+        Return the average duration of every successfully rendered parameter set of a model.
+
+        Args:
+            scad_file (str): Path to the OpenSCAD (.scad) file.
+
+        Returns:
+            dict: Mapping of params_key() to average duration in seconds.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT params_key, AVG(duration) FROM renders"
+                " WHERE scad_file = ? AND status = 'success' GROUP BY params_key",
+                (os.path.abspath(scad_file),),
+            ).fetchall()
+        return dict(rows)
+
+    def samples(self, scad_file, limit=REGRESSION_SAMPLES):
+        """
+        Return the numeric parameters and durations of the most recent successful renders.
+
+        Args:
+            scad_file (str): Path to the OpenSCAD (.scad) file.
+            limit (int): Maximum number of renders to return.
+
+        Returns:
+            list of tuple: (numeric parameter dict, duration) pairs.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT params, duration FROM renders"
+                " WHERE scad_file = ? AND status = 'success'"
+                " ORDER BY recorded_at DESC LIMIT ?",
+                (os.path.abspath(scad_file), limit),
+            ).fetchall()
+        return [(numeric_params(json.loads(params)), duration) for params, duration in rows]
+
+    def runs(self, scad_file=None, limit=20):
+        """
+        Summarise the most recent runs.
+
+        Args:
+            scad_file (str or None): Only include runs of this model.
+            limit (int): Maximum number of runs to return.
+
+        Returns:
+            list of dict: Runs, most recent first, with render counts, total render time
+                and wall-clock duration.
+        """
+        query = (
+            "SELECT runs.id, runs.scad_file, runs.scad_hash, runs.openscad_version,"
+            " runs.jobs, runs.started_at, runs.finished_at,"
+            " COUNT(renders.id), SUM(renders.status = 'success'),"
+            " SUM(renders.duration), AVG(renders.duration)"
+            " FROM runs LEFT JOIN renders ON renders.run_id = runs.id"
+        )
+        arguments = []
+        if scad_file:
+            query += " WHERE runs.scad_file = ?"
+            arguments.append(os.path.abspath(scad_file))
+        query += " GROUP BY runs.id ORDER BY runs.started_at DESC LIMIT ?"
+        arguments.append(limit)
+        with self.lock:
+            rows = self.connection.execute(query, arguments).fetchall()
+        keys = [
+            "id",
+            "scad_file",
+            "scad_hash",
+            "openscad_version",
+            "jobs",
+            "started_at",
+            "finished_at",
+            "renders",
+            "succeeded",
+            "render_time",
+            "mean_duration",
+        ]
+        return [dict(zip(keys, row)) for row in rows]
+
+    def run_durations(self, run_id):
+        """
+        Return the average duration of every successfully rendered parameter set of a run.
+
+        Args:
+            run_id (int): Identifier of the run.
+
+        Returns:
+            dict: Mapping of params_key() to average duration in seconds.
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT params_key, AVG(duration) FROM renders"
+                " WHERE run_id = ? AND status = 'success' GROUP BY params_key",
+                (run_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        """
+        Commit pending records and close the database.
+        """
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+
+def solve_linear_system(matrix, vector):
+    """
+    Solve a small dense linear system by Gaussian elimination with partial pivoting.
+
+    Args:
+        matrix (list of list of float): Square coefficient matrix.
+        vector (list of float): Right-hand side.
+
+    Returns:
+        list of float or None: Solution, or None if the matrix is singular.
+    """
+    n = len(vector)
+    rows = [list(matrix[i]) + [vector[i]] for i in range(n)]
+    for column in range(n):
+        pivot = max(range(column, n), key=lambda r: abs(rows[r][column]))
+        if abs(rows[pivot][column]) < 1e-12:
+            return None
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        for r in range(column + 1, n):
+            factor = rows[r][column] / rows[column][column]
+            for c in range(column, n + 1):
+                rows[r][c] -= factor * rows[column][c]
+    solution = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        total = rows[r][n] - sum(rows[r][c] * solution[c] for c in range(r + 1, n))
+        solution[r] = total / rows[r][r]
+    return solution
+
+
+class CostModel:
+    """
+    Predicts render durations for the rows of a batch from the timing history.
+    """
+
+    def __init__(self, history, scad_file, ridge=1e-3):
+        """
+        Load the history of a model and fit the regression fallback.
+
+        Args:
+            history (RenderHistory): Timing history.
+            scad_file (str): Path to the OpenSCAD (.scad) file.
+            ridge (float): Regularisation strength of the regression.
+        """
+        self.known = history.durations(scad_file)
+        self.features = []
+        self.weights = None
+        self.fit(history.samples(scad_file), ridge)
+
+    def fit(self, samples, ridge):
+        """
+        Fit a ridge regression of duration on the numeric parameters.
+
+        Parameters are standardised before fitting so the regularisation treats them alike.
+
+        Args:
+            samples (list of tuple): (numeric parameter dict, duration) pairs.
+            ridge (float): Regularisation strength.
+        """
+        if len(samples) < 2:
+            return
+        # Only parameters present in every sample can be used as features
+        features = set(samples[0][0])
+        for params, _ in samples[1:]:
+            features &= set(params)
+        self.features = sorted(features)
+        count = len(samples)
+        columns = [[params[f] for params, _ in samples] for f in self.features]
+        self.means = [sum(column) / count for column in columns]
+        self.scales = []
+        for column, mean in zip(columns, self.means):
+            variance = sum((v - mean) ** 2 for v in column) / count
+            self.scales.append(variance**0.5 or 1.0)
+        size = len(self.features) + 1
+        xtx = [[0.0] * size for _ in range(size)]
+        xty = [0.0] * size
+        for params, duration in samples:
+            x = self._design_row(params)
+            for i in range(size):
+                xty[i] += x[i] * duration
+                for j in range(size):
+                    xtx[i][j] += x[i] * x[j]
+        for i in range(1, size):
+            xtx[i][i] += ridge * count
+        self.weights = solve_linear_system(xtx, xty)
+
+    def _design_row(self, params):
+        """
+        Build the standardised feature vector of a parameter set, with a leading bias term.
+
+        Args:
+            params (dict): Numeric parameters.
+
+        Returns:
+            list of float: Feature vector.
+        """
+        return [1.0] + [
+            (params[f] - mean) / scale
+            for f, mean, scale in zip(self.features, self.means, self.scales)
+        ]
+
+    def predict(self, key, param_set):
+        """
+        Predict the render duration of a parameter set.
+
+        Args:
+            key (str): Parameter set identity from params_key().
+            param_set (dict): Parameter dictionary.
+
+        Returns:
+            float or None: Predicted duration in seconds, or None without any history.
+        """
+        if key in self.known:
+            return self.known[key]
+        if self.weights is None:
+            return None
+        params = numeric_params(param_set)
+        if any(f not in params for f in self.features):
+            return None
+        x = self._design_row(params)
+        return max(sum(w * v for w, v in zip(self.weights, x)), 0.0)
+
+
+def format_duration(seconds):
+    """
+    Format a duration in seconds as a short human-readable string.
+
+    Args:
+        seconds (float): Duration in seconds.
+
+    Returns:
+        str: Formatted duration (e.g., "45s", "3m12s" or "2h05m").
+    """
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m{seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m"
+
+
+class EtaEstimator:
+    """
+    Estimates the remaining wall-clock time of a running batch.
+
+    The remaining work is the sum of the predicted durations of the unfinished renders,
+    scaled by how far actual durations have deviated from their predictions so far and
+    divided by the number of concurrent renders. Renders without a prediction count as the
+    average of the known predictions, or of the observed durations once renders finish.
+    """
+
+    def __init__(self, jobs):
+        """
+        Initialize the estimator.
+
+        Args:
+            jobs (int): Maximum number of concurrent renders.
+        """
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.predicted_remaining = 0.0
+        self.predicted_count = 0
+        self.unknown_count = 0
+        self.predicted_done = 0.0
+        self.actual_done = 0.0
+        self.actual_total = 0.0
+        self.finished = 0
+
+    def add(self, predicted):
+        """
+        Register a render that still has to run.
+
+        Args:
+            predicted (float or None): Predicted duration in seconds, if known.
+        """
+        with self.lock:
+            if predicted is None:
+                self.unknown_count += 1
+            else:
+                self.predicted_remaining += predicted
+                self.predicted_count += 1
+
+    def finish(self, predicted, actual):
+        """
+        Register a finished render.
+
+        Args:
+            predicted (float or None): Duration predicted for the render, if any.
+            actual (float): Actual duration in seconds.
+        """
+        with self.lock:
+            if predicted is None:
+                self.unknown_count -= 1
+            else:
+                self.predicted_remaining -= predicted
+                self.predicted_count -= 1
+                self.predicted_done += predicted
+                self.actual_done += actual
+            self.actual_total += actual
+            self.finished += 1
+
+    def discard(self, predicted):
+        """
+        Remove a render that finished without running OpenSCAD (e.g., a cache hit).
+
+        Args:
+            predicted (float or None): Duration predicted for the render, if any.
+        """
+        with self.lock:
+            if predicted is None:
+                self.unknown_count -= 1
+            else:
+                self.predicted_remaining -= predicted
+                self.predicted_count -= 1
+
+    def remaining(self):
+        """
+        Estimate the remaining wall-clock time.
+
+        Returns:
+            float or None: Seconds until the batch completes, or None while there is
+                nothing to base an estimate on.
+        """
+        with self.lock:
+            calibration = (
+                self.actual_done / self.predicted_done if self.predicted_done > 0 else 1.0
+            )
+            if self.predicted_count:
+                unknown_each = self.predicted_remaining / self.predicted_count
+            elif self.finished:
+                unknown_each = self.actual_total / self.finished / calibration
+            elif self.unknown_count:
+                return None
+            else:
+                return 0.0
+            work = self.predicted_remaining + unknown_each * self.unknown_count
+            return max(work * calibration, 0.0) / self.jobs
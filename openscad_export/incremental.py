@@ -0,0 +1,157 @@
+# openscad_export/incremental.py
+
+"""
+Incremental re-export driven by changes to the parameter file.
+
+Exports run with --incremental or --prune_removed store a manifest in the output folder
+that maps each output name (exported_filename) to the canonical -D flags it was rendered
+with, the digest of the model and its dependencies, the formats and geometry flags, and the
+files written. Other exports neither read nor write it, so they pay nothing for it. With
+--incremental, the rows of the current parameter file are compared with the manifest and
+only rows that were added or whose render inputs changed are rendered again. Rows that are
+in the manifest but no longer in the parameter file are reported, and with --prune_removed
+their files are deleted.
+"""
+
+import os
+import json
+
+from openscad_export.cache import hash_file
+from openscad_export.scad import find_dependencies
+
+MANIFEST_FILE = "export_manifest.json"
+
+
+def dependency_hashes(scad_file):
+    """
+    Hash a model and every file it includes or uses.
+
+    Args:
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+
+    Returns:
+        dict: SHA-256 digest of every file, by path relative to the model's folder.
+    """
+    root_dir = os.path.dirname(os.path.abspath(scad_file))
+    hashes = {os.path.basename(scad_file): hash_file(scad_file)}
+    for dependency in find_dependencies(scad_file):
+        name = os.path.relpath(dependency, root_dir).replace(os.sep, "/")
+        hashes[name] = hash_file(dependency)
+    return hashes
+
+
+def load_manifest(folder):
+    """
+    Read the manifest of the last export to a folder.
+
+    Args:
+        folder (str): Output folder.
+
+    Returns:
+        dict or None: Manifest, or None if there is no readable manifest.
+    """
+    try:
+        with open(os.path.join(folder, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest.get("rows"), dict):
+        return None
+    return manifest
+
+
+def save_manifest(folder, manifest):
+    """
+    Atomically write the manifest of an export.
+
+    Args:
+        folder (str): Output folder.
+        manifest (dict): Manifest contents.
+    """
+    path = os.path.join(folder, MANIFEST_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def manifest_entry(flags, source_hash, formats, extra_flags, files):
+    """
+    Build the manifest entry of an output name.
+
+    Args:
+        flags (list of str): -D flags of the row.
+        source_hash (str): Digest returned by cache.source_digest().
+        formats (list of str): Export formats.
+        extra_flags (list of str or None): Further OpenSCAD options.
+        files (list of str): Names of the files written, relative to the output folder.
+
+    Returns:
+        dict: Entry.
+    """
+    return {
+        "flags": sorted(flags),
+        "source": source_hash,
+        "formats": list(formats),
+        "extra_flags": list(extra_flags or []),
+        "files": files,
+    }
+
+
+def unchanged(entry, current, folder):
+    """
+    Check whether a manifest entry still describes the current render of an output name.
+
+    Args:
+        entry (dict or None): Entry from the manifest of the last export.
+        current (dict): Entry built for the current row by manifest_entry().
+        folder (str): Output folder.
+
+    Returns:
+        bool: True if the render inputs are the same and all files still exist.
+    """
+    if entry is None:
+        return False
+    for key in ("flags", "source", "formats", "extra_flags"):
+        if entry.get(key) != current[key]:
+            return False
+    return all(os.path.isfile(os.path.join(folder, name)) for name in entry["files"])
+
+
+def changed_dependencies(previous, current):
+    """
+    List the model files whose contents changed since the last export.
+
+    Args:
+        previous (dict): Dependency hashes stored in the last manifest.
+        current (dict): Result of dependency_hashes().
+
+    Returns:
+        list of str: Added, removed and modified files.
+    """
+    return sorted(
+        name for name in previous.keys() | current.keys()
+        if previous.get(name) != current.get(name)
+    )
+
+
+def prune_outputs(folder, entries):
+    """
+    Delete the files of output names that left the parameter file.
+
+    Args:
+        folder (str): Output folder.
+        entries (list of dict): Manifest entries of the removed names.
+
+    Returns:
+        int: Number of files deleted.
+    """
+    deleted = 0
+    for entry in entries:
+        for name in entry["files"]:
+            try:
+                os.remove(os.path.join(folder, name))
+                deleted += 1
+            except FileNotFoundError:
+                pass
+    return deleted
@@ -0,0 +1,282 @@
+# openscad_export/inspection.py
+
+"""
+Validation of exported STL files with NumPy.
+
+OpenSCAD exits with status 0 for models that come out empty or broken, so after an export
+every STL file can be inspected for its triangle count, bounding box, surface area, volume
+and whether it is a closed, consistently oriented surface. Binary files are memory-mapped
+and their statistics computed in blocks, ASCII files are streamed into a compact array, so
+no file is ever turned into per-triangle Python objects. The edge check needs every edge of
+the mesh at once and takes a few dozen bytes per triangle. Files are inspected in parallel; NumPy releases
+the GIL for the heavy work, so threads suffice.
+
+NumPy is optional; without it inspection is unavailable and inspection_available()
+returns False.
+"""
+
+import os
+import json
+import array
+import concurrent.futures
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency
+    np = None
+
+from openscad_export.stl import BINARY_HEADER_SIZE, is_binary_stl
+
+REPORT_FILE = "mesh_report.json"
+
+# Triangles processed at once by the area and volume statistics, bounding their temporary
+# arrays for very large files; the edge check always covers the whole mesh
+BLOCK_TRIANGLES = 1 << 20
+
+# Layout of a binary STL triangle record
+BINARY_DTYPE = (
+    np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+    if np is not None
+    else None
+)
+
+
+def inspection_available():
+    """
+    Check whether NumPy, which inspection requires, is installed.
+    """
+    return np is not None
+
+
+def binary_triangles(path):
+    """
+    Memory-map the vertices of a binary STL file.
+
+    Args:
+        path (str): Path to the STL file.
+
+    Returns:
+        numpy.ndarray: Array of shape (n, 3, 3) backed by the file.
+
+    Raises:
+        ValueError: If the file is shorter than its triangle count requires.
+    """
+    dtype = BINARY_DTYPE
+    count = int(np.fromfile(path, dtype="<u4", count=1, offset=BINARY_HEADER_SIZE)[0])
+    if not count:
+        return np.empty((0, 3, 3), dtype="<f4")
+    if os.path.getsize(path) < BINARY_HEADER_SIZE + 4 + count * dtype.itemsize:
+        raise ValueError(f"Truncated binary STL: the header announces {count} triangles.")
+    triangles = np.memmap(
+        path, dtype=dtype, mode="r", offset=BINARY_HEADER_SIZE + 4, shape=(count,)
+    )
+    return triangles["vertices"]
+
+
+def ascii_triangles(path):
+    """
+    Read the vertices of an ASCII STL file line by line.
+
+    Args:
+        path (str): Path to the STL file.
+
+    Returns:
+        numpy.ndarray: Array of shape (n, 3, 3).
+    """
+    values = array.array("d")
+    with open(path, "rb") as f:
+        for line in f:
+            parts = line.split()
+            if parts and parts[0] == b"vertex":
+                values.extend(float(value) for value in parts[1:4])
+    vertices = np.frombuffer(values, dtype=np.float64)
+    # A truncated last facet is ignored
+    return vertices[: len(vertices) // 9 * 9].reshape(-1, 3, 3)
+
+
+def read_triangles(path):
+    """
+    Read the vertices of a binary or ASCII STL file.
+
+    Args:
+        path (str): Path to the STL file.
+
+    Returns:
+        numpy.ndarray: Array of shape (n, 3, 3); memory-mapped for binary files.
+    """
+    return binary_triangles(path) if is_binary_stl(path) else ascii_triangles(path)
+
+
+def vertex_ids(triangles):
+    """
+    Number the distinct vertices of a mesh.
+
+    Vertices are compared by their exact coordinates, sorting on the bit patterns of the
+    coordinates, which is several times faster than comparing rows of floats.
+
+    Args:
+        triangles (numpy.ndarray): Array of shape (n, 3, 3).
+
+    Returns:
+        tuple:
+            numpy.ndarray: Vertex number of every corner, of shape (n, 3).
+            int: Number of distinct vertices.
+    """
+    # Adding zero turns -0.0 into 0.0, which is the same vertex
+    vertices = np.ascontiguousarray(triangles).reshape(-1, 3) + triangles.dtype.type(0)
+    bits = vertices.view(np.uint32 if vertices.dtype.itemsize == 4 else np.uint64)
+    order = np.lexsort(bits.T[::-1])
+    bits = bits[order]
+    new = np.empty(len(order), dtype=bool)
+    new[0] = True
+    new[1:] = np.any(bits[1:] != bits[:-1], axis=1)
+    ids = np.empty(len(order), dtype=np.int64)
+    ids[order] = np.cumsum(new) - 1
+    return ids.reshape(-1, 3), int(np.count_nonzero(new))
+
+
+def edge_check(triangles):
+    """
+    Check whether a mesh is a closed surface with consistently oriented faces.
+
+    Vertices are identified by their exact coordinates, as OpenSCAD writes shared vertices
+    identically. The surface is closed and consistently oriented if every directed edge
+    occurs exactly once and its reverse occurs exactly once too. A directed edge occurring
+    more than once counts once per occurrence, so a mesh with one triangle missing has
+    three open edges.
+
+    Args:
+        triangles (numpy.ndarray): Array of shape (n, 3, 3).
+
+    Returns:
+        tuple:
+            bool: True if the mesh is watertight.
+            int: Number of directed edges without exactly one opposite edge.
+    """
+    ids, count = vertex_ids(triangles)
+    edges, occurrences = np.unique(
+        ids.reshape(-1) * count + np.roll(ids, -1, axis=1).reshape(-1), return_counts=True
+    )
+    del ids
+    reverse = edges % count * count + edges // count
+    position = np.minimum(np.searchsorted(edges, reverse), len(edges) - 1)
+    opposite = np.where(edges[position] == reverse, occurrences[position], 0)
+    # Repeated directed edges mean more than two faces meet or faces are flipped
+    unmatched = (occurrences != 1) | (opposite != 1)
+    open_edges = int(occurrences[unmatched].sum())
+    return open_edges == 0, open_edges
+
+
+def inspect_stl(path):
+    """
+    Compute the statistics of an STL file.
+
+    Args:
+        path (str): Path to the STL file.
+
+    Returns:
+        dict: Triangle count, bounding box, surface area, volume, number of degenerate
+            (zero-area) triangles, watertightness and the number of open or
+            inconsistently oriented edges. 'problems' lists what makes the mesh unusable.
+    """
+    triangles = read_triangles(path)
+    count = len(triangles)
+    stats = {"triangles": count}
+    if not count:
+        stats.update(
+            bbox=None, area=0.0, volume=0.0, degenerate=0, watertight=False, open_edges=0
+        )
+        stats["problems"] = ["empty"]
+        return stats
+
+    low = np.full(3, np.inf)
+    high = np.full(3, -np.inf)
+    area = 0.0
+    volume = 0.0
+    degenerate = 0
+    for first in range(0, count, BLOCK_TRIANGLES):
+        block = np.asarray(triangles[first : first + BLOCK_TRIANGLES], dtype=np.float64)
+        low = np.minimum(low, block.min(axis=(0, 1)))
+        high = np.maximum(high, block.max(axis=(0, 1)))
+        v0, v1, v2 = block[:, 0], block[:, 1], block[:, 2]
+        normals = np.cross(v1 - v0, v2 - v0)
+        areas = np.linalg.norm(normals, axis=1) / 2
+        area += float(areas.sum())
+        degenerate += int(np.count_nonzero(areas == 0))
+        # Signed volumes of the tetrahedra spanned with the origin
+        volume += float(np.einsum("ij,ij->", v0, np.cross(v1, v2))) / 6
+
+    watertight, open_edges = edge_check(triangles)
+    stats.update(
+        bbox=[low.tolist(), high.tolist()],
+        area=area,
+        volume=volume,
+        degenerate=degenerate,
+        watertight=watertight,
+        open_edges=open_edges,
+    )
+    problems = []
+    if not watertight:
+        problems.append("not watertight")
+    elif volume <= 0:
+        # A closed surface with inward-facing triangles
+        problems.append("inverted")
+    if degenerate:
+        problems.append("degenerate triangles")
+    stats["problems"] = problems
+    return stats
+
+
+def inspect_files(paths, workers):
+    """
+    Inspect STL files in parallel.
+
+    Hardlinked copies of the same file, as written for duplicate rows, are inspected once.
+
+    Args:
+        paths (iterable of str): STL files.
+        workers (int): Number of files inspected at once.
+
+    Returns:
+        dict: Statistics of every file by path; files that could not be read get an
+            'error' entry instead.
+    """
+    by_inode = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            by_inode[path] = ([path], str(e))
+            continue
+        by_inode.setdefault((st.st_dev, st.st_ino), ([], None))[0].append(path)
+
+    def inspect_group(group):
+        names, error = group
+        if error is None:
+            try:
+                stats = inspect_stl(names[0])
+            except (OSError, ValueError) as e:
+                stats = {"error": str(e), "problems": ["unreadable"]}
+        else:
+            stats = {"error": error, "problems": ["unreadable"]}
+        return {name: stats for name in names}
+
+    report = {}
+    with concurrent.futures.ThreadPoolExecutor(max(workers, 1)) as executor:
+        for stats in executor.map(inspect_group, by_inode.values()):
+            report.update(stats)
+    return report
+
+
+def write_report(path, report):
+    """
+    Atomically write an inspection report as JSON.
+
+    Args:
+        path (str): Report file.
+        report (dict): Statistics by file, as returned by inspect_files().
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"files": report}, f, indent=1)
+    os.replace(tmp_path, path)
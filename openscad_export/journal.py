@@ -0,0 +1,222 @@
+# openscad_export/journal.py
+
+"""
+Crash-safe record of the rows a batch has finished.
+
+Every finished row is appended to a journal in the output folder as one JSON line holding
+the row's render identity and the SHA-256 digest of each of its files. The line is flushed
+and fsync'd before the batch moves on, so after a crash or reboot the journal lists every
+row that completed, at worst missing the row that was being written. A batch that finishes
+every row deletes its journal, so only failed or interrupted batches leave one behind.
+
+Outputs are rendered under a temporary name in the output folder and renamed into place
+once complete, so a file with the final name is never a partial render. The file contents
+themselves are not fsync'd; a file that was renamed but lost its data in a crash no longer
+matches the digest in the journal and is rendered again by --resume.
+"""
+
+import os
+import glob
+import json
+import time
+import hashlib
+import threading
+
+from openscad_export.cache import hash_file
+
+JOURNAL_FILE = "export_journal.jsonl"
+
+
+def journal_name(shard=None):
+    """
+    Return the file name of the journal of a batch.
+
+    Args:
+        shard (tuple or None): (i, n) of a sharded export. Shards sharing an output folder
+            keep separate journals.
+
+    Returns:
+        str: File name.
+    """
+    if shard is None:
+        return JOURNAL_FILE
+    return f"shard-{shard[0]}-of-{shard[1]}.journal.jsonl"
+
+
+def partial_path(path):
+    """
+    Return the temporary name a file is written under before it is renamed into place.
+
+    The extension is kept, as OpenSCAD chooses the export format from it.
+
+    Args:
+        path (str): Final path of the file.
+
+    Returns:
+        str: Temporary path in the same folder.
+    """
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".partial.{os.getpid()}.{threading.get_ident()}.{name}")
+
+
+def remove_partials(folder):
+    """
+    Remove the temporary files of renders that were interrupted by a crash.
+
+    Args:
+        folder (str): Output folder.
+
+    Returns:
+        int: Number of files removed.
+    """
+    removed = 0
+    for path in glob.glob(os.path.join(folder, ".partial.*")):
+        try:
+            os.remove(path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def row_identity(source_hash, d_flags, formats, extra_flags):
+    """
+    Identify the inputs that determine a row's files.
+
+    Args:
+        source_hash (str): Digest returned by cache.source_digest().
+        d_flags (list of str): -D flags of the row.
+        formats (list of str): Export formats of the batch.
+        extra_flags (list of str or None): Further OpenSCAD options.
+
+    Returns:
+        str: Hexadecimal identity.
+    """
+    key = json.dumps([source_hash, sorted(d_flags), formats, extra_flags or []])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class Journal:
+    """
+    Append-only journal of the rows a batch has finished.
+    """
+
+    def __init__(self, path, resume=False):
+        """
+        Open a journal.
+
+        Args:
+            path (str): Journal file.
+            resume (bool): Keep the entries of the previous run and append to them. Otherwise
+                the journal is started afresh.
+        """
+        self.path = path
+        # Files are listed relative to the journal, so the batch can resume from any folder
+        self.folder = os.path.dirname(path)
+        self.entries = load_journal(path) if resume else {}
+        self.lock = threading.Lock()
+        self.file = open(path, "a" if resume else "w")
+        if self.file.tell() and not journal_ends_with_newline(path):
+            # Complete the line torn by the crash, so the next entry starts on its own line
+            self.file.write("\n")
+
+    def completed(self, row, identity):
+        """
+        Check whether the journal proves a row complete.
+
+        A row is complete if its last entry has the same identity and every file listed in
+        the entry still exists with the recorded digest.
+
+        Args:
+            row (int): Row index.
+            identity (str): Result of row_identity() for the row.
+
+        Returns:
+            list of str or None: The row's files if it is complete, otherwise None.
+        """
+        entry = self.entries.get(row)
+        if entry is None or entry.get("identity") != identity:
+            return None
+        files = []
+        for name, digest in entry["files"].items():
+            path = os.path.join(self.folder, name)
+            try:
+                if hash_file(path) != digest:
+                    return None
+            except OSError:
+                return None
+            files.append(path)
+        return files
+
+    def record(self, row, identity, files):
+        """
+        Durably record a finished row.
+
+        Args:
+            row (int): Row index.
+            identity (str): Result of row_identity() for the row.
+            files (list of str): Every file written for the row, including the copies for
+                rows repeating it.
+        """
+        entry = {
+            "row": row,
+            "identity": identity,
+            "files": {os.path.relpath(path, self.folder): hash_file(path) for path in files},
+            "finished_at": time.time(),
+        }
+        line = json.dumps(entry) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.entries[row] = entry
+
+    def close(self):
+        """
+        Close the journal file.
+        """
+        self.file.close()
+
+    def discard(self):
+        """
+        Close and delete the journal once there is nothing left to resume.
+        """
+        self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def journal_ends_with_newline(path):
+    """
+    Check whether the last line of a journal is complete.
+    """
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def load_journal(path):
+    """
+    Read the entries of a journal.
+
+    Args:
+        path (str): Journal file.
+
+    Returns:
+        dict: Last entry of every row, by row index. Empty if the journal does not exist.
+    """
+    entries = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # The line being written when the batch was interrupted
+                    continue
+                entries[entry["row"]] = entry
+    except FileNotFoundError:
+        pass
+    return entries
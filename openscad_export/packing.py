@@ -0,0 +1,176 @@
+# openscad_export/packing.py
+
+"""
+Packing of several small parameter sets into a single OpenSCAD invocation.
+
+For tiny models, starting OpenSCAD and parsing the model and its libraries takes longer
+than rendering the geometry. Packing writes a wrapper model that instantiates K parameter
+sets side by side on a grid, renders the wrapper once and splits the resulting mesh back
+into one mesh per parameter set by grid cell, moving each back to its original position.
+"""
+
+import math
+
+from openscad_export.stl import iter_triangles
+
+# Largest number of parameter sets rendered by a single invocation
+MAX_PACK_SIZE = 64
+
+# Startup time per packed row, relative to its render time, that packing aims for
+PACK_OVERHEAD = 0.1
+
+# Grid cells are this much larger than the largest model seen during calibration
+PACK_MARGIN = 1.5
+
+
+def choose_pack_size(startup_time, render_time):
+    """
+    Pick the number of parameter sets per invocation.
+
+    K is the smallest value for which the startup time shared by the K rows is at most
+    PACK_OVERHEAD of their render time.
+
+    Args:
+        startup_time (float): Time to start OpenSCAD and parse the model, in seconds.
+        render_time (float): Time to render one parameter set without startup, in seconds.
+
+    Returns:
+        int: Parameter sets per invocation; 1 means packing does not pay off.
+    """
+    render_time = max(render_time, 1e-3)
+    size = math.ceil(startup_time / (PACK_OVERHEAD * render_time))
+    return max(1, min(size, MAX_PACK_SIZE))
+
+
+def cell_spacing(boxes):
+    """
+    Compute the grid spacing that keeps every model inside its own cell.
+
+    Args:
+        boxes (list of tuple): Bounding boxes ((min_x, min_y, min_z), (max_x, max_y, max_z))
+            of sample renders.
+
+    Returns:
+        float: Distance between neighbouring cell centres.
+    """
+    reach = 0.0
+    for low, high in boxes:
+        reach = max(reach, abs(low[0]), abs(low[1]), abs(high[0]), abs(high[1]))
+    return 2 * reach * PACK_MARGIN + 1.0
+
+
+def grid_columns(count):
+    """
+    Return the number of grid columns for a pack of the given size.
+    """
+    return math.ceil(math.sqrt(count))
+
+
+def cell_offset(position, count, spacing):
+    """
+    Return the translation of a pack position.
+
+    The grid is centred on the origin to keep coordinates, and so rounding errors, small.
+
+    Args:
+        position (int): Position of the parameter set in the pack.
+        count (int): Number of parameter sets in the pack.
+        spacing (float): Distance between neighbouring cell centres.
+
+    Returns:
+        tuple: (x, y) translation.
+    """
+    columns = grid_columns(count)
+    rows = math.ceil(count / columns)
+    column, row = position % columns, position // columns
+    return (
+        (column - (columns - 1) / 2) * spacing,
+        (row - (rows - 1) / 2) * spacing,
+    )
+
+
+def scad_path(path):
+    """
+    Format a file path for use inside an OpenSCAD include<> statement.
+    """
+    return path.replace("\\", "/")
+
+
+def wrapper_source(scad_file, variants, spacing):
+    """
+    Build a model instantiating several parameter sets of another model.
+
+    Every parameter set gets its own module that includes the model and then reassigns the
+    parameters. OpenSCAD uses the last assignment of a variable throughout its scope, which
+    is what -D does for the top level of a model.
+
+    Args:
+        scad_file (str): Absolute path to the OpenSCAD (.scad) file.
+        variants (list of list of str): -D flags of every parameter set.
+        spacing (float): Distance between neighbouring cell centres.
+
+    Returns:
+        str: OpenSCAD source of the wrapper.
+    """
+    lines = []
+    for position, d_flags in enumerate(variants):
+        lines.append(f"module __variant_{position}() {{")
+        lines.append(f"    include <{scad_path(scad_file)}>")
+        for flag in d_flags:
+            lines.append(f"    {flag[2:]};")
+        lines.append("}")
+    for position in range(len(variants)):
+        x, y = cell_offset(position, len(variants), spacing)
+        lines.append(f"translate([{x!r}, {y!r}, 0]) __variant_{position}();")
+    return "\n".join(lines) + "\n"
+
+
+def split_mesh(mesh_file, count, spacing):
+    """
+    Split the mesh of a packed render into one mesh per parameter set.
+
+    Args:
+        mesh_file (str): STL file rendered from wrapper_source().
+        count (int): Number of parameter sets in the pack.
+        spacing (float): Distance between neighbouring cell centres.
+
+    Returns:
+        list of list or None: Triangles of every parameter set, moved back to their original
+            position, or None if a triangle does not lie within a single cell (the models
+            were larger than the cells).
+    """
+    columns = grid_columns(count)
+    rows = math.ceil(count / columns)
+    half = spacing / 2
+    meshes = [[] for _ in range(count)]
+    for triangle in iter_triangles(mesh_file):
+        cx = sum(vertex[0] for vertex in triangle) / 3
+        cy = sum(vertex[1] for vertex in triangle) / 3
+        column = round(cx / spacing + (columns - 1) / 2)
+        row = round(cy / spacing + (rows - 1) / 2)
+        position = row * columns + column
+        if not (0 <= column < columns and 0 <= row < rows and position < count):
+            return None
+        x, y = cell_offset(position, count, spacing)
+        moved = []
+        for vertex in triangle:
+            if abs(vertex[0] - x) >= half or abs(vertex[1] - y) >= half:
+                return None
+            moved.append((vertex[0] - x, vertex[1] - y, vertex[2]))
+        meshes[position].append(tuple(moved))
+    return meshes
+
+
+def startup_source(scad_file):
+    """
+    Build a model that parses another model and its libraries without instantiating it.
+
+    Rendering it measures the fixed cost of an OpenSCAD invocation for that model.
+
+    Args:
+        scad_file (str): Absolute path to the OpenSCAD (.scad) file.
+
+    Returns:
+        str: OpenSCAD source.
+    """
+    return f"module __variant() {{\n    include <{scad_path(scad_file)}>\n}}\n"
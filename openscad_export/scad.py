@@ -0,0 +1,347 @@
+# openscad_export/scad.py
+
+"""
+Helpers for inspecting OpenSCAD sources and the OpenSCAD executable.
+
+This module resolves the files a model pulls in through include<> and use<> statements
+and queries the version of the OpenSCAD binary, so that other parts of the exporter can
+tell when a model or its toolchain has changed.
+"""
+
+import os
+import re
+import hashlib
+import subprocess
+import functools
+
+# Matches include<...> and use<...> statements; comments are stripped beforehand.
+INCLUDE_PATTERN = re.compile(r"\b(include|use)\s*<\s*([^>]+?)\s*>")
+# Strings are matched in the same alternation, so // and /* inside them are not comments
+COMMENT_PATTERN = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+
+def strip_comments(source):
+    """
+    Remove line and block comments from OpenSCAD source code, leaving strings intact.
+
+    Args:
+        source (str): OpenSCAD source code.
+
+    Returns:
+        str: Source code without comments.
+    """
+    return COMMENT_PATTERN.sub(lambda match: match.group(1) or " ", source)
+
+
+def library_paths():
+    """
+    Return the directories OpenSCAD searches for libraries, in lookup order.
+
+    Returns:
+        list of str: Directories listed in the OPENSCADPATH environment variable.
+    """
+    paths = os.environ.get("OPENSCADPATH", "")
+    return [path for path in paths.split(os.pathsep) if path]
+
+
+def resolve_include(name, including_file):
+    """
+    Resolve the path of an included or used file the way OpenSCAD does.
+
+    Args:
+        name (str): File name as written inside the angle brackets.
+        including_file (str): Path of the file containing the statement.
+
+    Returns:
+        str or None: Absolute path of the resolved file, or None if it cannot be found.
+    """
+    candidates = [os.path.join(os.path.dirname(including_file), name)]
+    candidates += [os.path.join(path, name) for path in library_paths()]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.abspath(candidate)
+    return None
+
+
+def find_dependencies(scad_file):
+    """
+    Find all files transitively pulled in by include<> and use<> statements.
+
+    Args:
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+
+    Returns:
+        list of str: Sorted absolute paths of the dependencies, excluding scad_file itself.
+            Statements that cannot be resolved are ignored, as OpenSCAD only warns about them.
+    """
+    root = os.path.abspath(scad_file)
+    seen = {root}
+    pending = [root]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(current, "r", encoding="utf-8", errors="replace") as f:
+                source = strip_comments(f.read())
+        except OSError:
+            continue
+        for _, name in INCLUDE_PATTERN.findall(source):
+            resolved = resolve_include(name, current)
+            if resolved and resolved not in seen:
+                seen.add(resolved)
+                pending.append(resolved)
+    seen.discard(root)
+    return sorted(seen)
+
+
+def csg_digest(csg_file):
+    """
+    Hash the evaluated CSG tree written by OpenSCAD.
+
+    Indentation and blank lines are normalised away, so rows whose parameters differ but
+    evaluate to the same geometry get the same digest.
+
+    Args:
+        csg_file (str): Path to a .csg file exported by OpenSCAD.
+
+    Returns:
+        str: Hexadecimal digest of the normalised tree.
+    """
+    digest = hashlib.sha256()
+    with open(csg_file, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = " ".join(line.split())
+            if line:
+                digest.update(line.encode())
+                digest.update(b"\n")
+    return digest.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def get_openscad_version(openscad_path):
+    """
+    Return the version string reported by the OpenSCAD executable.
+
+    Args:
+        openscad_path (str): Path to the OpenSCAD executable.
+
+    Returns:
+        str: Version string (e.g., "OpenSCAD version 2021.01"), or "unknown" if it cannot be determined.
+    """
+    try:
+        result = subprocess.run(
+            [openscad_path, "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return "unknown"
+    # OpenSCAD prints its version to stderr
+    output = (result.stderr or result.stdout).decode(errors="replace").strip()
+    return output.splitlines()[0] if output else "unknown"
+
+
+# Tokens of OpenSCAD source after comments are stripped; strings are matched so that their
+# contents are never mistaken for identifiers
+TOKEN_PATTERN = re.compile(
+    r'"(?:\\.|[^"\\])*"'
+    r"|(?P<ident>\$?[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<number>\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)"
+    r"|(?P<op>==|!=|<=|>=|&&|\|\||[^\s])"
+)
+
+KEYWORDS = {
+    "module",
+    "function",
+    "if",
+    "else",
+    "for",
+    "intersection_for",
+    "let",
+    "each",
+    "assert",
+    "echo",
+    "true",
+    "false",
+    "undef",
+    "include",
+    "use",
+}
+
+OPENING = {"(": ")", "[": "]", "{": "}"}
+
+
+def tokenize(source):
+    """
+    Split OpenSCAD source code into identifier, number and operator tokens.
+
+    Comments, strings and include<>/use<> statements are dropped.
+
+    Args:
+        source (str): OpenSCAD source code.
+
+    Returns:
+        list of str: Tokens in source order.
+    """
+    source = INCLUDE_PATTERN.sub(" ", strip_comments(source))
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(source):
+        if match.group("ident") or match.group("number") or match.group("op"):
+            tokens.append(match.group(0))
+    return tokens
+
+
+def is_identifier(token):
+    """
+    Check whether a token is an identifier rather than a keyword, number or operator.
+    """
+    return (token[0].isalpha() or token[0] in "_$") and token not in KEYWORDS
+
+
+def variable_references(tokens, variables=()):
+    """
+    Return the variables read by a sequence of tokens.
+
+    Identifiers followed by '(' are module or function calls, identifiers followed by a
+    single '=' are assignment targets or named arguments, and identifiers after '.' are
+    member accesses; none of these read a variable. A call of a name in `variables` does
+    read it, as the variable may hold a function literal.
+
+    Args:
+        tokens (list of str): Tokens from tokenize().
+        variables (collection of str): Names assigned at the top level.
+
+    Returns:
+        set of str: Names of the variables read.
+    """
+    references = set()
+    for i, token in enumerate(tokens):
+        if not is_identifier(token):
+            continue
+        following = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if following == "(" and token in variables:
+            references.add(token)
+            continue
+        if following in ("(", "=") or (i and tokens[i - 1] == "."):
+            continue
+        references.add(token)
+    return references
+
+
+def split_top_level(tokens):
+    """
+    Split tokens into top-level assignments and all other code.
+
+    Args:
+        tokens (list of str): Tokens from tokenize().
+
+    Returns:
+        tuple:
+            list of tuple: (name, right-hand side tokens) per top-level assignment.
+            list of str: Tokens of every other top-level statement, definitions included.
+    """
+    assignments = []
+    other = []
+    statement = []
+    depth = 0
+    for token in tokens:
+        statement.append(token)
+        if token in OPENING:
+            depth += 1
+        elif token in (")", "]", "}"):
+            depth = max(depth - 1, 0)
+        if depth or token not in (";", "}"):
+            continue
+        if (
+            len(statement) > 2
+            and is_identifier(statement[0])
+            and statement[1] == "="
+            and token == ";"
+        ):
+            assignments.append((statement[0], statement[2:-1]))
+        else:
+            other += statement
+        statement = []
+    return assignments, other + statement
+
+
+def referenced_variables(scad_file):
+    """
+    Find the top-level variables a model actually reads.
+
+    The model and every file it pulls in through include<> and use<> are scanned. A variable
+    counts as referenced when it is read outside a top-level assignment (in module or
+    function bodies or by top-level statements), or by a top-level assignment of a variable
+    that is itself referenced. Special variables such as $fn act on every module, so their
+    top-level assignments always count as referenced. The result over-approximates: a name
+    read in any scope, or in a branch that is never taken, counts as referenced.
+
+    Args:
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+
+    Returns:
+        set of str or None: Referenced variable names, or None if an include<>/use<> file
+            cannot be found and the analysis would be incomplete.
+    """
+    root = os.path.abspath(scad_file)
+    seen = {root}
+    pending = [root]
+    statements = []
+    while pending:
+        current = pending.pop()
+        try:
+            with open(current, "r", encoding="utf-8", errors="replace") as f:
+                source = f.read()
+        except OSError:
+            return None
+        for _, name in INCLUDE_PATTERN.findall(strip_comments(source)):
+            resolved = resolve_include(name, current)
+            if resolved is None:
+                return None
+            if resolved not in seen:
+                seen.add(resolved)
+                pending.append(resolved)
+        statements.append(split_top_level(tokenize(source)))
+    # Every file is split first, as a call may read a variable assigned in another file
+    variables = {name for assignments, _ in statements for name, _ in assignments}
+    depends = {}
+    roots = set()
+    for assignments, other in statements:
+        for name, expression in assignments:
+            depends.setdefault(name, set()).update(variable_references(expression, variables))
+            if name.startswith("$"):
+                roots.add(name)
+        roots |= variable_references(other, variables)
+    referenced = set()
+    pending_names = list(roots)
+    while pending_names:
+        name = pending_names.pop()
+        if name in referenced:
+            continue
+        referenced.add(name)
+        pending_names.extend(depends.get(name, ()))
+    return referenced
+
+
+def unused_parameters(scad_file, columns):
+    """
+    Return the parameter columns that never reach the model.
+
+    Special variables such as $fn act on every module dynamically and are always kept.
+
+    Args:
+        scad_file (str): Path to the OpenSCAD (.scad) file.
+        columns (iterable of str): Parameter names, without 'exported_filename'.
+
+    Returns:
+        list of str or None: Unused columns in the given order, or None if the model could
+            not be analysed completely.
+    """
+    referenced = referenced_variables(scad_file)
+    if referenced is None:
+        return None
+    return [
+        column
+        for column in columns
+        if not column.startswith("$") and column not in referenced
+    ]
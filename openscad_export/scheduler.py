@@ -0,0 +1,388 @@
+# openscad_export/scheduler.py
+
+"""
+Admission control for concurrent OpenSCAD renders.
+
+Every render launches a CPU- and memory-heavy OpenSCAD process, so the number of renders
+running at once is bounded by a job limit and, optionally, by the system load average and
+memory usage. A new render is only started once all configured limits allow it.
+
+Tasks are submitted to the executor from a lazy iterable through a bounded window, so the
+number of pending futures stays constant regardless of the size of the parameter file.
+Submission order can be rearranged so that renders predicted to take longest start first.
+
+A BatchControl cancels, pauses and resumes a batch: it holds back renders that have not
+started and suspends or kills the renders that are running.
+"""
+
+import os
+import heapq
+import threading
+import itertools
+import concurrent.futures
+
+from openscad_export.cache import parse_size
+from openscad_export.watchdog import RenderGroup
+
+
+def default_jobs():
+    """
+    Return the default number of concurrent renders.
+
+    Returns:
+        int: Number of CPUs available to this process.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def parse_memory_limit(limit_str):
+    """
+    Parse a memory limit given either as a percentage of total memory or as a size.
+
+    Args:
+        limit_str (str): Limit such as "80%" or "24G".
+
+    Returns:
+        tuple:
+            str: Either 'percent' or 'bytes'.
+            float: The limit value.
+
+    Raises:
+        ValueError: If the limit is invalid.
+    """
+    value = limit_str.strip()
+    if value.endswith("%"):
+        try:
+            percent = float(value[:-1])
+        except ValueError:
+            raise ValueError(f"Invalid memory limit '{limit_str}'.")
+        if not 0 < percent <= 100:
+            raise ValueError(
+                f"Invalid memory limit '{limit_str}': percentage must be in (0, 100]."
+            )
+        return ("percent", percent)
+    return ("bytes", float(parse_size(value)))
+
+
+def system_load():
+    """
+    Return the one-minute system load average.
+
+    Returns:
+        float or None: Load average, or None where the platform does not provide one.
+    """
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+def system_memory():
+    """
+    Return the total and available physical memory.
+
+    Returns:
+        tuple or None: (total_bytes, available_bytes), or None if it cannot be determined.
+    """
+    try:
+        with open("/proc/meminfo") as f:
+            info = {}
+            for line in f:
+                key, _, rest = line.partition(":")
+                info[key] = int(rest.split()[0]) * 1024
+        return info["MemTotal"], info.get("MemAvailable", info.get("MemFree", 0))
+    except (OSError, KeyError, ValueError, IndexError):
+        pass
+    try:
+        page_size = os.sysconf("SC_PAGE_SIZE")
+        total = os.sysconf("SC_PHYS_PAGES") * page_size
+        available = os.sysconf("SC_AVPHYS_PAGES") * page_size
+        return total, available
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+class BatchCancelled(Exception):
+    """
+    Raised when a render is about to start after its batch was cancelled.
+    """
+
+
+class BatchControl:
+    """
+    Cancel, pause and resume a running batch.
+
+    The methods may be called from any thread, including signal handlers and GUI callbacks.
+    Only the running renders of this batch, collected in its render group, are suspended,
+    resumed and killed.
+    """
+
+    def __init__(self):
+        """
+        Initialize the control of a batch that is neither paused nor cancelled.
+        """
+        self.renders = RenderGroup()
+        self.cancelled_event = threading.Event()
+        self.resumed = threading.Event()
+        self.resumed.set()
+
+    @property
+    def cancelled(self):
+        """
+        bool: Whether the batch was cancelled.
+        """
+        return self.cancelled_event.is_set()
+
+    @property
+    def paused(self):
+        """
+        bool: Whether the batch is paused.
+        """
+        return not self.resumed.is_set()
+
+    def pause(self):
+        """
+        Hold back new renders and suspend the running ones.
+        """
+        if self.cancelled:
+            return
+        self.resumed.clear()
+        self.renders.pause()
+
+    def resume(self):
+        """
+        Continue a paused batch.
+        """
+        self.renders.resume()
+        self.resumed.set()
+
+    def cancel(self):
+        """
+        Start no further renders and kill the running ones.
+        """
+        self.cancelled_event.set()
+        self.renders.kill_all()
+        self.renders.resume()
+        self.resumed.set()
+
+    def wait(self):
+        """
+        Block while the batch is paused.
+
+        Returns:
+            bool: False if the batch was cancelled.
+        """
+        self.resumed.wait()
+        return not self.cancelled
+
+
+class AdmissionController:
+    """
+    Gate that decides when another render may start.
+
+    At most `jobs` renders run at once. While at least one render is running, a new one is
+    additionally held back as long as the load average or memory usage exceeds its limit;
+    the first render is always admitted so a busy machine cannot stall the batch entirely.
+    No render is admitted while the batch is paused, and none after it was cancelled.
+    """
+
+    def __init__(
+        self, jobs=None, max_load=None, max_memory=None, poll_interval=1.0, control=None
+    ):
+        """
+        Initialize the admission controller.
+
+        Args:
+            jobs (int or None): Maximum number of concurrent renders. Defaults to default_jobs().
+            max_load (float or None): Maximum one-minute load average for starting a render.
+            max_memory (str or None): Maximum memory usage for starting a render, as a
+                percentage of total memory ("80%") or an absolute size ("24G").
+            poll_interval (float): Seconds between re-checks while waiting for load or memory.
+            control (BatchControl or None): Control of the batch the renders belong to.
+
+        Raises:
+            ValueError: If a limit is invalid.
+        """
+        self.jobs = default_jobs() if jobs is None else jobs
+        if self.jobs < 1:
+            raise ValueError(f"Invalid number of jobs '{jobs}': must be at least 1.")
+        self.max_load = max_load
+        self.max_memory = parse_memory_limit(max_memory) if max_memory else None
+        self.poll_interval = poll_interval
+        self.control = control
+        self.running = 0
+        # Numbers of the idle slots; a render takes the lowest, so busy slots stay together
+        self.free_slots = list(range(self.jobs))
+        self.condition = threading.Condition()
+        self.local = threading.local()
+
+    def describe(self):
+        """
+        Describe the configured limits.
+
+        Returns:
+            str: Human-readable summary of the limits.
+        """
+        limits = [f"up to {self.jobs} concurrent renders"]
+        if self.max_load is not None:
+            limits.append(f"load average below {self.max_load:g}")
+        if self.max_memory is not None:
+            kind, value = self.max_memory
+            limits.append(
+                f"memory usage below {value:g}%"
+                if kind == "percent"
+                else f"memory usage below {value / 1024**3:.1f} GiB"
+            )
+        return ", ".join(limits)
+
+    def limits_exceeded(self):
+        """
+        Check whether the load or memory limit is currently exceeded.
+
+        Returns:
+            str or None: Reason the limit is exceeded, or None if a render may start.
+        """
+        if self.max_load is not None:
+            load = system_load()
+            if load is not None and load >= self.max_load:
+                return f"load average {load:.2f}"
+        if self.max_memory is not None:
+            memory = system_memory()
+            if memory is not None:
+                total, available = memory
+                used = total - available
+                kind, value = self.max_memory
+                limit = total * value / 100 if kind == "percent" else value
+                if used >= limit:
+                    return f"memory usage {used / 1024**3:.1f} GiB"
+        return None
+
+    def held(self):
+        """
+        Check whether the batch holds back all renders.
+
+        Returns:
+            bool: True while the batch is paused.
+
+        Raises:
+            BatchCancelled: If the batch was cancelled.
+        """
+        if self.control is None:
+            return False
+        if self.control.cancelled:
+            raise BatchCancelled()
+        return self.control.paused
+
+    def acquire(self):
+        """
+        Block until another render may start, then reserve a slot for it.
+
+        Returns:
+            int: Number of the slot, from 0 to jobs - 1.
+
+        Raises:
+            BatchCancelled: If the batch was cancelled.
+        """
+        with self.condition:
+            while True:
+                if (
+                    not self.held()
+                    and self.running < self.jobs
+                    and (self.running == 0 or self.limits_exceeded() is None)
+                ):
+                    self.running += 1
+                    return heapq.heappop(self.free_slots)
+                # Woken early when a render finishes; otherwise re-check load and memory
+                self.condition.wait(self.poll_interval)
+
+    def release(self, slot):
+        """
+        Release the slot of a finished render.
+
+        Args:
+            slot (int): Slot returned by acquire().
+        """
+        with self.condition:
+            self.running -= 1
+            heapq.heappush(self.free_slots, slot)
+            self.condition.notify()
+
+    def __enter__(self):
+        self.local.slot = self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release(self.local.slot)
+        return False
+
+
+def bounded_map(executor, fn, iterable, window):
+    """
+    Apply fn to every item of iterable on executor, keeping at most `window` tasks in flight.
+
+    Items are pulled from iterable only when a slot in the window frees up, so iterable can
+    be an arbitrarily long generator.
+
+    Args:
+        executor (concurrent.futures.Executor): Executor to run the tasks on.
+        fn (callable): Function applied to each item.
+        iterable (iterable): Items to process, consumed lazily.
+        window (int): Maximum number of submitted but unfinished tasks.
+
+    Yields:
+        Results of fn in completion order.
+    """
+    iterator = iter(iterable)
+    pending = set()
+    try:
+        for item in iterator:
+            pending.add(executor.submit(fn, item))
+            if len(pending) >= window:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    yield future.result()
+        for future in concurrent.futures.as_completed(pending):
+            yield future.result()
+    finally:
+        # Do not start queued tasks if the consumer stops early
+        for future in pending:
+            future.cancel()
+
+
+def longest_first(tasks, predict, window):
+    """
+    Reorder tasks so the longest predicted renders are submitted first (LPT scheduling).
+
+    Starting long renders first keeps them from ending up as stragglers at the end of the
+    batch. Tasks are read and sorted in chunks of `window`, which gives exact LPT ordering
+    for batches up to that size while bounding memory for larger parameter files. Tasks
+    without a prediction are assumed to take as long as the average predicted task, and ties
+    keep their original order.
+
+    Args:
+        tasks (iterable): Tasks to reorder, consumed lazily.
+        predict (callable): Returns the predicted duration of a task, or None if unknown.
+        window (int): Maximum number of tasks held for sorting at once.
+
+    Yields:
+        Tasks in longest-predicted-first order within each window.
+    """
+    iterator = iter(tasks)
+    while True:
+        chunk = list(itertools.islice(iterator, window))
+        if not chunk:
+            return
+        predictions = [predict(task) for task in chunk]
+        known = [p for p in predictions if p is not None]
+        fallback = sum(known) / len(known) if known else 0.0
+        order = sorted(
+            range(len(chunk)),
+            key=lambda i: -(fallback if predictions[i] is None else predictions[i]),
+        )
+        for i in order:
+            yield chunk[i]
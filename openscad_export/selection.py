@@ -0,0 +1,657 @@
+# openscad_export/selection.py
+
+"""
+Compact representation of parameter set selections.
+
+A selection string such as "0-5,7, every:2 in 10-20, from:100" is compiled into a small
+list of disjoint segments instead of a set of every selected index, so selecting a range of
+millions of rows costs a handful of tuples. Membership is answered by bisecting the segment
+boundaries and the selected indices can be iterated lazily in ascending order.
+
+Predicate clauses ("where:gx>=3 and height<5") are evaluated column-wise over the parameter
+table: each comparison produces a bitmask over all rows, and the masks are combined with
+integer bit operations.
+"""
+
+import re
+import bisect
+import heapq
+import operator
+from array import array
+
+# Segment kinds
+FULL = "full"
+STRIDED = "strided"
+MASK = "mask"
+
+COMPARISONS = {
+    "==": operator.eq,
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+TOKEN_PATTERN = re.compile(
+    r"""\s*(?:
+        (?P<op>==|!=|>=|<=|=|>|<)
+      | (?P<lparen>\()
+      | (?P<rparen>\))
+      | (?P<string>"[^"]*"|'[^']*')
+      | (?P<word>[^\s()=!<>"']+)
+    )""",
+    re.VERBOSE,
+)
+
+TOKEN_NAMES = {
+    "word": "a column name or value",
+    "op": "a comparison operator",
+    "lparen": "'('",
+    "rparen": "')'",
+    "string": "a quoted string",
+    "and": "'and'",
+    "or": "'or'",
+    "not": "'not'",
+}
+
+
+class Selection:
+    """
+    Sorted set of selected parameter set indices stored as disjoint segments.
+
+    Each segment covers the half-open index range [start, stop) and is either fully
+    selected, selected at one or more strides (step, first), or selected by a packed
+    bitmask produced by a predicate clause.
+    """
+
+    def __init__(self, segments):
+        """
+        Initialize the selection.
+
+        Args:
+            segments (list of tuple): Disjoint (start, stop, kind, data) tuples sorted by start.
+        """
+        self.segments = segments
+        self.starts = [segment[0] for segment in segments]
+
+    @property
+    def stop(self):
+        """
+        int: One past the highest index that may be selected, or 0 for an empty selection.
+        """
+        return self.segments[-1][1] if self.segments else 0
+
+    def __contains__(self, index):
+        position = bisect.bisect_right(self.starts, index) - 1
+        if position < 0:
+            return False
+        start, stop, kind, data = self.segments[position]
+        if index >= stop:
+            return False
+        if kind == FULL:
+            return True
+        if kind == STRIDED:
+            return any((index - first) % step == 0 for step, first in data)
+        return bool(data[index >> 3] >> (index & 7) & 1)
+
+    def __iter__(self):
+        for start, stop, kind, data in self.segments:
+            if kind == FULL:
+                yield from range(start, stop)
+            elif kind == STRIDED:
+                ranges = [range(first, stop, step) for step, first in data]
+                previous = None
+                # Merge the strides in ascending order, dropping indices selected twice
+                for index in heapq.merge(*ranges):
+                    if index != previous:
+                        yield index
+                        previous = index
+            else:
+                yield from iter_mask_bits(data, start, stop)
+
+    def __len__(self):
+        count = 0
+        for start, stop, kind, data in self.segments:
+            if kind == FULL:
+                count += stop - start
+            elif kind == STRIDED and len(data) == 1:
+                count += len(range(data[0][1], stop, data[0][0]))
+            elif kind == STRIDED:
+                count += sum(1 for _ in Selection([(start, stop, kind, data)]))
+            else:
+                count += bin(int.from_bytes(data, "little")).count("1")
+        return count
+
+    def __bool__(self):
+        return bool(self.segments)
+
+    def __str__(self):
+        parts = []
+        for start, stop, kind, data in self.segments:
+            if kind == FULL:
+                parts.append(str(start) if stop - start == 1 else f"{start}-{stop - 1}")
+            elif kind == STRIDED:
+                for step, first in data:
+                    last = first + (stop - 1 - first) // step * step
+                    parts.append(f"every:{step} in {first}-{last}")
+            else:
+                count = bin(int.from_bytes(data, "little")).count("1")
+                parts.append(f"{count} matching rows in {start}-{stop - 1}")
+        return ", ".join(parts) if parts else "none"
+
+    def __repr__(self):
+        return f"Selection({self})"
+
+
+def iter_mask_bits(mask, start, stop):
+    """
+    Yield the positions of the set bits of a little-endian bitmask in ascending order.
+
+    Args:
+        mask (bytes): Bitmask; bit i of byte j corresponds to index 8 * j + i.
+        start (int): First index to consider.
+        stop (int): Indices at or beyond stop are not yielded.
+
+    Yields:
+        int: Selected indices.
+    """
+    for position in range(start >> 3, min(len(mask), (stop + 7) >> 3)):
+        byte = mask[position]
+        if not byte:
+            continue  # Skip empty bytes without testing their bits
+        base = position << 3
+        for bit in range(8):
+            if byte >> bit & 1 and start <= base + bit < stop:
+                yield base + bit
+
+
+def build_segments(ranges, masks):
+    """
+    Combine ranges and predicate masks into disjoint segments.
+
+    Args:
+        ranges (list of tuple): (start, stop, step) index ranges, stop exclusive.
+        masks (list of int): Bitmasks over all rows from predicate clauses.
+
+    Returns:
+        list of tuple: Disjoint (start, stop, kind, data) segments sorted by start. Range-only
+            selections produce FULL and STRIDED segments; any predicate clause turns the
+            result into a single MASK segment.
+    """
+    mask = 0
+    for m in masks:
+        mask |= m
+    clauses = [r for r in ranges if r[0] < r[1]]
+    # Split the index line at every clause boundary; each elementary piece is covered by
+    # the same set of clauses throughout
+    boundaries = sorted({b for start, stop, _ in clauses for b in (start, stop)})
+    segments = []
+    for lo, hi in zip(boundaries, boundaries[1:]):
+        covering = [
+            (start, step) for start, stop, step in clauses if start <= lo and hi <= stop
+        ]
+        if not covering:
+            continue
+        if any(step == 1 for _, step in covering):
+            segment = (lo, hi, FULL, None)
+        else:
+            strides = set()
+            for start, step in covering:
+                # Align each stride to the first index it selects within the segment
+                first = lo + (start - lo) % step
+                if first < hi:
+                    strides.add((step, first))
+            if not strides:
+                continue
+            segment = (lo, hi, STRIDED, tuple(sorted(strides)))
+        previous = segments[-1] if segments else None
+        if previous and segment[2] == FULL and previous[2] == FULL and previous[1] == lo:
+            segments[-1] = (previous[0], hi, FULL, None)
+        else:
+            segments.append(segment)
+    if mask:
+        segments = merge_mask(segments, mask)
+    return segments
+
+
+def merge_mask(segments, mask):
+    """
+    Merge a predicate bitmask into a list of range segments.
+
+    Range segments are converted into mask bits, which keeps the result a single mask segment
+    spanning all selected rows; the mask already holds one bit per row of the table.
+
+    Args:
+        segments (list of tuple): Disjoint range segments.
+        mask (int): Bitmask of rows selected by predicates.
+
+    Returns:
+        list of tuple: A single MASK segment.
+    """
+    for start, stop, kind, data in segments:
+        if kind == FULL:
+            mask |= ((1 << (stop - start)) - 1) << start
+        else:
+            for index in Selection([(start, stop, kind, data)]):
+                mask |= 1 << index
+    lowest = (mask & -mask).bit_length() - 1
+    highest = mask.bit_length()
+    packed = mask.to_bytes((highest + 7) // 8, "little")
+    return [(lowest, highest, MASK, packed)]
+
+
+def check_index(index, total_params, label="Index"):
+    """
+    Validate that an index lies within the parameter table.
+
+    Args:
+        index (int): Index to check.
+        total_params (int): Total number of parameter sets.
+        label (str): Name of the index used in the error message.
+
+    Raises:
+        ValueError: If the index is out of range.
+    """
+    if index < 0 or index >= total_params:
+        raise ValueError(f"{label} {index} out of range (0-{total_params -1}).")
+
+
+def parse_range(range_str):
+    """
+    Parse an inclusive "start-end" range.
+
+    Args:
+        range_str (str): Range such as "3-10".
+
+    Returns:
+        tuple: (start, end), both inclusive.
+
+    Raises:
+        ValueError: If the range is invalid.
+    """
+    start, end = map(int, range_str.split("-"))
+    if start > end:
+        raise ValueError(f"Invalid range '{range_str}': start > end.")
+    return start, end
+
+
+def split_clauses(selection_str):
+    """
+    Split a selection string at the commas outside quoted values.
+
+    Args:
+        selection_str (str): Selection string, e.g. '0-5, where:name=="a,b"'.
+
+    Returns:
+        list of str: The comma-separated clauses, unstripped.
+    """
+    clauses = []
+    start = 0
+    quote = None
+    for position, char in enumerate(selection_str):
+        if quote is not None:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == ",":
+            clauses.append(selection_str[start:position])
+            start = position + 1
+    clauses.append(selection_str[start:])
+    return clauses
+
+
+def compile_selection(selection_str, total_params, rows=None):
+    """
+    Compile a selection string into a Selection.
+
+    Args:
+        selection_str (str): Selection string (e.g., "0-5,7, every:2 in 0-10, from:15, where:gx>=3").
+        total_params (int): Total number of parameter sets.
+        rows (callable or None): Returns a fresh iterator over the parameter dictionaries;
+            required for 'where:' clauses.
+
+    Returns:
+        Selection: Compiled selection.
+
+    Raises:
+        ValueError: If the selection string is invalid.
+    """
+    ranges = []
+    predicates = []
+    for part in split_clauses(selection_str):
+        part = part.strip()
+        if not part:
+            continue
+        if part.startswith("where:"):
+            try:
+                predicates.append(parse_predicate(part[len("where:") :]))
+            except ValueError as ve:
+                raise ValueError(f"Invalid 'where' selection '{part}': {ve}")
+        elif part.startswith("every:"):
+            try:
+                _, rest = part.split(":", 1)
+                step, range_part = rest.split(" in ")
+                step = int(step)
+                if step < 1:
+                    raise ValueError(f"Step {step} must be at least 1.")
+                start, end = parse_range(range_part)
+                check_index(start, total_params)
+                # Only the last index actually selected has to exist
+                check_index(start + (end - start) // step * step, total_params)
+                ranges.append((start, end + 1, step))
+            except ValueError as ve:
+                raise ValueError(f"Invalid step selection '{part}': {ve}")
+        elif part.startswith("from:"):
+            try:
+                _, start_str = part.split(":", 1)
+                start = int(start_str)
+                check_index(start, total_params, "Start index")
+                ranges.append((start, total_params, 1))
+            except ValueError as ve:
+                raise ValueError(f"Invalid 'from' selection '{part}': {ve}")
+        elif part.startswith("up_to:"):
+            try:
+                _, end_str = part.split(":", 1)
+                end = int(end_str)
+                check_index(end, total_params, "End index")
+                ranges.append((0, end + 1, 1))
+            except ValueError as ve:
+                raise ValueError(f"Invalid 'up_to' selection '{part}': {ve}")
+        elif "-" in part:
+            try:
+                start, end = parse_range(part)
+                check_index(start, total_params)
+                check_index(end, total_params)
+                ranges.append((start, end + 1, 1))
+            except ValueError as ve:
+                raise ValueError(f"Invalid range '{part}': {ve}")
+        else:
+            try:
+                index = int(part)
+                check_index(index, total_params)
+                ranges.append((index, index + 1, 1))
+            except ValueError as ve:
+                raise ValueError(f"Invalid index '{part}': {ve}")
+
+    masks = []
+    if predicates:
+        if rows is None:
+            raise ValueError("'where' selections require access to the parameter table.")
+        names = set()
+        for predicate in predicates:
+            names.update(predicate_columns(predicate))
+        columns = read_columns(rows(), names, total_params)
+        masks = [evaluate_predicate(p, columns, total_params) for p in predicates]
+    return Selection(build_segments(ranges, masks))
+
+
+def tokenize(expression):
+    """
+    Split a predicate expression into tokens.
+
+    Args:
+        expression (str): Predicate such as "gx>=3 and height<5".
+
+    Returns:
+        list of tuple: (kind, text) tokens.
+
+    Raises:
+        ValueError: If the expression contains an unexpected character.
+    """
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN_PATTERN.match(expression, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Unexpected character at '{expression[position:]}'.")
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "word" and text.lower() in ("and", "or", "not"):
+            kind = text.lower()
+        tokens.append((kind, text))
+        position = match.end()
+    return tokens
+
+
+def parse_predicate(expression):
+    """
+    Parse a predicate expression into a tree.
+
+    Grammar: expr := term ("or" term)*; term := factor ("and" factor)*;
+    factor := "not" factor | "(" expr ")" | column op value.
+
+    Args:
+        expression (str): Predicate such as "gx>=3 and (height<5 or example==2)".
+
+    Returns:
+        tuple: Predicate tree of ('or', a, b), ('and', a, b), ('not', a) and
+            ('cmp', column, op, value) nodes.
+
+    Raises:
+        ValueError: If the expression is invalid.
+    """
+    tokens = tokenize(expression)
+    position = 0
+
+    def peek():
+        return tokens[position][0] if position < len(tokens) else None
+
+    def take(kind):
+        nonlocal position
+        if peek() != kind:
+            found = tokens[position][1] if position < len(tokens) else "end of expression"
+            raise ValueError(f"Expected {TOKEN_NAMES[kind]} but found '{found}'.")
+        position += 1
+        return tokens[position - 1][1]
+
+    def parse_or():
+        node = parse_and()
+        while peek() == "or":
+            take("or")
+            node = ("or", node, parse_and())
+        return node
+
+    def parse_and():
+        node = parse_factor()
+        while peek() == "and":
+            take("and")
+            node = ("and", node, parse_factor())
+        return node
+
+    def parse_factor():
+        if peek() == "not":
+            take("not")
+            return ("not", parse_factor())
+        if peek() == "lparen":
+            take("lparen")
+            node = parse_or()
+            take("rparen")
+            return node
+        column = take("word")
+        op = take("op")
+        if peek() == "string":
+            value = take("string")[1:-1]
+        else:
+            value = take("word")
+        return ("cmp", column, op, value)
+
+    if not tokens:
+        raise ValueError("Empty predicate.")
+    tree = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"Unexpected '{tokens[position][1]}'.")
+    return tree
+
+
+def predicate_columns(tree):
+    """
+    Return the names of the columns referenced by a predicate tree.
+
+    Args:
+        tree (tuple): Predicate tree from parse_predicate().
+
+    Returns:
+        set of str: Column names.
+    """
+    if tree[0] == "cmp":
+        return {tree[1]}
+    return set().union(*(predicate_columns(child) for child in tree[1:]))
+
+
+def to_number(value):
+    """
+    Convert a parameter value to a float if it represents a number.
+
+    Args:
+        value: Parameter value from a CSV or JSON file.
+
+    Returns:
+        float or None: Numeric value, or None if the value is not numeric.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_text(value):
+    """
+    Convert a parameter value to the text it is compared as.
+
+    Args:
+        value: Parameter value from a CSV or JSON file.
+
+    Returns:
+        str: Text form of the value; booleans become 'true'/'false'.
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else str(value)
+
+
+def read_columns(rows, names, total_params):
+    """
+    Read the named columns of the parameter table.
+
+    Numeric columns are stored as compact float arrays; a column containing any
+    non-numeric value is kept as a list of strings.
+
+    Args:
+        rows (iterator of dict): Parameter dictionaries.
+        names (set of str): Columns to read. The pseudo-column 'index' is the row index.
+        total_params (int): Total number of parameter sets.
+
+    Returns:
+        dict: Mapping of column name to an array of floats or a list of strings.
+            Columns missing from every row are omitted.
+    """
+    wanted = sorted(name for name in names if name != "index")
+    raw = {name: [] for name in wanted}
+    appends = [(name, raw[name].append) for name in wanted]
+    present = set()
+    for row in rows:
+        for name, append in appends:
+            value = row.get(name)
+            if value is not None or name in row:
+                present.add(name)
+            # Missing values are kept as None so every column stays aligned with the rows
+            append(value)
+    columns = {}
+    for name in wanted:
+        values = raw.pop(name)
+        # Columns that never occur in the table are left out so they can be reported
+        if name not in present:
+            continue
+        if not any(type(v) is bool for v in values):
+            try:
+                columns[name] = array("d", map(float, values))
+                continue
+            except (TypeError, ValueError):
+                pass  # Textual column
+        columns[name] = [to_text(v) for v in values]
+    if "index" in names:
+        columns["index"] = array("d", range(total_params))
+    return columns
+
+
+def mask_from_flags(flags):
+    """
+    Build a bitmask from an iterable of booleans.
+
+    Args:
+        flags (iterable of bool): One flag per row.
+
+    Returns:
+        int: Bitmask whose bit i is set when flag i is true.
+    """
+    packed = bytearray()
+    byte = 0
+    bit = 0
+    for flag in flags:
+        if flag:
+            byte |= 1 << bit
+        bit += 1
+        if bit == 8:
+            packed.append(byte)
+            byte = 0
+            bit = 0
+    if bit:
+        packed.append(byte)
+    return int.from_bytes(bytes(packed), "little")
+
+
+def evaluate_predicate(tree, columns, total_params):
+    """
+    Evaluate a predicate tree column-wise.
+
+    Args:
+        tree (tuple): Predicate tree from parse_predicate().
+        columns (dict): Columns from read_columns().
+        total_params (int): Total number of parameter sets.
+
+    Returns:
+        int: Bitmask of the rows satisfying the predicate.
+
+    Raises:
+        ValueError: If the predicate references an unknown column.
+    """
+    kind = tree[0]
+    if kind == "or":
+        return evaluate_predicate(tree[1], columns, total_params) | evaluate_predicate(
+            tree[2], columns, total_params
+        )
+    if kind == "and":
+        return evaluate_predicate(tree[1], columns, total_params) & evaluate_predicate(
+            tree[2], columns, total_params
+        )
+    if kind == "not":
+        everything = (1 << total_params) - 1
+        return everything & ~evaluate_predicate(tree[1], columns, total_params)
+    _, name, op, value = tree
+    column = columns.get(name)
+    if column is None:
+        raise ValueError(f"Unknown column '{name}'.")
+    compare = COMPARISONS[op]
+    number = to_number(value)
+    if isinstance(column, array) and number is not None:
+        return mask_from_flags(compare(v, number) for v in column)
+    if number is not None:
+        # Mixed column: compare numerically where possible, textually otherwise
+        def matches(text):
+            numeric = to_number(text)
+            if numeric is not None:
+                return compare(numeric, number)
+            return compare(text, value)
+
+        return mask_from_flags(matches(v) for v in column)
+    if isinstance(column, array):
+        column = [f"{v:g}" for v in column]
+    return mask_from_flags(compare(v, value) for v in column)
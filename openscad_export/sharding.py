@@ -0,0 +1,261 @@
+# openscad_export/sharding.py
+
+"""
+Deterministic partitioning of a batch over independent export processes.
+
+Cluster array jobs start N exports of the same parameter file, each given --shard i/N. The
+rows are split so that every row is rendered by exactly one shard: by predicted render time
+when the timing history has predictions (longest rows first, each to the least loaded
+shard), and round-robin otherwise. Rows repeating an earlier row stay with that row, so
+they can still be copied instead of rendered.
+
+Shards may see different timing histories, and the history changes while they run. The
+first shard to start therefore stores its partition as a plan file in the output folder and
+later shards reuse it. Every shard writes a manifest of its results, and the manifests are
+combined and checked for missing and duplicate rows by merge_manifests().
+"""
+
+import os
+import json
+import glob
+import heapq
+import hashlib
+
+PLAN_PATTERN = "shard_plan-*.json"
+
+MANIFEST_PATTERN = "shard-*-of-*.manifest.json"
+
+
+def parse_shard(shard_str):
+    """
+    Parse a shard specification.
+
+    Args:
+        shard_str (str): Shard as "i/n" with 1 <= i <= n.
+
+    Returns:
+        tuple: (i, n).
+
+    Raises:
+        ValueError: If the specification is invalid.
+    """
+    try:
+        index, count = (int(part) for part in shard_str.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{shard_str}': expected i/n, e.g. 2/8.")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{shard_str}': i must be between 1 and n.")
+    return index, count
+
+
+def manifest_name(index, count):
+    """
+    Return the file name of the manifest of a shard.
+    """
+    return f"shard-{index}-of-{count}.manifest.json"
+
+
+def plan_name(fingerprint):
+    """
+    Return the file name of the plan of a fingerprint.
+    """
+    return f"shard_plan-{fingerprint[:16]}.json"
+
+
+def plan_fingerprint(parameter_digest, selection, count, ignored):
+    """
+    Identify the inputs a partition depends on.
+
+    Args:
+        parameter_digest (str): Digest of the parameter file.
+        selection (str or None): Selection string.
+        count (int): Number of shards.
+        ignored (collection of str): Parameters left out of the -D flags, which change
+            which rows count as duplicates.
+
+    Returns:
+        str: Hexadecimal fingerprint.
+    """
+    key = json.dumps([parameter_digest, selection or "", count, sorted(ignored)])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def partition(rows, count, cost=None):
+    """
+    Split rows over shards.
+
+    Args:
+        rows (iterable of int): Row indices to split, in file order.
+        count (int): Number of shards.
+        cost (callable or None): Returns the predicted render time of a row or None. When
+            no row has a prediction, rows are dealt round-robin.
+
+    Returns:
+        tuple:
+            str: 'cost' or 'round-robin'.
+            list of list of int: Ascending row indices per shard.
+    """
+    rows = list(rows)
+    predicted = {}
+    if cost is not None:
+        for idx in rows:
+            value = cost(idx)
+            if value is not None:
+                predicted[idx] = value
+    shards = [[] for _ in range(count)]
+    if not predicted:
+        for position, idx in enumerate(rows):
+            shards[position % count].append(idx)
+        return "round-robin", shards
+    # Rows without a prediction are assumed to take an average time
+    default = sum(predicted.values()) / len(predicted)
+    loads = [(0.0, shard) for shard in range(count)]
+    for idx in sorted(rows, key=lambda idx: (-predicted.get(idx, default), idx)):
+        load, shard = heapq.heappop(loads)
+        shards[shard].append(idx)
+        heapq.heappush(loads, (load + predicted.get(idx, default), shard))
+    for rows_of_shard in shards:
+        rows_of_shard.sort()
+    return "cost", shards
+
+
+def shared_plan(folder, fingerprint, compute):
+    """
+    Return the partition stored in a folder, creating it if needed.
+
+    Plans are named after their fingerprint and created with a hardlink, so that of several
+    shards starting at once only one stores its partition and all others read it. Plans left
+    by batches with different inputs are never replaced in place but removed.
+
+    Args:
+        folder (str): Output folder shared by the shards.
+        fingerprint (str): Result of plan_fingerprint().
+        compute (callable): Returns (method, shards) as partition() does.
+
+    Returns:
+        tuple: (method, shards) of the stored plan.
+    """
+    path = os.path.join(folder, plan_name(fingerprint))
+    for stale_path in glob.glob(os.path.join(folder, PLAN_PATTERN)):
+        if stale_path != path:
+            try:
+                os.remove(stale_path)
+            except OSError:
+                # Removed by another shard
+                pass
+    try:
+        with open(path) as f:
+            plan = json.load(f)
+        if plan.get("fingerprint") == fingerprint:
+            return plan["method"], plan["shards"]
+    except (OSError, ValueError):
+        pass
+    method, shards = compute()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"fingerprint": fingerprint, "method": method, "shards": shards}, f)
+    try:
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            try:
+                with open(path) as f:
+                    plan = json.load(f)
+                if plan.get("fingerprint") == fingerprint:
+                    # Another shard stored its plan first
+                    return plan["method"], plan["shards"]
+            except ValueError:
+                pass
+            # A damaged plan, or one whose fingerprint shares the prefix
+            os.replace(tmp_path, path)
+        except OSError:
+            # File systems without hardlinks
+            os.replace(tmp_path, path)
+        return method, shards
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_manifest(path, manifest):
+    """
+    Atomically write a shard manifest.
+
+    Args:
+        path (str): Manifest path.
+        manifest (dict): Manifest contents.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_path, path)
+
+
+def find_manifests(paths):
+    """
+    Expand manifest files and folders containing manifests.
+
+    Args:
+        paths (list of str): Manifest files or folders.
+
+    Returns:
+        list of str: Manifest files.
+    """
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found += sorted(glob.glob(os.path.join(path, MANIFEST_PATTERN)))
+        else:
+            found.append(path)
+    return found
+
+
+def merge_manifests(manifests, expected_rows=None):
+    """
+    Combine shard manifests into one report.
+
+    Args:
+        manifests (list of dict): Loaded shard manifests.
+        expected_rows (collection of int or None): Every row the batch should cover, or None
+            to only compare the number of rows with the manifests' 'total_rows'.
+
+    Returns:
+        dict: Report with the merged rows, missing shards, missing rows, rows reported by
+            more than one shard and the failed rows.
+    """
+    count = manifests[0]["shards"]
+    seen_shards = {}
+    for manifest in manifests:
+        # A re-run shard replaces its earlier manifest
+        previous = seen_shards.get(manifest["shard"])
+        if previous is None or manifest["finished_at"] >= previous["finished_at"]:
+            seen_shards[manifest["shard"]] = manifest
+
+    rows = {}
+    reported_by = {}
+    for shard, manifest in sorted(seen_shards.items()):
+        for entry in manifest["rows"]:
+            reported_by.setdefault(entry["row"], []).append(shard)
+            rows[entry["row"]] = dict(entry, shard=shard)
+
+    if expected_rows is not None:
+        missing_rows = sorted(set(expected_rows) - rows.keys())
+    else:
+        missing_rows = None
+    total_rows = manifests[0]["total_rows"]
+    return {
+        "shards": count,
+        "fingerprints": sorted({m["fingerprint"] for m in seen_shards.values()}),
+        "missing_shards": [s for s in range(1, count + 1) if s not in seen_shards],
+        "total_rows": total_rows,
+        "missing_rows": missing_rows,
+        "unaccounted_rows": max(total_rows - len(rows), 0),
+        "duplicate_rows": {
+            str(row): shards for row, shards in sorted(reported_by.items()) if len(shards) > 1
+        },
+        "failed_rows": [
+            row for row, entry in sorted(rows.items())
+            if entry["status"] not in ("success", "cached", "resumed")
+        ],
+        "rows": [entry for _, entry in sorted(rows.items())],
+    }
@@ -0,0 +1,346 @@
+# openscad_export/spool.py
+
+"""
+Pull-based export through a job queue on shared storage.
+
+`openscad-export export --spool DIR` writes one job file per row into DIR instead of
+rendering. Any number of `openscad-export drain DIR` processes, on any host that mounts DIR
+and the output folder under the same paths, take jobs from the queue until it is empty.
+Fast hosts simply take more jobs, so the load balances itself across a mixed farm.
+
+Layout of the spool directory:
+- pending/  Jobs waiting to be rendered, taken in name order.
+- claimed/  Jobs being rendered, named <job>@<owner>. A job is claimed by renaming it from
+            pending/, which succeeds for exactly one process even on network file systems.
+            The owner refreshes the modification time of its claims; claims not refreshed
+            for longer than the lease belong to a crashed drain and are moved back to
+            pending/.
+- done/     One completion record per finished job.
+- tmp/      Files being written, renamed into place once complete.
+
+Job files are self-contained, so batches from different exports can share a spool.
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+import concurrent.futures
+
+from openscad_export.cache import link_or_copy
+from openscad_export.journal import partial_path
+from openscad_export.watchdog import RenderTimeout
+
+# Seconds after which a claim that was not refreshed is considered abandoned
+DEFAULT_LEASE = 300.0
+
+# Seconds between checks for new or abandoned jobs while other drains hold claims
+POLL_INTERVAL = 5.0
+
+SPOOL_FOLDERS = ("pending", "claimed", "done", "tmp")
+
+
+class Spool:
+    """
+    Job queue in a directory shared by several hosts.
+    """
+
+    def __init__(self, directory):
+        """
+        Open a spool directory, creating its folders if needed.
+
+        Args:
+            directory (str): Spool directory.
+        """
+        self.directory = os.path.abspath(directory)
+        for folder in SPOOL_FOLDERS:
+            os.makedirs(os.path.join(self.directory, folder), exist_ok=True)
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+        self.held = set()
+        self.listing = []
+        self.lock = threading.Lock()
+
+    def path(self, folder, name):
+        """
+        Return the path of a file in one of the spool folders.
+        """
+        return os.path.join(self.directory, folder, name)
+
+    def write(self, folder, name, data):
+        """
+        Atomically write a JSON file into one of the spool folders.
+
+        Args:
+            folder (str): Target folder.
+            name (str): File name.
+            data (dict): File contents.
+        """
+        tmp_path = self.path("tmp", f"{name}.{self.owner}")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path(folder, name))
+
+    def enqueue(self, jobs):
+        """
+        Add jobs to the queue.
+
+        Args:
+            jobs (iterable of dict): Job descriptions, in the order they should be taken.
+
+        Returns:
+            int: Number of jobs added.
+        """
+        # Names sort by batch first, so earlier batches are drained first
+        batch = time.strftime("%Y%m%d%H%M%S") + f"-{self.owner}"
+        count = 0
+        for count, job in enumerate(jobs, 1):
+            self.write("pending", f"{batch}-{count:08d}.json", job)
+        return count
+
+    def claim(self):
+        """
+        Take the next pending job.
+
+        The pending folder is listed once and the listing is consumed by all threads, so a
+        large queue is not listed again for every job.
+
+        Returns:
+            tuple or None: (name, job) of the claimed job, or None if no job is pending.
+        """
+        for refreshed in (False, True):
+            if refreshed:
+                names = sorted(os.listdir(os.path.join(self.directory, "pending")))
+                with self.lock:
+                    self.listing = names[::-1]
+            while True:
+                with self.lock:
+                    if not self.listing:
+                        break
+                    name = self.listing.pop()
+                claim_name = f"{name}@{self.owner}"
+                try:
+                    os.rename(self.path("pending", name), self.path("claimed", claim_name))
+                    # A rename keeps the mtime of the enqueued file, which would make an
+                    # old job look abandoned to reclaim() as soon as it is claimed
+                    os.utime(self.path("claimed", claim_name))
+                except FileNotFoundError:
+                    # Another drain claimed it first
+                    continue
+                with self.lock:
+                    self.held.add(claim_name)
+                try:
+                    with open(self.path("claimed", claim_name)) as f:
+                        return name, json.load(f)
+                except (OSError, ValueError) as e:
+                    self.complete(name, {"status": "failure", "error": f"Unreadable job: {e}"})
+        return None
+
+    def heartbeat(self):
+        """
+        Refresh the modification time of every claim held by this process.
+        """
+        with self.lock:
+            held = list(self.held)
+        for claim_name in held:
+            try:
+                os.utime(self.path("claimed", claim_name))
+            except FileNotFoundError:
+                # Reclaimed by another drain after a missed heartbeat
+                pass
+
+    def reclaim(self, lease):
+        """
+        Move abandoned claims back to the pending folder.
+
+        Args:
+            lease (float): Seconds after which a claim that was not refreshed is abandoned.
+
+        Returns:
+            tuple:
+                int: Number of jobs moved back.
+                int: Number of claims still held by live drains.
+        """
+        reclaimed = active = 0
+        now = time.time()
+        for claim_name in os.listdir(os.path.join(self.directory, "claimed")):
+            path = self.path("claimed", claim_name)
+            try:
+                age = now - os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            if age <= lease or claim_name in self.held:
+                active += 1
+                continue
+            name = claim_name.rsplit("@", 1)[0]
+            try:
+                os.rename(path, self.path("pending", name))
+                reclaimed += 1
+            except FileNotFoundError:
+                pass
+        return reclaimed, active
+
+    def complete(self, name, record):
+        """
+        Write the completion record of a claimed job and release the claim.
+
+        Args:
+            name (str): Job name.
+            record (dict): Result of the job.
+        """
+        claim_name = f"{name}@{self.owner}"
+        self.write("done", name, dict(record, host=self.owner, finished_at=time.time()))
+        with self.lock:
+            self.held.discard(claim_name)
+        try:
+            os.remove(self.path("claimed", claim_name))
+        except FileNotFoundError:
+            pass
+
+    def counts(self):
+        """
+        Return the number of pending, claimed and finished jobs.
+        """
+        return {
+            folder: len(os.listdir(os.path.join(self.directory, folder)))
+            for folder in ("pending", "claimed", "done")
+        }
+
+
+def run_job(render, openscad_path, job, multiple_outputs):
+    """
+    Render one spooled job and place the copies of rows repeating it.
+
+    Args:
+        render (callable): Function with the signature of export.export_outputs.
+        openscad_path (str): Path to the OpenSCAD executable.
+        job (dict): Job description written by batch_export.
+        multiple_outputs (bool): Whether the OpenSCAD version accepts several -o options.
+
+    Returns:
+        dict: Completion record with status, files, duration and error.
+    """
+    outputs = [tuple(output) for output in job["outputs"]]
+    for _, path in outputs:
+        if os.path.exists(path):
+            os.remove(path)
+    # Rendered under temporary names, so the output folder never holds a partial file
+    partials = [(fmt, partial_path(path)) for fmt, path in outputs]
+    for attempt in range(job["retries"] + 1):
+        try:
+            success, error, duration = render(
+                openscad_path,
+                job["scad_file"],
+                partials,
+                job["d_flags"],
+                job["timeout"],
+                job["max_rss"],
+                job["extra_flags"],
+                multiple_outputs,
+            )
+            status = "success" if success else "failure"
+            break
+        except RenderTimeout as e:
+            success, error, duration = False, str(e), e.duration
+            status = "timeout"
+    record = {"row": job["row"], "status": status, "duration": duration}
+    if not success:
+        for _, partial in partials:
+            if os.path.exists(partial):
+                os.remove(partial)
+        record["error"] = error
+        return record
+    files = [path for _, path in outputs]
+    for (_, partial), path in zip(partials, files):
+        os.replace(partial, path)
+    for copy in job["copies"]:
+        for source, path in zip(files[: len(outputs)], copy):
+            link_or_copy(source, path)
+            files.append(path)
+    record["files"] = files
+    return record
+
+
+def drain_spool(
+    render,
+    spool_dir,
+    openscad_path,
+    admission,
+    lease=DEFAULT_LEASE,
+    multiple_outputs=False,
+    wait=False,
+):
+    """
+    Render jobs from a spool until it is empty.
+
+    Args:
+        render (callable): Function with the signature of export.export_outputs.
+        spool_dir (str): Spool directory.
+        openscad_path (str): Path to the OpenSCAD executable.
+        admission (AdmissionController): Limits the number of concurrent renders.
+        lease (float): Seconds after which claims of other drains that were not refreshed
+            are taken over.
+        multiple_outputs (bool): Whether the OpenSCAD version accepts several -o options.
+        wait (bool): Keep waiting for new jobs instead of returning once the spool is empty.
+
+    Returns:
+        tuple: (successes, failures) as lists of completion records.
+    """
+    spool = Spool(spool_dir)
+    successes = []
+    failures = []
+    stop = threading.Event()
+
+    def keep_claims():
+        """
+        Refresh held claims well within the lease until draining stops.
+        """
+        while not stop.wait(lease / 4):
+            spool.heartbeat()
+
+    def drain():
+        """
+        Claim and render jobs until no job is pending or claimed.
+        """
+        while True:
+            with admission:
+                claimed = spool.claim()
+                if claimed is not None:
+                    name, job = claimed
+                    try:
+                        record = run_job(render, openscad_path, job, multiple_outputs)
+                    except Exception as e:
+                        record = {"row": job.get("row"), "status": "failure", "error": str(e)}
+                    spool.complete(name, record)
+            if claimed is None:
+                reclaimed, active = spool.reclaim(lease)
+                if reclaimed:
+                    print(f"Took over {reclaimed} abandoned jobs.")
+                    continue
+                if not active and not wait:
+                    return
+                time.sleep(min(POLL_INTERVAL, lease))
+                continue
+            if record["status"] == "success":
+                successes.append(record)
+                print(
+                    f"Exported: {', '.join(record['files'])} in {record['duration']:.2f} seconds."
+                )
+            else:
+                failures.append(record)
+                print(f"Error exporting row {record['row']}: {record['error']}")
+
+    counts = spool.counts()
+    print(
+        f"Draining {spool.directory}: {counts['pending']} jobs pending, "
+        f"{counts['claimed']} claimed ({admission.describe()})."
+    )
+    heartbeat = threading.Thread(target=keep_claims, daemon=True)
+    heartbeat.start()
+    try:
+        with concurrent.futures.ThreadPoolExecutor(admission.jobs) as executor:
+            for future in [executor.submit(drain) for _ in range(admission.jobs)]:
+                future.result()
+    finally:
+        stop.set()
+    return successes, failures
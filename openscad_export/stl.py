@@ -0,0 +1,96 @@
+# openscad_export/stl.py
+
+"""
+Reading of STL files exported by OpenSCAD.
+
+Both binary and ASCII STL files are supported. The helpers here work on plain Python
+structures and are intended for small numbers of files, such as comparing sample renders.
+"""
+
+import struct
+
+BINARY_HEADER_SIZE = 80
+BINARY_TRIANGLE_SIZE = 50
+BINARY_TRIANGLE = struct.Struct("<12fH")
+
+
+def is_binary_stl(path):
+    """
+    Check whether an STL file is in the binary format.
+
+    ASCII files start with "solid", but so do some binary headers, so the file size is
+    checked against the triangle count stored in the binary header.
+
+    Args:
+        path (str): Path to the STL file.
+
+    Returns:
+        bool: True for binary STL files.
+    """
+    with open(path, "rb") as f:
+        header = f.read(BINARY_HEADER_SIZE + 4)
+        f.seek(0, 2)
+        size = f.tell()
+    if len(header) < BINARY_HEADER_SIZE + 4:
+        return False
+    (count,) = struct.unpack_from("<I", header, BINARY_HEADER_SIZE)
+    if size == BINARY_HEADER_SIZE + 4 + count * BINARY_TRIANGLE_SIZE:
+        return True
+    return not header.lstrip().startswith(b"solid")
+
+
+def iter_triangles(path):
+    """
+    Iterate over the triangles of an STL file.
+
+    Args:
+        path (str): Path to the STL file.
+
+    Yields:
+        tuple: Three (x, y, z) vertex tuples per triangle.
+    """
+    if is_binary_stl(path):
+        with open(path, "rb") as f:
+            f.seek(BINARY_HEADER_SIZE)
+            (count,) = struct.unpack("<I", f.read(4))
+            data = f.read(count * BINARY_TRIANGLE_SIZE)
+        for values in BINARY_TRIANGLE.iter_unpack(data):
+            yield values[3:6], values[6:9], values[9:12]
+        return
+    vertices = []
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            parts = line.split()
+            if parts and parts[0] == "vertex":
+                vertices.append(tuple(float(v) for v in parts[1:4]))
+                if len(vertices) == 3:
+                    yield tuple(vertices)
+                    vertices = []
+
+
+def stl_summary(path):
+    """
+    Return the triangle count and bounding box of an STL file.
+
+    Args:
+        path (str): Path to the STL file.
+
+    Returns:
+        tuple:
+            int: Number of triangles.
+            tuple or None: ((min_x, min_y, min_z), (max_x, max_y, max_z)), or None if empty.
+    """
+    count = 0
+    low = [float("inf")] * 3
+    high = [float("-inf")] * 3
+    for triangle in iter_triangles(path):
+        count += 1
+        for vertex in triangle:
+            for axis in range(3):
+                if vertex[axis] < low[axis]:
+                    low[axis] = vertex[axis]
+                if vertex[axis] > high[axis]:
+                    high[axis] = vertex[axis]
+    if not count:
+        return 0, None
+    return count, (tuple(low), tuple(high))
@@ -0,0 +1,421 @@
+# openscad_export/watchdog.py
+
+"""
+Supervision of running OpenSCAD processes.
+
+Each OpenSCAD render runs in its own process group (a new session on POSIX, a new process
+group on Windows) so that it can be killed together with any children it spawns. A single
+watchdog thread polls all running renders and kills the process group of any render that
+exceeds its wall-clock timeout or resident memory limit. On Linux the child additionally
+gets a hard address-space limit through resource.prlimit as a backstop.
+
+The renders of a batch form a RenderGroup, so a batch can be paused (SIGSTOP, with the
+timeouts frozen), resumed (SIGCONT) or cancelled, which kills its running renders, without
+touching the renders of other batches in the same process.
+"""
+
+import os
+import sys
+import time
+import signal
+import threading
+import subprocess
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Hard address-space limit relative to the resident memory limit. OpenSCAD maps more
+# virtual memory than it touches, so the backstop has to be looser than the RSS limit.
+ADDRESS_SPACE_FACTOR = 2
+
+# Seconds between SIGTERM and SIGKILL when killing a process group
+KILL_GRACE_PERIOD = 2.0
+
+
+class RenderTimeout(Exception):
+    """
+    Raised when a render is killed for exceeding its wall-clock timeout.
+    """
+
+    def __init__(self, timeout, duration):
+        """
+        Initialize the exception.
+
+        Args:
+            timeout (float): Timeout that was exceeded, in seconds.
+            duration (float): Time the render ran before it was killed, in seconds.
+        """
+        super().__init__(f"Timed out after {timeout:g} seconds.")
+        self.timeout = timeout
+        self.duration = duration
+
+
+def popen_group_kwargs():
+    """
+    Return the subprocess.Popen arguments that start a process in its own process group.
+
+    Returns:
+        dict: Keyword arguments for subprocess.Popen.
+    """
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def limit_address_space(pid, max_rss):
+    """
+    Apply the hard address-space backstop to a started process.
+
+    The limit is set from the parent with prlimit, as running code in the child between fork
+    and exec is unsafe in a multi-threaded process. Other platforms rely on the watchdog
+    alone.
+
+    Args:
+        pid (int): Process identifier.
+        max_rss (int or None): Resident memory limit in bytes.
+    """
+    if max_rss is None or not hasattr(resource, "prlimit"):
+        return
+    limit = int(max_rss * ADDRESS_SPACE_FACTOR)
+    try:
+        resource.prlimit(pid, resource.RLIMIT_AS, (limit, limit))
+    except (ProcessLookupError, PermissionError, ValueError):
+        # Already exited, or the limit is above what the process may set
+        pass
+
+
+def kill_process_group(process):
+    """
+    Kill a process and every process in its group.
+
+    Children may outlive the process, so on POSIX the group is signalled even after the
+    process itself has exited.
+
+    Args:
+        process (subprocess.Popen): Process started with popen_group_kwargs().
+    """
+    if sys.platform == "win32":
+        if process.poll() is not None:
+            return
+        # taskkill /T also terminates the children of the process
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return
+    signal_group(process.pid, signal.SIGTERM)
+    try:
+        process.wait(KILL_GRACE_PERIOD)
+    except subprocess.TimeoutExpired:
+        pass
+    signal_group(process.pid, signal.SIGKILL)
+
+
+def signal_group(pid, sig):
+    """
+    Send a signal to a process group, ignoring groups that have already exited.
+
+    Args:
+        pid (int): Process identifier of the group leader.
+        sig (int): Signal to send.
+    """
+    try:
+        os.killpg(pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def kill_group_by_pid(pid):
+    """
+    Kill a process group that this thread does not own a Popen object for.
+
+    The group gets SIGTERM right away and SIGKILL after the grace period, without waiting.
+
+    Args:
+        pid (int): Process identifier of the group leader.
+    """
+    if sys.platform == "win32":
+        subprocess.Popen(
+            ["taskkill", "/F", "/T", "/PID", str(pid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        return
+    signal_group(pid, signal.SIGTERM)
+    timer = threading.Timer(KILL_GRACE_PERIOD, signal_group, (pid, signal.SIGKILL))
+    timer.daemon = True
+    timer.start()
+
+
+def resident_memory(pid):
+    """
+    Return the resident memory of a process.
+
+    Args:
+        pid (int): Process identifier.
+
+    Returns:
+        int or None: Resident set size in bytes, or None where it cannot be read.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class WatchedProcess:
+    """
+    A running render supervised by the watchdog.
+    """
+
+    def __init__(self, process, timeout, max_rss, renders):
+        """
+        Initialize the entry.
+
+        Args:
+            process (subprocess.Popen): The OpenSCAD process.
+            timeout (float or None): Wall-clock limit in seconds.
+            max_rss (int or None): Resident memory limit in bytes.
+            renders (RenderGroup): Group the render is paused, resumed and cancelled with.
+        """
+        self.process = process
+        self.timeout = timeout
+        self.max_rss = max_rss
+        self.renders = renders
+        self.started = time.monotonic()
+        self.paused_before = 0.0  # Time the group had spent paused when the render started
+        self.killed = None  # 'timeout', 'memory' or 'cancelled' once the process is killed
+
+
+class RenderGroup:
+    """
+    The running renders of one batch, which are paused, resumed and cancelled together.
+
+    Renders of other batches in the same process are never signalled.
+    """
+
+    def __init__(self):
+        """
+        Initialize a group without renders that is not paused.
+        """
+        # Reentrant, as a signal handler may cancel the batch while the lock is held
+        self.lock = threading.RLock()
+        self.watched = set()
+        self.tracked = set()  # Process groups of renders supervised elsewhere
+        self.paused_at = None
+        self.paused_total = 0.0
+
+    def add(self, entry):
+        """
+        Include a render supervised by the watchdog.
+
+        Args:
+            entry (WatchedProcess): Entry of the render.
+        """
+        with self.lock:
+            entry.paused_before = self.paused_seconds()
+            if self.paused_at is not None:
+                # Admitted just before the pause
+                self.stop_group(entry.process.pid)
+            self.watched.add(entry)
+
+    def discard(self, entry):
+        """
+        Stop including a render passed to add().
+
+        Args:
+            entry (WatchedProcess): Entry of the render.
+        """
+        with self.lock:
+            self.watched.discard(entry)
+
+    def track(self, pid):
+        """
+        Include a process group supervised elsewhere in pause, resume and cancel.
+
+        Args:
+            pid (int): Process identifier of the group leader.
+        """
+        with self.lock:
+            if self.paused_at is not None:
+                self.stop_group(pid)
+            self.tracked.add(pid)
+
+    def untrack(self, pid):
+        """
+        Stop including a process group in pause, resume and cancel.
+
+        Args:
+            pid (int): Process identifier passed to track().
+        """
+        with self.lock:
+            self.tracked.discard(pid)
+
+    @property
+    def paused(self):
+        """
+        bool: Whether the renders of the group are suspended.
+        """
+        return self.paused_at is not None
+
+    def paused_seconds(self):
+        """
+        Return the total time the renders of the group have spent paused.
+
+        Returns:
+            float: Seconds, including the current pause.
+        """
+        if self.paused_at is None:
+            return self.paused_total
+        return self.paused_total + time.monotonic() - self.paused_at
+
+    def groups(self):
+        """
+        Return the process group leaders of all running renders of the group.
+        """
+        return [entry.process.pid for entry in self.watched] + list(self.tracked)
+
+    def stop_group(self, pid):
+        """
+        Suspend a process group where the platform supports it.
+        """
+        if hasattr(signal, "SIGSTOP"):
+            signal_group(pid, signal.SIGSTOP)
+
+    def pause(self):
+        """
+        Suspend every running render of the group and freeze its render timeouts.
+
+        On Windows renders cannot be suspended and keep running.
+        """
+        with self.lock:
+            if self.paused_at is not None:
+                return
+            self.paused_at = time.monotonic()
+            for pid in self.groups():
+                self.stop_group(pid)
+
+    def resume(self):
+        """
+        Continue every render suspended by pause().
+        """
+        with self.lock:
+            if self.paused_at is None:
+                return
+            if hasattr(signal, "SIGCONT"):
+                for pid in self.groups():
+                    signal_group(pid, signal.SIGCONT)
+            self.paused_total += time.monotonic() - self.paused_at
+            self.paused_at = None
+
+    def kill_all(self):
+        """
+        Kill every running render of the group.
+        """
+        with self.lock:
+            if self.paused_at is not None and hasattr(signal, "SIGCONT"):
+                # Stopped processes only act on SIGTERM once continued
+                for pid in self.groups():
+                    signal_group(pid, signal.SIGCONT)
+            for entry in self.watched:
+                if entry.process.poll() is None and not entry.killed:
+                    entry.killed = "cancelled"
+                    kill_group_by_pid(entry.process.pid)
+            for pid in self.tracked:
+                kill_group_by_pid(pid)
+
+
+class Watchdog:
+    """
+    Background thread that kills renders exceeding their time or memory limits.
+    """
+
+    def __init__(self, interval=0.5):
+        """
+        Initialize the watchdog. The thread starts with the first watched process.
+
+        Args:
+            interval (float): Seconds between checks.
+        """
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.watched = set()
+        self.thread = None
+        # Group of renders started outside a batch
+        self.renders = RenderGroup()
+
+    def watch(self, process, timeout=None, max_rss=None, renders=None):
+        """
+        Start supervising a process.
+
+        Args:
+            process (subprocess.Popen): Process started with popen_group_kwargs().
+            timeout (float or None): Wall-clock limit in seconds.
+            max_rss (int or None): Resident memory limit in bytes.
+            renders (RenderGroup or None): Group the render is paused, resumed and
+                cancelled with. Defaults to the group of renders outside a batch.
+
+        Returns:
+            WatchedProcess: Entry to pass to unwatch() once the process has finished.
+        """
+        entry = WatchedProcess(process, timeout, max_rss, renders or self.renders)
+        entry.renders.add(entry)
+        with self.lock:
+            self.watched.add(entry)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        return entry
+
+    def unwatch(self, entry):
+        """
+        Stop supervising a process.
+
+        Args:
+            entry (WatchedProcess): Entry returned by watch().
+        """
+        with self.lock:
+            self.watched.discard(entry)
+        entry.renders.discard(entry)
+
+    def _run(self):
+        """
+        Check all watched processes until none are left.
+        """
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.watched:
+                    self.thread = None
+                    return
+                entries = list(self.watched)
+            now = time.monotonic()
+            for entry in entries:
+                if entry.renders.paused:
+                    continue
+                if entry.killed or entry.process.poll() is not None:
+                    continue
+                paused = entry.renders.paused_seconds() - entry.paused_before
+                elapsed = now - entry.started - paused
+                if entry.timeout is not None and elapsed > entry.timeout:
+                    entry.killed = "timeout"
+                elif entry.max_rss is not None:
+                    rss = resident_memory(entry.process.pid)
+                    if rss is not None and rss > entry.max_rss:
+                        entry.killed = "memory"
+                if entry.killed:
+                    # Killing may wait for the grace period; do not hold up other checks
+                    threading.Thread(
+                        target=kill_process_group, args=(entry.process,), daemon=True
+                    ).start()
+
+
+# Shared by all renders of the process
+WATCHDOG = Watchdog()
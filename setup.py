@@ -17,13 +17,16 @@ setup(
         ],
     },
     install_requires=[],
+    extras_require={
+        "inspect": ["numpy"],
+    },
     include_package_data=True,
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: AGPL 3 License",
         "Operating System :: OS Independent",
     ],
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     long_description=open("README.md").read(),
     long_description_content_type="text/markdown",
 )
@@ -0,0 +1,35 @@
+# tests/conftest.py
+
+import os
+import sys
+import stat
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture
+def fake_openscad(tmp_path):
+    """
+    Path of an executable that behaves like OpenSCAD (see fake_openscad.py).
+    """
+    path = tmp_path / "openscad"
+    path.write_text(
+        f'#!/bin/sh\nexec "{sys.executable}" "{os.path.join(TESTS_DIR, "fake_openscad.py")}" "$@"\n'
+    )
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+@pytest.fixture
+def model(tmp_path):
+    """
+    Path of a model with width, height and depth parameters.
+    """
+    path = tmp_path / "model.scad"
+    path.write_text(
+        "width = 10;\nheight = 10;\ndepth = 10;\ncube([width, height, depth]);\n"
+    )
+    return str(path)
+
@@ -0,0 +1,66 @@
+# tests/fake_openscad.py
+
+"""
+Stand-in for the OpenSCAD binary used by the tests.
+
+Writes a binary STL cube sized by -Dwidth/-Dheight/-Ddepth to every -o output, and a CSG
+file for .csg outputs. -Dfail=1 makes the render fail, -Dempty=1 makes it exit successfully
+without writing anything, as older OpenSCAD releases do for empty top-level geometry, and
+-Dsleep=N delays it by N seconds.
+"""
+
+import os
+import struct
+import sys
+import time
+
+FACES = [
+    (0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+    (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3),
+]
+
+
+def main(args):
+    if "--version" in args:
+        sys.stderr.write("OpenSCAD version 2021.01\n")
+        return 0
+    if "--help" in args:
+        sys.stderr.write("  -o arg  output file (May be used multiple time for different exports)\n")
+        return 0
+    outputs = []
+    defines = {}
+    i = 0
+    while i < len(args):
+        if args[i] == "-o":
+            outputs.append(args[i + 1])
+            i += 2
+            continue
+        if args[i].startswith("-D"):
+            key, value = args[i][2:].split("=", 1)
+            defines[key] = value
+        i += 1
+    if defines.get("fail") == "1":
+        sys.stderr.write("ERROR: requested failure\n")
+        return 1
+    time.sleep(float(defines.get("sleep", 0)))
+    if defines.get("empty") == "1":
+        sys.stderr.write("WARNING: No top level geometry to render\n")
+        return 0
+    size = [float(defines.get(key, 10)) for key in ("width", "height", "depth")]
+    vertices = [(x, y, z) for x in (0, size[0]) for y in (0, size[1]) for z in (0, size[2])]
+    for output in outputs:
+        if output.endswith(".csg"):
+            with open(output, "w") as f:
+                f.write("cube(size = [%g, %g, %g], center = false);\n" % tuple(size))
+            continue
+        with open(output, "wb") as f:
+            f.write(b"\0" * 80)
+            f.write(struct.pack("<I", len(FACES)))
+            for face in FACES:
+                corners = [c for index in face for c in vertices[index]]
+                f.write(struct.pack("<12fH", 0, 0, 0, *corners, 0))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,40 @@
+# tests/test_api.py
+
+import inspect
+from dataclasses import fields
+
+from openscad_export.api import BatchExporter, ExportConfig
+from openscad_export.events import ExportFailed, ExportFinished, LogMessage
+from openscad_export.export import batch_export
+
+
+def test_config_matches_batch_export():
+    callbacks = ("progress_callback", "control", "on_event", "log")
+    parameters = [
+        parameter
+        for name, parameter in inspect.signature(batch_export).parameters.items()
+        if name not in callbacks
+    ]
+    config = fields(ExportConfig)
+    assert [field.name for field in config] == [parameter.name for parameter in parameters]
+    for field, parameter in zip(config, parameters):
+        # Required arguments of batch_export() may have defaults in the config
+        if parameter.default is not inspect.Parameter.empty:
+            assert field.default == parameter.default, field.name
+
+
+def test_export_iter_reports_events_and_levels(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,fail\nx,1\ny,0\n")
+    exporter = BatchExporter(
+        ExportConfig(model, str(parameters), str(tmp_path / "out"), fake_openscad)
+    )
+    events = list(exporter.export_iter())
+    assert [event.row for event in events if isinstance(event, ExportFailed)] == [0]
+    assert [event.row for event in events if isinstance(event, ExportFinished)] == [1]
+    levels = {event.text: event.level for event in events if isinstance(event, LogMessage)}
+    assert [level for text, level in levels.items() if text.startswith("Error exporting")] == [
+        "error"
+    ]
+    assert levels["Successful exports: 1"] == "info"
+    assert exporter.result.failed and not exporter.result.ok
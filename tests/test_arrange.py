@@ -0,0 +1,52 @@
+# tests/test_arrange.py
+
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from openscad_export.arrange import pack_parts  # noqa: E402
+
+EPSILON = 1e-9
+
+
+def footprints(sizes, placements):
+    for i, x, y, rotated in placements:
+        w, d = sizes[i]
+        if rotated:
+            w, d = d, w
+        yield i, x, y, w, d
+
+
+def test_parts_keep_their_spacing_and_stay_on_the_plate():
+    generator = random.Random(7)
+    sizes = [(generator.uniform(5, 60), generator.uniform(5, 60)) for _ in range(60)]
+    plate, spacing = (200.0, 150.0), 2.0
+    plates, too_large = pack_parts(sizes, plate, spacing)
+    assert too_large == []
+    assert sorted(i for parts in plates for i, _, _, _ in parts) == list(range(len(sizes)))
+    for parts in plates:
+        placed = list(footprints(sizes, parts))
+        for i, x, y, w, d in placed:
+            assert x >= -EPSILON and y >= -EPSILON
+            assert x + w <= plate[0] + EPSILON and y + d <= plate[1] + EPSILON
+        for position, (_, x1, y1, w1, d1) in enumerate(placed):
+            for _, x2, y2, w2, d2 in placed[position + 1:]:
+                apart_x = x1 + w1 + spacing <= x2 + EPSILON or x2 + w2 + spacing <= x1 + EPSILON
+                apart_y = y1 + d1 + spacing <= y2 + EPSILON or y2 + d2 + spacing <= y1 + EPSILON
+                assert apart_x or apart_y
+
+
+def test_parts_larger_than_the_plate_are_reported():
+    plates, too_large = pack_parts([(10, 10), (300, 10), (10, 300)], (100, 100), 1.0)
+    assert too_large == [1, 2]
+    assert [[i for i, _, _, _ in parts] for parts in plates] == [[0]]
+
+
+def test_rotation_fits_parts_that_only_fit_turned():
+    plates, too_large = pack_parts([(10, 80)], (100, 20), 0.0)
+    assert too_large == []
+    assert plates[0][0][3] is True
+    plates, too_large = pack_parts([(10, 80)], (100, 20), 0.0, rotate=False)
+    assert too_large == [0]
@@ -0,0 +1,55 @@
+# tests/test_cache.py
+
+import os
+
+from openscad_export.cache import RenderCache, source_digest
+
+
+def test_key_ignores_flag_order(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    assert cache.key("src", ["-Da=1", "-Db=2"], "binstl", "2021.01") == cache.key(
+        "src", ["-Db=2", "-Da=1"], "binstl", "2021.01"
+    )
+
+
+def test_key_changes_with_the_openscad_binary(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    key = cache.key("src", ["-Da=1"], "binstl", "2021.01")
+    assert cache.key("src", ["-Da=1"], "binstl", "2024.12") != key
+    assert cache.key("src", ["-Da=1"], "binstl", "2021.01", ["--backend=manifold"]) != key
+
+
+def test_source_digest_changes_with_a_dependency(tmp_path):
+    model = tmp_path / "model.scad"
+    library = tmp_path / "library.scad"
+    model.write_text("include <library.scad>\npart();\n")
+    library.write_text("module part() cube(1);\n")
+    digest = source_digest(str(model))
+    library.write_text("module part() cube(2);\n")
+    assert source_digest(str(model)) != digest
+
+
+def test_fetch_copies_so_editing_the_output_keeps_the_entry(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    rendered = tmp_path / "rendered.stl"
+    rendered.write_bytes(b"solid")
+    cache.store("ab" * 32, str(rendered))
+    output = tmp_path / "output.stl"
+    assert cache.fetch("ab" * 32, str(output))
+    output.write_bytes(b"edited")
+    with open(cache.path_for("ab" * 32), "rb") as f:
+        assert f.read() == b"solid"
+
+
+def test_prune_evicts_least_recently_used_entries(tmp_path):
+    cache = RenderCache(str(tmp_path / "cache"))
+    rendered = tmp_path / "rendered.stl"
+    rendered.write_bytes(b"x" * 100)
+    keys = [str(number) * 64 for number in range(3)]
+    for age, key in zip((300, 200, 100), keys):
+        cache.store(key, str(rendered))
+        os.utime(cache.path_for(key), (0, 1000 - age))
+    # A hit refreshes the oldest entry, so the second one is evicted first
+    assert cache.fetch(keys[0], str(tmp_path / "output.stl"))
+    assert cache.prune(200) == (1, 100)
+    assert [os.path.exists(cache.path_for(key)) for key in keys] == [True, False, True]
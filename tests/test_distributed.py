@@ -0,0 +1,81 @@
+# tests/test_distributed.py
+
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from openscad_export.distributed import RemoteWorker, WorkerLost, WorkerPool, serve_worker
+from openscad_export.export import export_outputs
+from openscad_export.scheduler import AdmissionController
+
+
+@pytest.fixture
+def worker(tmp_path, fake_openscad):
+    """
+    Address of a render worker serving on an ephemeral localhost port.
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    thread = threading.Thread(
+        target=serve_worker,
+        args=(export_outputs, fake_openscad, AdmissionController(2), "127.0.0.1", port),
+        kwargs={"bundle_dir": str(tmp_path / "bundles"), "version": "OpenSCAD 2021.01"},
+        daemon=True,
+    )
+    thread.start()
+    address = f"127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return address
+        except OSError:
+            time.sleep(0.05)
+    pytest.fail("Render worker did not start")
+
+
+def post_render(address, job):
+    request = urllib.request.Request(
+        f"http://{address}/render",
+        data=json.dumps(job).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.getcode()
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_pool_renders_on_worker(tmp_path, model, worker):
+    pool = WorkerPool([worker], model)
+    assert pool.slots == 2
+    assert pool.version == "OpenSCAD 2021.01"
+    output = tmp_path / "cube.stl"
+    success, error, _ = pool.render([("binstl", str(output))], ["-Dwidth=2"])
+    assert success, error
+    assert output.stat().st_size == 84 + 12 * 50
+
+
+def test_worker_rejects_options_other_than_defines(tmp_path, model, worker):
+    pool = WorkerPool([worker], model)
+    pool.workers[0].ensure_bundle(pool.digest, pool.archive)
+    job = {"bundle": pool.digest, "scad_file": pool.scad_name, "formats": ["binstl"]}
+    assert post_render(worker, dict(job, d_flags=["-o", "/tmp/x.stl"])) == 400
+    assert post_render(worker, dict(job, extra_flags=["-o/tmp/x.stl"])) == 400
+    assert post_render(worker, dict(job, d_flags=["-Dwidth=1"])) == 200
+    assert post_render(worker, dict(job, extra_flags=["--enable=fast-csg"])) == 200
+
+
+def test_unreachable_worker_is_lost():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    with pytest.raises(WorkerLost):
+        RemoteWorker(f"127.0.0.1:{port}").connect()
@@ -0,0 +1,264 @@
+# tests/test_export.py
+
+import os
+import json
+import threading
+import time
+
+from openscad_export.events import ExportStarted
+from openscad_export.export import batch_export
+from openscad_export.history import RenderHistory
+from openscad_export.scheduler import BatchControl
+from openscad_export.sharding import merge_manifests
+
+
+def export(model, parameters, output, openscad, **kwargs):
+    """
+    Run a quiet batch export without history.
+    """
+    return batch_export(
+        model,
+        parameters,
+        str(output),
+        openscad,
+        "binstl",
+        None,
+        False,
+        log=lambda text, level="info": None,
+        **kwargs,
+    )
+
+
+def test_repeated_row_is_copied(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,width\nx,1\nx,1\ny,2\n")
+    result = export(model, str(parameters), tmp_path / "out", fake_openscad)
+    assert result.ok
+    assert sorted(os.listdir(tmp_path / "out")) == ["x.stl", "y.stl"]
+
+
+def test_incremental_with_repeated_rows(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,width\nx,1\nx,1\ny,2\n")
+    output = tmp_path / "out"
+    assert export(model, str(parameters), output, fake_openscad, incremental=True).ok
+    result = export(model, str(parameters), output, fake_openscad, incremental=True)
+    assert result.ok
+    assert result.unchanged == 2
+    assert result.succeeded == []
+
+
+def test_render_without_output_fails(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,empty\nx,1\ny,0\n")
+    output = tmp_path / "out"
+    result = export(model, str(parameters), output, fake_openscad)
+    assert result.failed == [(str(output / "x.stl"), "OpenSCAD wrote no output")]
+    assert result.succeeded == [str(output / "y.stl")]
+    assert not [name for name in os.listdir(output) if name.startswith(".partial")]
+
+
+def test_history_records_output_size(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,empty\nx,1\ny,0\n")
+    history = RenderHistory(str(tmp_path / "history.sqlite3"))
+    try:
+        export(model, str(parameters), tmp_path / "out", fake_openscad, history=history)
+        rows = history.connection.execute(
+            "SELECT status, error, output_size FROM renders ORDER BY params_key"
+        ).fetchall()
+    finally:
+        history.close()
+    assert rows[0] == ("success", None, os.path.getsize(tmp_path / "out" / "y.stl"))
+    assert rows[1] == ("failure", "OpenSCAD wrote no output", None)
+
+
+
+def test_model_is_scanned_only_with_prune_unused(tmp_path, model, fake_openscad, monkeypatch):
+    def scan(*args):
+        raise AssertionError("unused_parameters() ran without --prune_unused")
+
+    monkeypatch.setattr("openscad_export.export.unused_parameters", scan)
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,width\nx,1\n")
+    assert export(model, str(parameters), tmp_path / "out", fake_openscad).ok
+
+
+def test_history_predicts_the_next_run(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,width\nx,1\ny,2\nz,3\n")
+    history = RenderHistory(str(tmp_path / "history.sqlite3"))
+    messages = []
+    try:
+        for run in range(2):
+            result = batch_export(
+                model,
+                str(parameters),
+                str(tmp_path / f"out{run}"),
+                fake_openscad,
+                "binstl",
+                None,
+                False,
+                history=history,
+                log=lambda text, level="info": messages.append(text),
+            )
+            assert result.ok
+    finally:
+        history.close()
+    assert any(text.startswith("Predicted batch time:") for text in messages)
+    assert "Starting renders in longest-predicted-first order." in messages
+
+class NonBlockingControl(BatchControl):
+    """
+    Control whose blocking wait() must not be used.
+    """
+
+    def wait(self):
+        raise AssertionError("wait() blocks the event loop")
+
+
+def test_asyncio_engine_pauses_without_blocking(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,width\nx,1\ny,2\nz,3\n")
+    control = NonBlockingControl()
+    control.pause()
+    started = []
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(
+            export(
+                model,
+                str(parameters),
+                tmp_path / "out",
+                fake_openscad,
+                engine="asyncio",
+                control=control,
+                on_event=lambda event: started.append(event)
+                if isinstance(event, ExportStarted)
+                else None,
+            )
+        )
+    )
+    thread.start()
+    time.sleep(0.5)
+    assert not started
+    control.resume()
+    thread.join(30)
+    assert results and results[0].ok
+    assert len(started) == 3
+
+
+def test_autotune_records_in_cache_dir(tmp_path, model, fake_openscad, monkeypatch):
+    monkeypatch.setenv("OPENSCAD_EXPORT_CACHE", str(tmp_path / "default"))
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,width\nx,1\n")
+    cache_dir = tmp_path / "cache"
+    result = export(
+        model,
+        str(parameters),
+        tmp_path / "out",
+        fake_openscad,
+        autotune=True,
+        cache_dir=str(cache_dir),
+    )
+    assert result.ok
+    assert sorted(os.listdir(cache_dir)) == ["autotune.json", "capabilities.json"]
+    assert not (tmp_path / "default").exists()
+
+
+def test_concurrent_renders_get_distinct_slots(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,width,sleep\nx,1,0.5\ny,2,0.5\nz,3,0\n")
+    slots = {}
+
+    def on_event(event):
+        if isinstance(event, ExportStarted):
+            slots[event.filename] = event.slot
+
+    result = export(
+        model, str(parameters), tmp_path / "out", fake_openscad, jobs=2, on_event=on_event
+    )
+    assert result.ok
+    # x and y run at the same time; z takes whichever slot frees up first
+    assert sorted([slots["x"], slots["y"]]) == [0, 1]
+    assert slots["z"] in (0, 1)
+
+
+def test_resume_skips_rows_in_the_journal(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,width,fail\nx,1,0\ny,2,1\n")
+    output = tmp_path / "out"
+    assert len(export(model, str(parameters), output, fake_openscad).failed) == 1
+    assert (output / "export_journal.jsonl").exists()
+    parameters.write_text("exported_filename,width,fail\nx,1,0\ny,2,0\n")
+    result = export(model, str(parameters), output, fake_openscad, resume=True)
+    assert result.ok
+    assert result.resumed == [str(output / "x.stl")]
+    assert result.succeeded == [str(output / "x.stl"), str(output / "y.stl")]
+    # Nothing is left to resume once every row succeeded
+    assert not (output / "export_journal.jsonl").exists()
+
+
+def test_shards_cover_every_row_once(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text(
+        "exported_filename,width\n" + "".join(f"r{i},{i + 1}\n" for i in range(5))
+    )
+    output = tmp_path / "out"
+    for shard in ("1/2", "2/2"):
+        assert export(model, str(parameters), output, fake_openscad, shard=shard).ok
+    manifests = [json.loads(path.read_text()) for path in output.glob("shard-*.manifest.json")]
+    report = merge_manifests(manifests, expected_rows=range(5))
+    assert report["missing_shards"] == [] and report["missing_rows"] == []
+    assert report["duplicate_rows"] == {}
+    assert sorted(name for name in os.listdir(output) if name.endswith(".stl")) == [
+        f"r{i}.stl" for i in range(5)
+    ]
+
+
+def test_rows_predicted_slowest_start_first(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,width,sleep\nx,1,0\ny,2,0.3\nz,3,0\n")
+    history = RenderHistory(str(tmp_path / "history.sqlite3"))
+    started = []
+    try:
+        for run in range(2):
+            started.clear()
+            export(
+                model,
+                str(parameters),
+                tmp_path / f"out{run}",
+                fake_openscad,
+                jobs=1,
+                history=history,
+                on_event=lambda event: started.append(event.filename)
+                if isinstance(event, ExportStarted)
+                else None,
+            )
+    finally:
+        history.close()
+    assert started[0] == "y"
+
+
+def test_two_stage_renders_each_distinct_tree_once(tmp_path, model, fake_openscad):
+    parameters = tmp_path / "p.csv"
+    # The fake model ignores 'label', so x and y evaluate to the same tree
+    parameters.write_text("exported_filename,width,label\nx,1,a\ny,1,b\nz,2,a\n")
+    started = []
+    result = export(
+        model,
+        str(parameters),
+        tmp_path / "out",
+        fake_openscad,
+        two_stage=True,
+        on_event=lambda event: started.append(event.filename)
+        if isinstance(event, ExportStarted)
+        else None,
+    )
+    assert result.ok
+    assert sorted(started) == ["x", "z"]
+    out = tmp_path / "out"
+    assert sorted(os.listdir(out)) == ["x.stl", "y.stl", "z.stl"]
+    assert (out / "y.stl").read_bytes() == (out / "x.stl").read_bytes()
+    # The temporary trees next to the model are removed
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".csg")]
@@ -0,0 +1,72 @@
+# tests/test_formats.py
+
+import zipfile
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+from openscad_export.formats import (
+    ensure_stl_flavour,
+    parse_formats,
+    transcode,
+    write_binary_stl,
+)
+from openscad_export.stl import is_binary_stl, iter_triangles
+
+# Two triangles of a unit square sharing an edge
+TRIANGLES = [
+    ((0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0)),
+    ((0.0, 0.0, 0.0), (1.0, 1.0, 0.0), (0.0, 1.0, 0.0)),
+]
+
+NAMESPACE = "{http://schemas.microsoft.com/3dmanufacturing/core/2015/02}"
+
+
+@pytest.fixture
+def mesh_file(tmp_path):
+    path = tmp_path / "mesh.stl"
+    write_binary_stl(TRIANGLES, str(path))
+    return str(path)
+
+
+def test_off_shares_vertices(mesh_file, tmp_path):
+    path = tmp_path / "mesh.off"
+    transcode(mesh_file, [("off", str(path))])
+    lines = path.read_text().splitlines()
+    assert lines[0] == "OFF 4 2 0"
+    vertices = [tuple(float(c) for c in line.split()) for line in lines[1:5]]
+    faces = [tuple(int(i) for i in line.split()[1:]) for line in lines[5:]]
+    assert [tuple(vertices[i] for i in face) for face in faces] == TRIANGLES
+
+
+def test_3mf_package_holds_the_mesh(mesh_file, tmp_path):
+    path = tmp_path / "mesh.3mf"
+    transcode(mesh_file, [("3mf", str(path))])
+    with zipfile.ZipFile(path) as archive:
+        assert "[Content_Types].xml" in archive.namelist()
+        assert "_rels/.rels" in archive.namelist()
+        model = ElementTree.fromstring(archive.read("3D/3dmodel.model"))
+    mesh = model.find(f"{NAMESPACE}resources/{NAMESPACE}object/{NAMESPACE}mesh")
+    vertices = [
+        tuple(float(vertex.get(axis)) for axis in "xyz")
+        for vertex in mesh.find(f"{NAMESPACE}vertices")
+    ]
+    faces = [
+        tuple(vertices[int(triangle.get(key))] for key in ("v1", "v2", "v3"))
+        for triangle in mesh.find(f"{NAMESPACE}triangles")
+    ]
+    assert faces == TRIANGLES
+
+
+def test_stl_flavour_is_converted(mesh_file):
+    ensure_stl_flavour(mesh_file, "asciistl")
+    assert not is_binary_stl(mesh_file)
+    assert [tuple(triangle) for triangle in iter_triangles(mesh_file)] == TRIANGLES
+
+
+def test_formats_are_validated():
+    assert parse_formats("binstl, 3mf,binstl") == ["binstl", "3mf"]
+    with pytest.raises(ValueError):
+        parse_formats("asciistl,binstl")
+    with pytest.raises(ValueError):
+        parse_formats("obj")
@@ -0,0 +1,61 @@
+# tests/test_gui.py
+
+import threading
+
+import pytest
+
+pytest.importorskip("tkinter")
+
+from openscad_export.events import BatchStarted, ExportFinished, ExportStarted  # noqa: E402
+from openscad_export.gui import LogPipeline, ProgressTracker  # noqa: E402
+
+
+def test_timeline_follows_the_slot_of_each_render():
+    tracker = ProgressTracker()
+    tracker.handle(BatchStarted(3, 2))
+    tracker.handle(ExportStarted(0, "a", slot=1))
+    tracker.handle(ExportStarted(1, "b", slot=0))
+    # The result of row 0 arrives after its slot already started row 2
+    tracker.handle(ExportStarted(2, "c", slot=1))
+    tracker.handle(ExportFinished(0, ["a.stl"], 1.0, 1, 3))
+    slots = tracker.snapshot()["slots"]
+    assert [slot[:2] for slot in slots] == [(1, "b"), (2, "c")]
+    tracker.handle(ExportFinished(1, ["b.stl"], 1.0, 2, 3))
+    slots = tracker.snapshot()["slots"]
+    assert slots[0] is None and slots[1][:2] == (2, "c")
+
+
+def test_log_keeps_only_the_last_lines_and_writes_every_line(tmp_path):
+    log = LogPipeline(max_lines=3)
+    log.open_file(str(tmp_path / "logs" / "export.log"))
+    for number in range(5):
+        log.put(f"line {number}", "error" if number == 4 else "info")
+    drained = log.drain()
+    assert [text.split("] ", 1)[1] for _, text in drained] == [f"line {n}" for n in range(5)]
+    assert log.drain() == []
+    assert [(level, text.split("] ", 1)[1]) for level, text in log.lines] == [
+        ("info", "line 2"),
+        ("info", "line 3"),
+        ("error", "line 4"),
+    ]
+    log.close_file()
+    written = (tmp_path / "logs" / "export.log").read_text().splitlines()
+    assert [line.split("] ", 1)[1] for line in written] == [f"line {n}" for n in range(5)]
+
+
+def test_log_drains_messages_put_from_other_threads():
+    log = LogPipeline()
+    threads = [
+        threading.Thread(target=lambda n=n: [log.put(f"{n}-{i}") for i in range(100)])
+        for n in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    drained = []
+    while any(thread.is_alive() for thread in threads):
+        drained += log.drain()
+    for thread in threads:
+        thread.join()
+    drained += log.drain()
+    assert len(drained) == 400
+    assert len({text for _, text in drained}) == 400
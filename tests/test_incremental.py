@@ -0,0 +1,52 @@
+# tests/test_incremental.py
+
+from openscad_export.incremental import (
+    changed_dependencies,
+    dependency_hashes,
+    load_manifest,
+    manifest_entry,
+    prune_outputs,
+    save_manifest,
+    unchanged,
+)
+
+
+def test_entry_is_unchanged_until_an_input_or_file_changes(tmp_path):
+    (tmp_path / "x.stl").write_text("mesh")
+    entry = manifest_entry(["-Db=2", "-Da=1"], "hash", ["binstl"], None, ["x.stl"])
+    same = manifest_entry(["-Da=1", "-Db=2"], "hash", ["binstl"], [], [])
+    assert unchanged(entry, same, tmp_path)
+    for changed in (
+        manifest_entry(["-Da=2"], "hash", ["binstl"], None, []),
+        manifest_entry(entry["flags"], "new", ["binstl"], None, []),
+        manifest_entry(entry["flags"], "hash", ["asciistl"], None, []),
+        manifest_entry(entry["flags"], "hash", ["binstl"], ["--enable=fast-csg"], []),
+    ):
+        assert not unchanged(entry, changed, tmp_path)
+    assert not unchanged(None, entry, tmp_path)
+    (tmp_path / "x.stl").unlink()
+    assert not unchanged(entry, entry, tmp_path)
+
+
+def test_manifest_round_trip(tmp_path):
+    assert load_manifest(str(tmp_path)) is None
+    save_manifest(str(tmp_path), {"rows": {"x": {"files": ["x.stl"]}}})
+    assert load_manifest(str(tmp_path)) == {"rows": {"x": {"files": ["x.stl"]}}}
+    (tmp_path / "export_manifest.json").write_text("{broken")
+    assert load_manifest(str(tmp_path)) is None
+
+
+def test_dependency_changes_are_detected(tmp_path):
+    (tmp_path / "part.scad").write_text("module part() { cube(1); }\n")
+    model = tmp_path / "model.scad"
+    model.write_text("use <part.scad>\npart();\n")
+    before = dependency_hashes(str(model))
+    assert sorted(before) == ["model.scad", "part.scad"]
+    (tmp_path / "part.scad").write_text("module part() { cube(2); }\n")
+    assert changed_dependencies(before, dependency_hashes(str(model))) == ["part.scad"]
+
+
+def test_prune_deletes_the_files_of_removed_rows(tmp_path):
+    (tmp_path / "x.stl").write_text("mesh")
+    assert prune_outputs(str(tmp_path), [{"files": ["x.stl", "x.png"]}]) == 1
+    assert not (tmp_path / "x.stl").exists()
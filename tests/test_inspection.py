@@ -0,0 +1,38 @@
+# tests/test_inspection.py
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from openscad_export.inspection import edge_check  # noqa: E402
+
+CUBE_CORNERS = np.array(
+    [[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], dtype=np.float32
+)
+CUBE_FACES = [
+    (0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+    (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3),
+]
+
+
+def cube(faces=CUBE_FACES):
+    return CUBE_CORNERS[np.array(faces)]
+
+
+def test_closed_cube_is_watertight():
+    assert edge_check(cube()) == (True, 0)
+
+
+def test_missing_triangle_leaves_three_open_edges():
+    assert edge_check(cube(CUBE_FACES[1:])) == (False, 3)
+
+
+def test_flipped_triangle_is_counted():
+    a, b, c = CUBE_FACES[0]
+    # Its three edges and those of its neighbours now run the same way
+    assert edge_check(cube([(a, c, b)] + CUBE_FACES[1:])) == (False, 6)
+
+
+def test_duplicate_triangle_is_counted():
+    # Both copies of its edges, and the neighbouring edges with two opposites
+    assert edge_check(cube(CUBE_FACES + CUBE_FACES[:1])) == (False, 9)
@@ -0,0 +1,70 @@
+# tests/test_journal.py
+
+import os
+
+from openscad_export.journal import (
+    Journal,
+    load_journal,
+    partial_path,
+    remove_partials,
+    row_identity,
+)
+
+
+def test_completed_row_needs_same_identity_and_files(tmp_path):
+    output = tmp_path / "x.stl"
+    output.write_bytes(b"mesh")
+    journal = Journal(str(tmp_path / "journal.jsonl"))
+    journal.record(0, "identity", [str(output)])
+    journal.close()
+
+    resumed = Journal(str(tmp_path / "journal.jsonl"), resume=True)
+    assert resumed.completed(0, "identity") == [str(output)]
+    assert resumed.completed(0, "other") is None
+    assert resumed.completed(1, "identity") is None
+    output.write_bytes(b"changed")
+    assert resumed.completed(0, "identity") is None
+    resumed.close()
+
+
+def test_torn_last_line_is_ignored_and_completed(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(str(path))
+    journal.record(0, "identity", [])
+    journal.close()
+    with open(path, "a") as f:
+        f.write('{"row": 1, "ident')
+
+    resumed = Journal(str(path), resume=True)
+    assert list(resumed.entries) == [0]
+    resumed.record(2, "identity", [])
+    resumed.close()
+    assert sorted(load_journal(str(path))) == [0, 2]
+
+
+def test_journal_without_resume_starts_afresh(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = Journal(str(path))
+    journal.record(0, "identity", [])
+    journal.close()
+    Journal(str(path)).close()
+    assert load_journal(str(path)) == {}
+
+
+def test_row_identity_ignores_flag_order():
+    assert row_identity("hash", ["-Da=1", "-Db=2"], ["binstl"], None) == row_identity(
+        "hash", ["-Db=2", "-Da=1"], ["binstl"], []
+    )
+    assert row_identity("hash", ["-Da=1"], ["binstl"], None) != row_identity(
+        "hash", ["-Da=1"], ["asciistl"], None
+    )
+
+
+def test_partials_are_hidden_and_removed(tmp_path):
+    path = partial_path(str(tmp_path / "x.stl"))
+    assert os.path.basename(path).startswith(".partial.")
+    assert path.endswith(".stl")
+    open(path, "w").close()
+    (tmp_path / "x.stl").write_text("kept")
+    assert remove_partials(str(tmp_path)) == 1
+    assert os.listdir(tmp_path) == ["x.stl"]
@@ -0,0 +1,55 @@
+# tests/test_packing.py
+
+from openscad_export.formats import write_binary_stl
+from openscad_export.packing import (
+    cell_offset,
+    cell_spacing,
+    choose_pack_size,
+    split_mesh,
+    wrapper_source,
+)
+
+# A triangle of a different size per parameter set, around the origin
+SHAPES = [
+    [((-1.0, -1.0, 0.0), (1.0, -1.0, 0.0), (0.0, 1.0, 2.0))],
+    [((-2.0, -2.0, 0.0), (2.0, -2.0, 0.0), (0.0, 2.0, 3.0))],
+    [((0.0, 0.0, 0.0), (0.5, 0.0, 0.0), (0.0, 0.5, 1.0))],
+]
+
+
+def packed(shapes, spacing):
+    triangles = []
+    for position, shape in enumerate(shapes):
+        x, y = cell_offset(position, len(shapes), spacing)
+        for triangle in shape:
+            triangles.append(tuple((vx + x, vy + y, vz) for vx, vy, vz in triangle))
+    return triangles
+
+
+def test_split_mesh_returns_every_parameter_set_to_its_position(tmp_path):
+    spacing = cell_spacing([((-2.0, -2.0, 0.0), (2.0, 2.0, 3.0))])
+    path = tmp_path / "pack.stl"
+    write_binary_stl(packed(SHAPES, spacing), str(path))
+    assert split_mesh(str(path), len(SHAPES), spacing) == SHAPES
+
+
+def test_split_mesh_rejects_models_larger_than_their_cell(tmp_path):
+    spacing = 3.0
+    path = tmp_path / "pack.stl"
+    write_binary_stl(packed(SHAPES, spacing), str(path))
+    assert split_mesh(str(path), len(SHAPES), spacing) is None
+
+
+def test_wrapper_assigns_each_parameter_set_in_its_own_cell():
+    source = wrapper_source("/models/box.scad", [["-Dwidth=1"], ["-Dwidth=2"]], 10.0)
+    assert source.count("include </models/box.scad>") == 2
+    assert "    width=1;" in source
+    assert "    width=2;" in source
+    assert "translate([-5.0, 0.0, 0]) __variant_0();" in source
+    assert "translate([5.0, 0.0, 0]) __variant_1();" in source
+
+
+def test_pack_size_grows_with_startup_time():
+    assert choose_pack_size(0.01, 1.0) == 1
+    assert choose_pack_size(1.0, 1.0) == 10
+    assert choose_pack_size(100.0, 0.001) == 64
@@ -0,0 +1,58 @@
+# tests/test_scad.py
+
+import os
+
+from openscad_export.scad import strip_comments, unused_parameters
+
+EXAMPLES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples"
+)
+
+
+def write_model(tmp_path, source):
+    path = tmp_path / "model.scad"
+    path.write_text(source)
+    return str(path)
+
+
+def test_unused_parameter(tmp_path):
+    model = write_model(tmp_path, "a = 1; b = 2; c = a; cube(c);\n")
+    assert unused_parameters(model, ["a", "b", "c"]) == ["b"]
+
+
+def test_special_variable_assignment_reads_its_expression(tmp_path):
+    model = write_model(tmp_path, "w=3; $fn=w; sphere(1);\n")
+    assert unused_parameters(model, ["w"]) == []
+
+
+def test_sign_example_uses_resolution():
+    model = os.path.join(EXAMPLES_DIR, "sign", "sign.scad")
+    assert "resolution" not in unused_parameters(model, ["resolution", "radius", "height"])
+
+
+def test_missing_include_disables_analysis(tmp_path):
+    model = write_model(tmp_path, "include <missing.scad>\na = 1;\n")
+    assert unused_parameters(model, ["a"]) is None
+
+
+def test_comment_markers_inside_strings(tmp_path):
+    model = write_model(
+        tmp_path,
+        'label = "see http://x.org"; w = 5; cube(w);\n'
+        'note = "/* not a comment"; h = 2; cube(h); /* "closing */ echo(label, note);\n',
+    )
+    assert unused_parameters(model, ["label", "w", "note", "h"]) == []
+
+
+def test_strings_are_kept_by_strip_comments():
+    assert strip_comments('s = "a // b"; // c\nt = "/*";') == 's = "a // b";  \nt = "/*";'
+
+
+def test_call_of_function_literal_reads_the_variable(tmp_path):
+    model = write_model(tmp_path, "f = function(x) x * k; k = 2; cube(f(3));\n")
+    assert unused_parameters(model, ["f", "k"]) == []
+
+
+def test_module_call_is_not_a_read(tmp_path):
+    model = write_model(tmp_path, "size = 1; module part() cube(size); part();\n")
+    assert unused_parameters(model, ["size", "part"]) == ["part"]
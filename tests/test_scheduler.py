@@ -0,0 +1,97 @@
+# tests/test_scheduler.py
+
+import threading
+
+import pytest
+
+from openscad_export.scheduler import (
+    AdmissionController,
+    BatchCancelled,
+    BatchControl,
+    longest_first,
+    parse_memory_limit,
+)
+
+
+def test_job_limit_holds_back_renders_until_a_slot_frees():
+    admission = AdmissionController(2, poll_interval=0.05)
+    first = admission.acquire()
+    second = admission.acquire()
+    admitted = threading.Event()
+
+    def third():
+        admission.release(admission.acquire())
+        admitted.set()
+
+    thread = threading.Thread(target=third)
+    thread.start()
+    assert not admitted.wait(0.2)
+    admission.release(first)
+    assert admitted.wait(5)
+    thread.join()
+    admission.release(second)
+    assert admission.running == 0
+
+
+def test_first_render_is_admitted_over_the_load_limit(monkeypatch):
+    monkeypatch.setattr("openscad_export.scheduler.system_load", lambda: 100.0)
+    admission = AdmissionController(4, max_load=1.0, poll_interval=0.05)
+    assert admission.limits_exceeded() == "load average 100.00"
+    slot = admission.acquire()
+    admitted = threading.Event()
+
+    def second():
+        admission.release(admission.acquire())
+        admitted.set()
+
+    thread = threading.Thread(target=second, daemon=True)
+    thread.start()
+    assert not admitted.wait(0.2)
+    monkeypatch.setattr("openscad_export.scheduler.system_load", lambda: 0.5)
+    assert admitted.wait(5)
+    admission.release(slot)
+
+
+def test_memory_limit_counts_used_memory(monkeypatch):
+    monkeypatch.setattr(
+        "openscad_export.scheduler.system_memory", lambda: (100 * 1024**3, 10 * 1024**3)
+    )
+    assert AdmissionController(2, max_memory="80%").limits_exceeded()
+    assert AdmissionController(2, max_memory="95%").limits_exceeded() is None
+    assert AdmissionController(2, max_memory="64G").limits_exceeded()
+
+
+def test_invalid_limits_are_rejected():
+    with pytest.raises(ValueError):
+        AdmissionController(0)
+    with pytest.raises(ValueError):
+        parse_memory_limit("120%")
+    assert parse_memory_limit("50%") == ("percent", 50.0)
+
+
+def test_cancelled_batch_admits_nothing():
+    control = BatchControl()
+    admission = AdmissionController(2, control=control)
+    control.cancel()
+    with pytest.raises(BatchCancelled):
+        admission.acquire()
+
+
+def test_longest_first_sorts_within_each_window():
+    predicted = {"a": 1.0, "b": 5.0, "c": None, "d": 3.0, "e": 9.0, "f": 2.0}
+    order = list(longest_first(list(predicted), predicted.get, 4))
+    # Unknown tasks count as the average prediction of their window, 3.0; ties keep order
+    assert order == ["b", "c", "d", "a", "e", "f"]
+
+
+def test_longest_first_reads_lazily():
+    consumed = []
+
+    def tasks():
+        for number in range(10):
+            consumed.append(number)
+            yield number
+
+    ordered = longest_first(tasks(), float, 3)
+    assert next(ordered) == 2
+    assert consumed == [0, 1, 2]
@@ -0,0 +1,104 @@
+# tests/test_selection.py
+
+import pytest
+
+from openscad_export.selection import compile_selection, parse_predicate
+
+ROWS = [{"a": a, "b": b, "c": c} for a in (0, 1) for b in (0, 1) for c in (0, 1)]
+
+
+def select(selection, total=10, rows=None):
+    return list(compile_selection(selection, total, rows))
+
+
+def where(predicate):
+    return select(f"where:{predicate}", len(ROWS), lambda: iter(ROWS))
+
+
+def test_indices_ranges_and_strides_merge():
+    assert select("0-2, 5, every:2 in 4-9") == [0, 1, 2, 4, 5, 6, 8]
+    assert select("from:7, up_to:1") == [0, 1, 7, 8, 9]
+    assert len(compile_selection("0-3,2-5", 10)) == 6
+
+
+def test_empty_selection():
+    selection = compile_selection(" , ,", 10)
+    assert list(selection) == []
+    assert len(selection) == 0
+    assert selection.stop == 0
+    assert 0 not in selection
+
+
+def test_empty_range_is_rejected():
+    with pytest.raises(ValueError, match="start > end"):
+        compile_selection("5-3", 10)
+    with pytest.raises(ValueError):
+        compile_selection("every:2 in 6-4", 10)
+
+
+def test_single_row_range():
+    assert select("4-4") == [4]
+    assert select("every:3 in 4-4") == [4]
+
+
+@pytest.mark.parametrize("step", ["0", "-2"])
+def test_non_positive_stride_is_rejected(step):
+    with pytest.raises(ValueError, match="must be at least 1"):
+        compile_selection(f"every:{step} in 0-8", 10)
+
+
+def test_negative_index_is_rejected():
+    with pytest.raises(ValueError):
+        compile_selection("-1", 10)
+
+
+@pytest.mark.parametrize(
+    "selection", ["0-10", "10", "from:10", "up_to:10", "every:2 in 0-10"]
+)
+def test_stop_beyond_row_count_is_rejected(selection):
+    with pytest.raises(ValueError, match="out of range"):
+        compile_selection(selection, 10)
+
+
+def test_stride_may_end_past_its_last_selected_row():
+    # Only 9 is selected from the end of the range, which exists
+    assert select("every:3 in 0-11") == [0, 3, 6, 9]
+
+
+def test_and_binds_tighter_than_or():
+    assert parse_predicate("a==1 or b==1 and c==1") == (
+        "or",
+        ("cmp", "a", "==", "1"),
+        ("and", ("cmp", "b", "==", "1"), ("cmp", "c", "==", "1")),
+    )
+    expected = [
+        i for i, row in enumerate(ROWS) if row["a"] == 1 or (row["b"] == 1 and row["c"] == 1)
+    ]
+    assert where("a==1 or b==1 and c==1") == expected
+
+
+def test_not_binds_tighter_than_and():
+    expected = [i for i, row in enumerate(ROWS) if row["a"] != 1 and row["b"] == 1]
+    assert where("not a==1 and b==1") == expected
+
+
+def test_parentheses_override_precedence():
+    expected = [
+        i for i, row in enumerate(ROWS) if (row["a"] == 1 or row["b"] == 1) and row["c"] == 1
+    ]
+    assert where("(a==1 or b==1) and c==1") == expected
+
+
+def test_commas_inside_quoted_values_do_not_split_clauses():
+    rows = [{"name": "a,b"}, {"name": "a"}, {"name": "b"}]
+    assert select('where:name=="a,b", 2', 3, lambda: iter(rows)) == [0, 2]
+    assert select("where:name=='a,b'", 3, lambda: iter(rows)) == [0]
+
+def test_where_requires_rows():
+    with pytest.raises(ValueError, match="parameter table"):
+        compile_selection("where:a==1", 10)
+
+
+def test_unbalanced_predicate_is_rejected():
+    with pytest.raises(ValueError):
+        compile_selection("where:(a==1", len(ROWS), lambda: iter(ROWS))
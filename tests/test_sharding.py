@@ -0,0 +1,98 @@
+# tests/test_sharding.py
+
+import os
+
+import pytest
+
+from openscad_export.sharding import (
+    merge_manifests,
+    parse_shard,
+    partition,
+    plan_name,
+    shared_plan,
+)
+
+
+def test_parse_shard():
+    assert parse_shard("2/8") == (2, 8)
+    for invalid in ("0/2", "3/2", "1/0", "1", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(invalid)
+
+
+def test_partition_round_robin_without_predictions():
+    assert partition(range(5), 2) == ("round-robin", [[0, 2, 4], [1, 3]])
+
+
+def test_partition_balances_predicted_cost():
+    costs = {0: 10.0, 1: 1.0, 2: 1.0, 3: 8.0}
+    method, shards = partition(range(4), 2, costs.get)
+    assert method == "cost"
+    assert sorted(sum(costs[idx] for idx in shard) for shard in shards) == [10.0, 10.0]
+    assert sorted(idx for shard in shards for idx in shard) == [0, 1, 2, 3]
+
+
+def test_shared_plan_is_computed_once_per_fingerprint(tmp_path):
+    calls = []
+
+    def compute(shards):
+        calls.append(shards)
+        return "round-robin", shards
+
+    assert shared_plan(str(tmp_path), "a", lambda: compute([[0], [1]])) == (
+        "round-robin",
+        [[0], [1]],
+    )
+    assert shared_plan(str(tmp_path), "a", lambda: compute([[1], [0]]))[1] == [[0], [1]]
+    assert shared_plan(str(tmp_path), "b", lambda: compute([[1], [0]]))[1] == [[1], [0]]
+    assert len(calls) == 2
+
+
+def test_stale_plan_is_removed_and_first_writer_wins(tmp_path):
+    assert shared_plan(str(tmp_path), "a", lambda: ("round-robin", [[0], [1]]))
+    assert len(os.listdir(tmp_path)) == 1
+
+    def compute():
+        # Another shard stores its plan while this one is still computing
+        shared_plan(str(tmp_path), "b", lambda: ("cost", [[1], [0]]))
+        return "round-robin", [[0], [1]]
+
+    assert shared_plan(str(tmp_path), "b", compute) == ("cost", [[1], [0]])
+    assert os.listdir(tmp_path) == [plan_name("b")]
+
+
+def manifest(shard, rows, finished_at=0.0):
+    return {
+        "shard": shard,
+        "shards": 3,
+        "fingerprint": "plan",
+        "total_rows": 4,
+        "finished_at": finished_at,
+        "rows": [{"row": row, "status": status} for row, status in rows],
+    }
+
+
+def test_merge_reports_missing_duplicate_and_failed_rows():
+    report = merge_manifests(
+        [
+            manifest(1, [(0, "failure"), (1, "failure")]),
+            manifest(2, [(1, "success")]),
+        ],
+        expected_rows=range(4),
+    )
+    assert report["missing_shards"] == [3]
+    assert report["missing_rows"] == [2, 3]
+    assert report["duplicate_rows"] == {"1": [1, 2]}
+    # The later shard's result of a duplicate row counts
+    assert report["failed_rows"] == [0]
+
+
+def test_rerun_shard_replaces_its_manifest():
+    report = merge_manifests(
+        [
+            manifest(1, [(0, "failure")], finished_at=1.0),
+            manifest(1, [(0, "success")], finished_at=2.0),
+        ]
+    )
+    assert report["failed_rows"] == []
+    assert report["unaccounted_rows"] == 3
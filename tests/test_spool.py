@@ -0,0 +1,40 @@
+# tests/test_spool.py
+
+import os
+import time
+
+from openscad_export.spool import Spool
+
+
+def test_jobs_are_claimed_in_order(tmp_path):
+    spool = Spool(str(tmp_path))
+    assert spool.enqueue([{"row": 0}, {"row": 1}]) == 2
+    first, job = spool.claim()
+    assert job == {"row": 0}
+    spool.complete(first, {"status": "success"})
+    assert spool.claim()[1] == {"row": 1}
+    assert spool.claim() is None
+    assert spool.counts() == {"pending": 0, "claimed": 1, "done": 1}
+
+
+def test_claim_of_old_job_is_not_reclaimed(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.enqueue([{"row": 0}])
+    (name,) = os.listdir(tmp_path / "pending")
+    old = time.time() - 3600
+    os.utime(tmp_path / "pending" / name, (old, old))
+    spool.claim()
+    other = Spool(str(tmp_path))
+    assert other.reclaim(lease=60) == (0, 1)
+
+
+def test_abandoned_claim_is_reclaimed(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.enqueue([{"row": 0}])
+    name, _ = spool.claim()
+    (claim_name,) = os.listdir(tmp_path / "claimed")
+    old = time.time() - 3600
+    os.utime(tmp_path / "claimed" / claim_name, (old, old))
+    other = Spool(str(tmp_path))
+    assert other.reclaim(lease=60) == (1, 0)
+    assert other.claim() == (name, {"row": 0})
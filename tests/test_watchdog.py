@@ -0,0 +1,141 @@
+# tests/test_watchdog.py
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import subprocess
+
+import pytest
+
+from openscad_export.engine import run_openscad_async
+from openscad_export.events import ExportStarted
+from openscad_export.export import batch_export, run_openscad
+from openscad_export.scheduler import BatchControl
+from openscad_export.watchdog import (
+    RenderTimeout,
+    kill_process_group,
+    limit_address_space,
+    popen_group_kwargs,
+    resource,
+)
+
+
+def render(fake_openscad, model, tmp_path, name, control, results):
+    results[name] = run_openscad(
+        fake_openscad,
+        model,
+        ["-o", str(tmp_path / f"{name}.stl")],
+        ["-Dsleep=1"],
+        renders=control.renders,
+    )
+
+
+def test_cancel_kills_only_the_renders_of_its_batch(fake_openscad, model, tmp_path):
+    cancelled, running = BatchControl(), BatchControl()
+    results = {}
+    threads = [
+        threading.Thread(
+            target=render, args=(fake_openscad, model, tmp_path, name, control, results)
+        )
+        for name, control in (("cancelled", cancelled), ("running", running))
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.3)
+    cancelled.cancel()
+    for thread in threads:
+        thread.join()
+    assert results["cancelled"][:2] == (False, "Cancelled.")
+    assert results["running"][0]
+
+
+def test_pause_suspends_only_the_renders_of_its_batch(fake_openscad, model, tmp_path):
+    paused, running = BatchControl(), BatchControl()
+
+    async def main():
+        renders = [
+            asyncio.ensure_future(
+                run_openscad_async(
+                    fake_openscad,
+                    model,
+                    ["-o", str(tmp_path / f"{number}.stl")],
+                    ["-Dsleep=1"],
+                    renders=control.renders,
+                )
+            )
+            for number, control in enumerate((paused, running))
+        ]
+        await asyncio.sleep(0.3)
+        paused.pause()
+        success, _, _ = await renders[1]
+        assert success
+        assert not renders[0].done()
+        paused.resume()
+        success, _, _ = await renders[0]
+        assert success
+
+    asyncio.run(main())
+
+
+def test_children_outliving_the_render_are_killed(tmp_path, model):
+    openscad = tmp_path / "forking_openscad"
+    pid_file = tmp_path / "child.pid"
+    openscad.write_text(f"#!/bin/sh\nsleep 30 >/dev/null 2>&1 &\necho $! > {pid_file}\n")
+    openscad.chmod(0o755)
+    success, _, _ = run_openscad(str(openscad), model, [], [])
+    assert success
+    child = int(pid_file.read_text())
+    for _ in range(50):
+        try:
+            os.kill(child, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.1)
+    else:
+        pytest.fail("child of the render is still running")
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="prlimit is Linux-only")
+def test_address_space_limit_is_applied_after_spawn():
+    process = subprocess.Popen(["sleep", "5"], **popen_group_kwargs())
+    try:
+        limit_address_space(process.pid, 1 << 30)
+        assert resource.prlimit(process.pid, resource.RLIMIT_AS) == (2 << 30, 2 << 30)
+    finally:
+        kill_process_group(process)
+
+
+def test_render_over_its_timeout_is_killed(fake_openscad, model, tmp_path):
+    start = time.monotonic()
+    with pytest.raises(RenderTimeout) as info:
+        run_openscad(
+            fake_openscad, model, ["-o", str(tmp_path / "x.stl")], ["-Dsleep=30"], timeout=0.5
+        )
+    assert time.monotonic() - start < 10
+    assert info.value.timeout == 0.5
+
+
+def test_timed_out_render_is_retried(fake_openscad, model, tmp_path):
+    parameters = tmp_path / "p.csv"
+    parameters.write_text("exported_filename,sleep\nslow,30\nfast,0\n")
+    attempts = []
+    result = batch_export(
+        model,
+        str(parameters),
+        str(tmp_path / "out"),
+        fake_openscad,
+        "binstl",
+        None,
+        False,
+        timeout=0.5,
+        retries=1,
+        log=lambda text, level="info": None,
+        on_event=lambda event: attempts.append((event.filename, event.attempt))
+        if isinstance(event, ExportStarted)
+        else None,
+    )
+    assert sorted(attempts) == [("fast", 0), ("slow", 0), ("slow", 1)]
+    assert result.timed_out == [str(tmp_path / "out" / "slow.stl")]
+    assert result.succeeded == [str(tmp_path / "out" / "fast.stl")]